@@ -1,15 +1,16 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import selectinload
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 import uuid
+import calendar
 from datetime import datetime, timedelta
 import requests
 from PIL import Image
 import json
-import math
 from collections import defaultdict, Counter
 import statistics
 import cloudinary
@@ -18,9 +19,28 @@ import cloudinary.api
 from cloudinary.utils import cloudinary_url
 import threading
 import time
-from functools import lru_cache
 
 from config import Config
+from shared.geocode_cache import GeocodeCache
+from shared.gazetteer import get_gazetteer
+from shared.rate_limiter import SharedRateLimiter
+from shared.singleflight import SingleFlight
+from shared.geocoding import GeocodeUnavailable, HedgedGeocoder
+from shared.geocode_worker import BackgroundGeocoder, PENDING, DONE
+from shared.risk_zones import RiskZoneMaintainer
+from shared.snapshots import SnapshotStore
+from shared.scheduler import AnalyticsScheduler
+from shared.demographics import demographic_patterns
+from shared.spatial import track_geohash, backfill_geohashes, nearby_cases
+from shared.sighting_matcher import SightingMatcher
+from shared.search_area import SearchAreaPredictor, to_geojson
+from shared.hotspots import compute_hotspots
+from shared.heatmap import HeatmapTiles, decay_weights, encode_grid, kde_grid
+from shared.map_clusters import MapPointIndex
+from shared.pagination import keyset_page
+from shared.migrations import apply_migrations
+from shared.search import CaseSearch
+from shared.case_counts import CaseCounters
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -42,28 +62,57 @@ login_manager = LoginManager(app)
 login_manager.login_view = 'admin_login'
 
 # Auto-migrate database schema
+# (table, column, DDL type) for columns added after the initial schema
+ADDED_COLUMNS = [
+    ('sighting', 'face_match_score', 'FLOAT'),
+    ('missing_child', 'geocode_status', "VARCHAR(20) DEFAULT 'done'"),
+    ('sighting', 'geocode_status', "VARCHAR(20) DEFAULT 'done'"),
+    ('missing_child', 'risk_zone_id', 'INTEGER'),
+    ('missing_child', 'updated_at', 'TIMESTAMP'),
+    ('analytics', 'data_version', 'VARCHAR(100)'),
+    ('missing_child', 'geohash', 'VARCHAR(12)'),
+    ('sighting', 'geohash', 'VARCHAR(12)'),
+    ('missing_child', 'geocode_claimed_at', 'TIMESTAMP'),
+    ('sighting', 'geocode_claimed_at', 'TIMESTAMP'),
+]
+
+# (index, table, column) for indexes on added columns (create_all only indexes new tables)
+ADDED_INDEXES = [
+    ('ix_missing_child_geohash', 'missing_child', 'geohash'),
+    ('ix_sighting_geohash', 'sighting', 'geohash'),
+    ('ix_sighting_report_id', 'sighting', 'report_id'),
+]
+
 def migrate_database():
     """Add missing columns to existing tables"""
     with app.app_context():
         try:
             from sqlalchemy import inspect, text
             inspector = inspect(db.engine)
+            tables = inspector.get_table_names()
             
-            # Check if sighting table exists
-            if 'sighting' not in inspector.get_table_names():
-                print("⚠️ Sighting table doesn't exist yet, skipping migration")
-                return
-            
-            columns = [col['name'] for col in inspector.get_columns('sighting')]
-            
-            if 'face_match_score' not in columns:
-                print("⚙️ Adding face_match_score column to sighting table...")
-                with db.engine.connect() as conn:
-                    conn.execute(text('ALTER TABLE sighting ADD COLUMN face_match_score FLOAT'))
-                    conn.commit()
-                print("✅ face_match_score column added")
-            else:
-                print("✅ face_match_score column already exists")
+            for table, column, ddl in ADDED_COLUMNS:
+                # Check if table exists
+                if table not in tables:
+                    print(f"⚠️ {table} table doesn't exist yet, skipping migration")
+                    continue
+                
+                columns = [col['name'] for col in inspector.get_columns(table)]
+                
+                if column not in columns:
+                    print(f"⚙️ Adding {column} column to {table} table...")
+                    with db.engine.connect() as conn:
+                        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+                        conn.commit()
+                    print(f"✅ {column} column added")
+                else:
+                    print(f"✅ {column} column already exists")
+
+            for index, table, column in ADDED_INDEXES:
+                if table in tables:
+                    with db.engine.connect() as conn:
+                        conn.execute(text(f'CREATE INDEX IF NOT EXISTS {index} ON {table} ({column})'))
+                        conn.commit()
         except Exception as e:
             print(f"⚠️ Migration error: {str(e)}")
             print("⚠️ If this persists, run migrate_db.py manually")
@@ -240,25 +289,62 @@ class MissingChild(db.Model):
     location_subcategory = db.Column(db.String(200))
     last_seen_lat = db.Column(db.Float)
     last_seen_lng = db.Column(db.Float)
+    geohash = db.Column(db.String(12), index=True)  # Of last_seen_lat/lng, kept in sync by shared.spatial
     description = db.Column(db.Text, nullable=False)
     photo_filename = db.Column(db.String(500))  # Increased length for URLs
     audio_filename = db.Column(db.String(500))  # Increased length for URLs
     emergency_contact = db.Column(db.String(100))  # Emergency contact phone/email
     date_reported = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='missing')
-    sightings = db.relationship('Sighting', backref='missing_child', lazy=True)
+    geocode_status = db.Column(db.String(20), default='done', index=True)  # pending -> geocoding -> done/failed (background geocoder)
+    geocode_claimed_at = db.Column(db.DateTime)  # When a background geocoder worker claimed the row
+    risk_zone_id = db.Column(db.Integer, index=True)  # RiskZone the case currently belongs to
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Newest first; pages showing sightings load them with selectinload (see case_detail)
+    sightings = db.relationship('Sighting', backref='missing_child', lazy=True,
+                                order_by='Sighting.sighting_time.desc()')
+
+    # Keyset pages of the case listings, newest first (optionally by status); see shared/migrations.py
+    __table_args__ = (
+        db.Index('ix_missing_child_reported_id', 'date_reported', 'id'),
+        db.Index('ix_missing_child_status_reported_id', 'status', 'date_reported', 'id'),
+    )
 
 class Sighting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    report_id = db.Column(db.String(100), db.ForeignKey('missing_child.report_id'), nullable=False)
+    report_id = db.Column(db.String(100), db.ForeignKey('missing_child.report_id'), nullable=False, index=True)
     location = db.Column(db.String(200), nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
+    geohash = db.Column(db.String(12), index=True)  # Of latitude/longitude, kept in sync by shared.spatial
     description = db.Column(db.Text)
     reporter_phone = db.Column(db.String(20))
     photo_filename = db.Column(db.String(500))  # Optional photo proof for sighting
     face_match_score = db.Column(db.Float, nullable=True)  # AI face comparison score (0-100)
-    sighting_time = db.Column(db.DateTime, default=datetime.utcnow)
+    sighting_time = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    geocode_status = db.Column(db.String(20), default='done', index=True)  # pending -> geocoding -> done/failed (background geocoder)
+    geocode_claimed_at = db.Column(db.DateTime)  # When a background geocoder worker claimed the row
+
+    # Case detail: sightings of a case, newest first
+    __table_args__ = (db.Index('ix_sighting_report_time', 'report_id', 'sighting_time'),)
+
+# Keep the indexed geohash columns in sync with the coordinates
+track_geohash(MissingChild, 'last_seen_lat', 'last_seen_lng')
+track_geohash(Sighting, 'latitude', 'longitude')
+
+class SightingCandidate(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('sighting_id', 'report_id'),
+        db.Index('ix_sighting_candidate_report_status', 'report_id', 'status', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    sighting_id = db.Column(db.Integer, db.ForeignKey('sighting.id'), nullable=False, index=True)
+    report_id = db.Column(db.String(100), db.ForeignKey('missing_child.report_id'), nullable=False, index=True)  # Candidate case
+    distance_km = db.Column(db.Float)  # Sighting to the case's last seen location
+    days_apart = db.Column(db.Float)  # Sighting time minus case report time
+    status = db.Column(db.String(20), default='pending', index=True)  # pending -> confirmed/dismissed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    reviewed_at = db.Column(db.DateTime)
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -275,6 +361,13 @@ class RiskZone(db.Model):
     incident_count = db.Column(db.Integer, default=0)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    __table_args__ = (db.Index('ix_risk_zone_active_score', 'is_active', 'risk_score'),)
+
+class JobLock(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    acquired_at = db.Column(db.DateTime)
 
 class Analytics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -282,6 +375,8 @@ class Analytics(db.Model):
     analysis_data = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     insights = db.Column(db.Text)
+    data_version = db.Column(db.String(100), index=True)  # Case-table fingerprint the snapshot was computed from
+    __table_args__ = (db.Index('ix_analytics_type_created', 'analysis_type', 'created_at'),)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -379,12 +474,37 @@ def upload_audio_to_cloudinary(file, public_id):
         return None
 
 
-# Rate limiting for Nominatim API
-_last_geocode_request = 0
-_geocode_lock = threading.Lock()
+# Persistent geocode cache shared by all gunicorn workers
+geocode_cache = GeocodeCache(
+    app.config['GEOCODE_CACHE_PATH'],
+    ttl_seconds=app.config['GEOCODE_CACHE_TTL_DAYS'] * 24 * 3600,
+    negative_ttl_seconds=app.config['GEOCODE_NEGATIVE_TTL_SECONDS']
+)
+
+# Identical concurrent lookups share one upstream request
+geocode_single_flight = SingleFlight(geocode_cache)
+
+# Races Google Maps / Nominatim and tracks per-provider health
+provider_geocoder = HedgedGeocoder(
+    min_hedge_delay=app.config['GEOCODE_HEDGE_MIN_DELAY_SECONDS'],
+    max_hedge_delay=app.config['GEOCODE_HEDGE_MAX_DELAY_SECONDS'],
+    failure_threshold=app.config['GEOCODE_CIRCUIT_FAILURE_THRESHOLD'],
+    open_seconds=app.config['GEOCODE_CIRCUIT_OPEN_SECONDS']
+)
+
+# Rate limiting for Nominatim API (shared by every worker via the cache file)
+nominatim_limiter = SharedRateLimiter(
+    app.config['GEOCODE_CACHE_PATH'],
+    'nominatim',
+    rate=app.config['NOMINATIM_RATE_LIMIT']
+)
 
 def _geocode_with_google_maps(location_name):
-    """Geocode using Google Maps API (optional, requires API key)"""
+    """
+    Geocode using Google Maps API (optional, requires API key)
+
+    Returns (None, None) for ZERO_RESULTS; raises GeocodeUnavailable on errors.
+    """
     google_api_key = app.config.get('GOOGLE_MAPS_API_KEY') or os.environ.get('GOOGLE_MAPS_API_KEY')
     
     if not google_api_key:
@@ -407,42 +527,51 @@ def _geocode_with_google_maps(location_name):
             lng = location['lng']
             print(f"✅ Geocoded '{location_name}' to: {lat}, {lng} (Google Maps)")
             return lat, lng
-        else:
-            print(f"⚠️ Google Maps: No results for '{location_name}' (status: {data.get('status')})")
+        elif data['status'] == 'ZERO_RESULTS':
+            print(f"⚠️ Google Maps: No results for '{location_name}'")
             return None, None
+        else:
+            # OVER_QUERY_LIMIT, REQUEST_DENIED, UNKNOWN_ERROR, ...
+            print(f"❌ Google Maps error for '{location_name}' (status: {data.get('status')})")
+            raise GeocodeUnavailable(f"Google Maps status {data.get('status')}")
             
+    except GeocodeUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Google Maps geocoding error: {str(e)}")
-        return None, None
+        raise GeocodeUnavailable(str(e))
 
 def _geocode_with_nominatim(location_name):
-    """Geocode using Nominatim API with rate limiting and retry logic"""
-    global _last_geocode_request
-    
+    """
+    Geocode using Nominatim API with a shared rate limit and deadline-bounded retries
+
+    Returns (None, None) only when Nominatim answered with no results; raises
+    GeocodeUnavailable when it could not answer at all.
+    """
+    deadline = time.time() + app.config['NOMINATIM_MAX_WAIT_SECONDS']
+
     try:
-        # Rate limiting: ensure at least 1 second between requests
-        with _geocode_lock:
-            time_since_last = time.time() - _last_geocode_request
-            if time_since_last < 1.0:
-                time.sleep(1.0 - time_since_last)
-            _last_geocode_request = time.time()
-        
         location_encoded = location_name.strip().replace(' ', '+')
         url = f"https://nominatim.openstreetmap.org/search?format=json&q={location_encoded}&limit=1"
-        
+
         headers = {
             'User-Agent': 'Sachet-ChildSafety/1.0 (https://sachet.onrender.com)'
         }
-        
+
         # Retry logic with exponential backoff
         max_retries = 2
         for attempt in range(max_retries + 1):
+            # Rate limiting: wait for our turn in the cross-process queue, but never past the deadline
+            if not nominatim_limiter.acquire(timeout=deadline - time.time()):
+                print(f"⏳ Nominatim queue too long for '{location_name}', giving up")
+                raise GeocodeUnavailable('Nominatim rate limit queue full')
+
             try:
                 timeout = 15 if attempt == 0 else 20  # Increase timeout on retry
                 response = requests.get(url, headers=headers, timeout=timeout)
                 response.raise_for_status()
                 data = response.json()
-                
+
                 if data and len(data) > 0:
                     lat = float(data[0]['lat'])
                     lng = float(data[0]['lon'])
@@ -451,44 +580,130 @@ def _geocode_with_nominatim(location_name):
                 else:
                     print(f"⚠️ Nominatim: No results for '{location_name}'")
                     return None, None
-                    
+
             except requests.exceptions.Timeout:
                 if attempt < max_retries:
                     wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s
+                    if time.time() + wait_time >= deadline:
+                        print(f"❌ Nominatim timeout for '{location_name}', no time left to retry")
+                        raise GeocodeUnavailable('Nominatim timeout')
                     print(f"⏱️ Nominatim timeout for '{location_name}', retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries + 1})")
                     time.sleep(wait_time)
                     continue
                 else:
                     print(f"❌ Nominatim timeout for '{location_name}' after {max_retries + 1} attempts")
-                    return None, None
-                    
+                    raise GeocodeUnavailable('Nominatim timeout')
+
             except requests.exceptions.HTTPError as e:
                 if e.response.status_code == 403:
                     print(f"❌ Nominatim rate limit (403) for '{location_name}'")
-                    # Wait longer on 403
+                    # Back off every worker at once instead of sleeping in this request thread
+                    nominatim_limiter.penalize(5)
                     if attempt < max_retries:
-                        time.sleep(5)
                         continue
                 print(f"❌ Nominatim HTTP error {e.response.status_code} for '{location_name}'")
-                return None, None
-                
+                raise GeocodeUnavailable(f'Nominatim HTTP {e.response.status_code}')
+
+    except GeocodeUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Nominatim error for '{location_name}': {str(e)}")
-        return None, None
+        raise GeocodeUnavailable(str(e))
 
-@lru_cache(maxsize=100)  # Cache 100 most recent locations
 def get_location_coordinates(location_name):
-    """Get coordinates from location name using Google Maps (if configured) or Nominatim"""
+    """
+    Get coordinates from location name using Google Maps (if configured) or Nominatim
+
+    Returns (None, None) when the location is not found; raises
+    GeocodeUnavailable when no provider could answer right now.
+    """
     if not location_name:
         return None, None
     
-    # Try Google Maps first if API key is configured (more reliable)
-    lat, lng = _geocode_with_google_maps(location_name)
-    if lat and lng:
+    # Known localities resolve from the bundled gazetteer without any I/O
+    lat, lng = get_gazetteer().coordinates(location_name)
+    if lat is not None:
         return lat, lng
     
-    # Fallback to Nominatim (free but rate-limited)
-    return _geocode_with_nominatim(location_name)
+    # Check the shared cache before paying for an upstream round trip
+    cached = geocode_cache.get(location_name)
+    if cached is not None:
+        return cached
+    
+    # Identical concurrent lookups share a single upstream request
+    return geocode_single_flight.do(location_name, lambda: _geocode_with_providers(location_name))
+
+def _geocode_providers():
+    """Configured providers in preference order, as (name, fn) pairs"""
+    providers = []
+    # Google Maps first if an API key is configured (more reliable)
+    if app.config.get('GOOGLE_MAPS_API_KEY') or os.environ.get('GOOGLE_MAPS_API_KEY'):
+        providers.append(('google', _geocode_with_google_maps))
+    # Nominatim (free but rate-limited) as the fallback / hedge
+    providers.append(('nominatim', _geocode_with_nominatim))
+    return providers
+
+def _geocode_with_providers(location_name):
+    """Race the configured providers and remember the answer, including a no-match"""
+    try:
+        lat, lng, provider = provider_geocoder.geocode(location_name, _geocode_providers())
+    except GeocodeUnavailable as e:
+        # Transient failure - don't cache or report "not found"; callers retry later
+        print(f"❌ No geocoding provider could answer for '{location_name}': {str(e)}")
+        raise
+    
+    if lat is not None and lng is not None:
+        geocode_cache.set(location_name, lat, lng, provider=provider)
+    else:
+        geocode_cache.set_negative(location_name)
+    return lat, lng
+
+def get_cached_coordinates(location_name):
+    """Resolve a location from local data only (no network); (None, None) if unknown"""
+    if not location_name:
+        return None, None
+    lat, lng = get_gazetteer().coordinates(location_name)
+    if lat is not None:
+        return lat, lng
+    return geocode_cache.get(location_name) or (None, None)
+
+# Sightings are checked against the other missing cases last seen near them
+sighting_matcher = SightingMatcher(
+    db, MissingChild, Sighting, SightingCandidate,
+    radius_km=app.config['SIGHTING_MATCH_RADIUS_KM'],
+    window_days=app.config['SIGHTING_MATCH_WINDOW_DAYS'],
+    max_candidates=app.config['SIGHTING_MATCH_MAX_CANDIDATES']
+)
+
+# Likely current location per case, refitted only when its sightings change
+search_area_predictor = SearchAreaPredictor(db, MissingChild, Sighting)
+
+# Ranked full-text search (index kept in sync by the triggers of schema migration 2)
+case_search = CaseSearch(db, MissingChild, Sighting)
+
+# Headline counts per status/day/area (counters kept by the triggers of schema migration 3)
+case_counters = CaseCounters(db)
+
+def match_sighting(sighting):
+    """Queue other nearby missing cases for review; never fails the caller"""
+    try:
+        return sighting_matcher.match(sighting)
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Sighting matching failed for sighting {sighting.id}: {str(e)}")
+        return 0
+
+def on_location_resolved(kind, record):
+    """Background geocoder hook: a case or sighting just got coordinates"""
+    if kind == 'case':
+        risk_zone_maintainer.refresh_around([(record.last_seen_lat, record.last_seen_lng)])
+    else:
+        match_sighting(record)
+
+# Coordinates for new cases/sightings are resolved off the request thread
+background_geocoder = BackgroundGeocoder(
+    app, db, MissingChild, Sighting, get_location_coordinates, on_resolved=on_location_resolved
+)
 
 def send_sms_alert(message):
     """Send SMS alerts to predefined demo phone numbers"""
@@ -529,89 +744,20 @@ def send_telegram_alert(message, photo_url=None):
         return False
 
 # Analytics Functions
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points in kilometers"""
-    if not all([lat1, lon1, lat2, lon2]):
-        return float('inf')
-    
-    R = 6371  # Earth's radius in kilometers
-    
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-    
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
-    
-    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
-
 def analyze_risk_zones():
-    """Analyze historical data to identify high-risk zones"""
-    cases = MissingChild.query.filter(
-        MissingChild.last_seen_lat.isnot(None),
-        MissingChild.last_seen_lng.isnot(None)
-    ).all()
-    
-    if len(cases) < 2:
-        return []
-    
-    zones = []
-    processed = set()
-    
-    for i, case in enumerate(cases):
-        if i in processed:
-            continue
-            
-        zone_cases = [case]
-        processed.add(i)
-        
-        for j, other_case in enumerate(cases[i+1:], i+1):
-            if j in processed:
-                continue
-                
-            distance = calculate_distance(
-                case.last_seen_lat, case.last_seen_lng,
-                other_case.last_seen_lat, other_case.last_seen_lng
-            )
-            
-            if distance <= 2.0:
-                zone_cases.append(other_case)
-                processed.add(j)
-        
-        if len(zone_cases) >= 2:
-            avg_lat = sum(c.last_seen_lat for c in zone_cases) / len(zone_cases)
-            avg_lng = sum(c.last_seen_lng for c in zone_cases) / len(zone_cases)
-            risk_score = calculate_risk_score(zone_cases)
-            zone_name = f"Zone_{len(zones)+1}"
-            
-            zones.append({
-                'name': zone_name,
-                'lat': avg_lat,
-                'lng': avg_lng,
-                'cases': zone_cases,
-                'risk_score': risk_score,
-                'incident_count': len(zone_cases)
-            })
-    
-    # Save to database
-    RiskZone.query.delete()
+    """
+    Analyze historical data to identify high-risk zones
+
+    Full rebuild with grid-indexed DBSCAN (RISK_ZONE_RADIUS_KM,
+    RISK_ZONE_MIN_CASES). Case writes keep zones current incrementally; this
+    also serves as the scheduled consistency check.
+    """
+    zones = risk_zone_maintainer.rebuild()
     
+    case_ids = [case_id for zone in zones for case_id in zone['case_ids']]
+    cases_by_id = {case.id: case for case in MissingChild.query.filter(MissingChild.id.in_(case_ids)).all()} if case_ids else {}
     for zone in zones:
-        risk_zone = RiskZone(
-            zone_name=zone['name'],
-            latitude=zone['lat'],
-            longitude=zone['lng'],
-            risk_score=zone['risk_score'],
-            incident_count=zone['incident_count'],
-            radius_km=2.0
-        )
-        db.session.add(risk_zone)
-    
-    db.session.commit()
+        zone['cases'] = [cases_by_id[case_id] for case_id in zone['case_ids'] if case_id in cases_by_id]
     return zones
 
 def calculate_risk_score(cases):
@@ -653,71 +799,41 @@ def calculate_risk_score(cases):
     total_score = incident_score + recency_score + age_score
     return min(total_score, 100)
 
+# Risk zones are re-clustered around a case whenever it is added, moved or deleted
+risk_zone_maintainer = RiskZoneMaintainer(
+    db, MissingChild, RiskZone,
+    radius_km=app.config['RISK_ZONE_RADIUS_KM'],
+    min_points=app.config['RISK_ZONE_MIN_CASES'],
+    score_fn=calculate_risk_score
+)
+
+# Analytics results are stored per case-data version and reused until cases change
+analytics_snapshots = SnapshotStore(db, MissingChild, Analytics)
+
+# Heatmap tiles are rendered from the stored 'heatmap' snapshot and cached per process
+heatmap_tiles = HeatmapTiles(analytics_snapshots)
+
+# Case points for the admin map, clustered per zoom and rebuilt when cases change
+map_point_index = MapPointIndex(db, MissingChild)
+
+# Rebuilds and snapshot refreshes run in the background; one worker per job (DB lease)
+analytics_scheduler = AnalyticsScheduler(
+    app, db, JobLock, Analytics, MissingChild,
+    lease_seconds=app.config['ANALYTICS_JOB_LEASE_SECONDS'],
+    poll_seconds=app.config['ANALYTICS_SCHEDULER_POLL_SECONDS']
+)
+
+# Location keywords used for the analytics "location types" buckets
+LOCATION_TYPES = [
+    ('Parks/Playgrounds', ['park', 'playground']),
+    ('Educational', ['school', 'university']),
+    ('Commercial', ['mall', 'store', 'shop']),
+    ('Residential', ['home', 'house', 'residence']),
+]
+
 def analyze_demographic_patterns():
-    """Analyze patterns in demographics"""
-    cases = MissingChild.query.all()
-    
-    if not cases:
-        return {}
-    
-    patterns = {
-        'age_groups': Counter(),
-        'gender_distribution': Counter(),
-        'time_patterns': Counter(),
-        'location_types': Counter(),
-        'recovery_rates': {}
-    }
-    
-    for case in cases:
-        if case.age <= 5:
-            patterns['age_groups']['0-5 years'] += 1
-        elif case.age <= 10:
-            patterns['age_groups']['6-10 years'] += 1
-        elif case.age <= 15:
-            patterns['age_groups']['11-15 years'] += 1
-        else:
-            patterns['age_groups']['16+ years'] += 1
-        
-        patterns['gender_distribution'][case.gender] += 1
-        
-        hour = case.date_reported.hour
-        if 6 <= hour < 12:
-            patterns['time_patterns']['Morning (6-12)'] += 1
-        elif 12 <= hour < 18:
-            patterns['time_patterns']['Afternoon (12-18)'] += 1
-        elif 18 <= hour < 24:
-            patterns['time_patterns']['Evening (18-24)'] += 1
-        else:
-            patterns['time_patterns']['Night (0-6)'] += 1
-        
-        location = case.last_seen_location.lower()
-        if any(word in location for word in ['park', 'playground']):
-            patterns['location_types']['Parks/Playgrounds'] += 1
-        elif any(word in location for word in ['school', 'university']):
-            patterns['location_types']['Educational'] += 1
-        elif any(word in location for word in ['mall', 'store', 'shop']):
-            patterns['location_types']['Commercial'] += 1
-        elif any(word in location for word in ['home', 'house', 'residence']):
-            patterns['location_types']['Residential'] += 1
-        else:
-            patterns['location_types']['Other'] += 1
-    
-    found_cases = [c for c in cases if c.status == 'found']
-    total_cases = len(cases)
-    
-    if total_cases > 0:
-        patterns['recovery_rates']['overall'] = (len(found_cases) / total_cases) * 100
-        
-        age_recovery = {}
-        for age_group in patterns['age_groups']:
-            age_cases = [c for c in cases if get_age_group(c.age) == age_group]
-            age_found = [c for c in age_cases if c.status == 'found']
-            if age_cases:
-                age_recovery[age_group] = (len(age_found) / len(age_cases)) * 100
-        
-        patterns['recovery_rates']['by_age'] = age_recovery
-    
-    return patterns
+    """Analyze patterns in demographics (GROUP BY/CASE aggregates - no case rows are loaded)"""
+    return demographic_patterns(db, MissingChild, LOCATION_TYPES)
 
 def get_age_group(age):
     """Helper function to get age group"""
@@ -730,10 +846,22 @@ def get_age_group(age):
     else:
         return '16+ years'
 
-def generate_predictive_insights():
+def current_risk_zones():
+    """Stored risk zones as dicts (kept current by risk_zone_maintainer, no recompute)"""
+    return [{
+        'name': zone.zone_name,
+        'lat': zone.latitude,
+        'lng': zone.longitude,
+        'risk_score': zone.risk_score,
+        'incident_count': zone.incident_count
+    } for zone in RiskZone.query.filter_by(is_active=True).order_by(RiskZone.risk_score.desc()).all()]
+
+def generate_predictive_insights(zones=None, patterns=None):
     """Generate human-readable insights from analytics"""
-    zones = analyze_risk_zones()
-    patterns = analyze_demographic_patterns()
+    if zones is None:
+        zones = current_risk_zones()
+    if patterns is None:
+        patterns = analyze_demographic_patterns()
     
     insights = []
     
@@ -774,14 +902,15 @@ def generate_predictive_insights():
 def delete_case(report_id):
     """Delete a missing child case and all associated data"""
     try:
-        missing_child = MissingChild.query.filter_by(report_id=report_id).first_or_404()
+        missing_child = (MissingChild.query.options(selectinload(MissingChild.sightings))
+                         .filter_by(report_id=report_id).first_or_404())
         
         # Store child name for flash message
         child_name = missing_child.name
         
-        # Delete associated sightings first (foreign key constraint)
-        sightings = Sighting.query.filter_by(report_id=report_id).all()
-        for sighting in sightings:
+        # Delete candidate links and sightings first (foreign key constraints)
+        sighting_matcher.forget_cases([report_id])
+        for sighting in missing_child.sightings:
             db.session.delete(sighting)
         
         # Delete files from Cloudinary if they exist
@@ -819,10 +948,15 @@ def delete_case(report_id):
             except Exception as file_error:
                 print(f"⚠️ Local file deletion error: {str(file_error)}")
         
+        old_position = (missing_child.last_seen_lat, missing_child.last_seen_lng)
+        old_zone_id = missing_child.risk_zone_id
+        
         # Delete the missing child record
         db.session.delete(missing_child)
         db.session.commit()
         
+        risk_zone_maintainer.refresh_around([old_position], zone_ids=[old_zone_id])
+        
         # Send notification SMS about case deletion
         if not app.config['DEBUG']:
             deletion_message = f"CASE DELETED: {child_name} case (ID: {report_id}) has been permanently deleted by admin. Time: {datetime.now().strftime('%H:%M')}"
@@ -851,35 +985,43 @@ def bulk_delete_cases():
         
         deleted_count = 0
         deleted_names = []
+        deleted_positions = []
+        deleted_zone_ids = []
         
-        for report_id in case_ids:
-            missing_child = MissingChild.query.filter_by(report_id=report_id).first()
-            if missing_child:
-                deleted_names.append(missing_child.name)
-                
-                # Delete associated sightings
-                sightings = Sighting.query.filter_by(report_id=report_id).all()
-                for sighting in sightings:
-                    db.session.delete(sighting)
-                
-                # Delete files (same logic as single delete)
-                if CLOUDINARY_ENABLED:
-                    try:
-                        if missing_child.photo_filename and missing_child.photo_filename.startswith('http'):
-                            photo_public_id = f"missing_children/photos/{report_id}_photo"
-                            cloudinary.uploader.destroy(photo_public_id)
-                        
-                        if missing_child.audio_filename and missing_child.audio_filename.startswith('http'):
-                            audio_public_id = f"missing_children/audio/{report_id}_audio"
-                            cloudinary.uploader.destroy(audio_public_id, resource_type="video")
-                    except:
-                        pass
-                
-                # Delete the record
-                db.session.delete(missing_child)
-                deleted_count += 1
+        # All selected cases and their sightings in two queries, not a few per case
+        selected_cases = (MissingChild.query.options(selectinload(MissingChild.sightings))
+                          .filter(MissingChild.report_id.in_(case_ids)).all())
+        sighting_matcher.forget_cases([missing_child.report_id for missing_child in selected_cases])
+        
+        for missing_child in selected_cases:
+            report_id = missing_child.report_id
+            deleted_names.append(missing_child.name)
+            deleted_positions.append((missing_child.last_seen_lat, missing_child.last_seen_lng))
+            deleted_zone_ids.append(missing_child.risk_zone_id)
+            
+            # Delete associated sightings
+            for sighting in missing_child.sightings:
+                db.session.delete(sighting)
+            
+            # Delete files (same logic as single delete)
+            if CLOUDINARY_ENABLED:
+                try:
+                    if missing_child.photo_filename and missing_child.photo_filename.startswith('http'):
+                        photo_public_id = f"missing_children/photos/{report_id}_photo"
+                        cloudinary.uploader.destroy(photo_public_id)
+                    
+                    if missing_child.audio_filename and missing_child.audio_filename.startswith('http'):
+                        audio_public_id = f"missing_children/audio/{report_id}_audio"
+                        cloudinary.uploader.destroy(audio_public_id, resource_type="video")
+                except:
+                    pass
+            
+            # Delete the record
+            db.session.delete(missing_child)
+            deleted_count += 1
         
         db.session.commit()
+        risk_zone_maintainer.refresh_around(deleted_positions, zone_ids=deleted_zone_ids)
         
         # Send bulk deletion notification
         if deleted_count > 0 and not app.config['DEBUG']:
@@ -913,7 +1055,8 @@ def report_missing():
         description = request.form['description']
         emergency_contact = request.form['emergency_contact']
         
-        lat, lng = get_location_coordinates(location)
+        # Never wait on an upstream geocoder here - unknown locations are resolved in the background
+        lat, lng = get_cached_coordinates(location)
         
         photo_url = None
         audio_url = None
@@ -978,12 +1121,18 @@ def report_missing():
             description=description,
             photo_filename=photo_url,
             audio_filename=audio_url,
-            emergency_contact=emergency_contact
+            emergency_contact=emergency_contact,
+            geocode_status=DONE if lat is not None else PENDING
         )
         
         db.session.add(missing_child)
         db.session.commit()
         
+        if missing_child.geocode_status == PENDING:
+            background_geocoder.enqueue('case', missing_child.id)
+        else:
+            risk_zone_maintainer.refresh_around([(lat, lng)])
+        
         # Send Telegram alert
         report_url = request.url_root + f"found/{report_id}"
         alert_message = f"🚨 MISSING CHILD ALERT 🚨\n\nName: {name}\nAge: {age} years\nGender: {gender}\nLast Seen: {location}\n\nReport sightings: {report_url}"
@@ -1005,7 +1154,7 @@ def report_found(report_id):
         description = request.form.get('description', '')
         reporter_phone = request.form.get('reporter_phone', '')
         
-        lat, lng = get_location_coordinates(location)
+        lat, lng = get_cached_coordinates(location)
 
         # Optional photo upload for sighting
         sighting_photo_url = None
@@ -1029,7 +1178,8 @@ def report_found(report_id):
             longitude=lng or 0,
             description=description,
             reporter_phone=reporter_phone,
-            photo_filename=sighting_photo_url
+            photo_filename=sighting_photo_url,
+            geocode_status=DONE if lat is not None else PENDING
         )
         
         # AI Face Comparison (if both photos available)
@@ -1048,6 +1198,11 @@ def report_found(report_id):
         db.session.add(sighting)
         db.session.commit()
         
+        if sighting.geocode_status == PENDING:
+            background_geocoder.enqueue('sighting', sighting.id)
+        else:
+            match_sighting(sighting)
+        
         report_url = request.url_root + f"found/{report_id}"
         alert_message = (
             f"👁️ SIGHTING REPORTED 👁️\n\n"
@@ -1068,9 +1223,10 @@ def report_found(report_id):
 
 @app.route('/case/<report_id>')
 def case_detail(report_id):
-    missing_child = MissingChild.query.filter_by(report_id=report_id).first_or_404()
-    sightings = Sighting.query.filter_by(report_id=report_id).order_by(Sighting.sighting_time.desc()).all()
-    return render_template('case_detail.html', child=missing_child, sightings=sightings)
+    # The case and its sightings (newest first) in two queries, however many sightings it has
+    missing_child = (MissingChild.query.options(selectinload(MissingChild.sightings))
+                     .filter_by(report_id=report_id).first_or_404())
+    return render_template('case_detail.html', child=missing_child, sightings=missing_child.sightings)
 
 @app.route('/poster/<report_id>')
 def download_poster(report_id):
@@ -1144,24 +1300,56 @@ def admin_login():
 @app.route('/admin/dashboard')
 @login_required
 def admin_dashboard():
-    cases = MissingChild.query.order_by(MissingChild.date_reported.desc()).all()
-    total_cases = len(cases)
-    active_cases = len([c for c in cases if c.status == 'missing'])
-    found_cases = len([c for c in cases if c.status == 'found'])
+    # One keyset page of cases (?status=, ?cursor=) - load time does not grow with the table
+    # With ?q=, one page of ranked full-text search results instead
+    status = request.args.get('status') or None
+    search_query = request.args.get('q', '').strip()
+    if search_query:
+        try:
+            cases, next_cursor = case_search.search(search_query, status=status, cursor=request.args.get('cursor'),
+                                                    limit=app.config['CASE_PAGE_SIZE'])
+        except ValueError as e:
+            flash(str(e), 'warning')
+            return redirect(url_for('admin_dashboard', status=status))
+        for case in cases:
+            if case['date_reported']:
+                case['date_reported'] = datetime.fromisoformat(case['date_reported'])
+        sighting_counts = {case['report_id']: case['sighting_count'] for case in cases}
+    else:
+        # Sighting count of each case as a correlated subquery of the page query itself
+        sighting_count = (db.select(db.func.count(Sighting.id))
+                          .where(Sighting.report_id == MissingChild.report_id)
+                          .scalar_subquery().label('sighting_count'))
+        query = db.select(MissingChild, sighting_count)
+        if status:
+            query = query.where(MissingChild.status == status)
+        try:
+            rows, next_cursor = keyset_page(db, query, MissingChild.date_reported, MissingChild.id,
+                                            cursor=request.args.get('cursor'), limit=app.config['CASE_PAGE_SIZE'])
+        except ValueError:
+            return redirect(url_for('admin_dashboard', status=status))
+        cases = [row[0] for row in rows]
+        sighting_counts = {row[0].report_id: row.sighting_count for row in rows}
+    status_counts = case_counters.status_counts()
     
     return render_template('admin/dashboard.html', 
                          cases=cases, 
-                         total_cases=total_cases,
-                         active_cases=active_cases,
-                         found_cases=found_cases)
+                         sighting_counts=sighting_counts,
+                         next_cursor=next_cursor,
+                         status_filter=status,
+                         search_query=search_query,
+                         total_cases=status_counts['total'],
+                         active_cases=status_counts.get('missing', 0),
+                         found_cases=status_counts.get('found', 0))
 
 # Optionally return 404 for unauthorized access to admin routes (already protected by @login_required).
 
 @app.route('/admin/case/<report_id>')
 @login_required
 def admin_case_detail(report_id):
-    missing_child = MissingChild.query.filter_by(report_id=report_id).first_or_404()
-    sightings = Sighting.query.filter_by(report_id=report_id).order_by(Sighting.sighting_time.desc()).all()
+    missing_child = (MissingChild.query.options(selectinload(MissingChild.sightings))
+                     .filter_by(report_id=report_id).first_or_404())
+    sightings = missing_child.sightings
     
     heat_data = []
     for sighting in sightings:
@@ -1206,44 +1394,73 @@ def admin_logout():
     logout_user()
     return redirect(url_for('index'))
 
-@app.route('/admin/analytics')
-@login_required
-def admin_analytics():
-    zones = analyze_risk_zones()
+def build_analytics_snapshot():
+    """Compute everything the analytics page shows (stored by analytics_snapshots)"""
+    zones = current_risk_zones()
     patterns = analyze_demographic_patterns()
-    insights = generate_predictive_insights()
-    
-    analytics_data = {
-        'zones': len(zones),
+    return {
+        'zones': zones,
         'patterns': patterns,
-        'timestamp': datetime.utcnow().isoformat()
+        'insights': generate_predictive_insights(zones, patterns)
     }
+
+@app.route('/admin/analytics')
+@login_required
+def admin_analytics():
+    # Served from the latest stored snapshot; the scheduler recomputes it when cases changed
+    snapshot, current = analytics_snapshots.peek('comprehensive')
+    if not current:
+        analytics_scheduler.request('analytics')
+        flash('Analytics are being recomputed in the background - refresh shortly for the latest figures', 'info')
+    snapshot = snapshot or {'zones': [], 'patterns': {}, 'insights': []}
     
-    analytics_record = Analytics(
-        analysis_type='comprehensive',
-        analysis_data=json.dumps(analytics_data),
-        insights='; '.join(insights)
-    )
-    db.session.add(analytics_record)
-    db.session.commit()
+    patterns = snapshot['patterns']
+    for key in ('age_groups', 'gender_distribution', 'time_patterns', 'location_types'):
+        patterns[key] = Counter(patterns.get(key) or {})
+    patterns.setdefault('recovery_rates', {})
     
     return render_template('admin/analytics.html', 
-                         zones=zones, 
+                         zones=snapshot['zones'], 
                          patterns=patterns, 
-                         insights=insights)
+                         insights=snapshot['insights'])
 
 @app.route('/admin/risk-zones')
 @login_required
 def admin_risk_zones():
     risk_zones = RiskZone.query.filter_by(is_active=True).all()
-    cases = MissingChild.query.filter(
-        MissingChild.last_seen_lat.isnot(None),
-        MissingChild.last_seen_lng.isnot(None)
-    ).all()
     
+    # Density comes from heatmap tiles and cases from clustered map points, both fetched per viewport
     return render_template('admin/risk_zones.html', 
-                         risk_zones=risk_zones, 
-                         cases=cases)
+                         risk_zones=risk_zones)
+
+@app.route('/api/map/points')
+@login_required
+def map_points():
+    """Clustered case points for the admin map viewport (?bbox=west,south,east,north&zoom=z)"""
+    try:
+        bbox = [float(value) for value in request.args.get('bbox', '').split(',')]
+        zoom = request.args.get('zoom', type=int)
+        if len(bbox) != 4 or zoom is None:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'bbox=west,south,east,north and zoom are required', 'success': False}), 400
+    
+    return jsonify({'success': True, **map_point_index.query(*bbox, zoom)})
+
+@app.route('/api/heatmap/tiles/<int:z>/<int:x>/<int:y>.json')
+@login_required
+def heatmap_tile(z, x, y):
+    """One XYZ risk heatmap tile {size, max, cells: [[row, col, density], ...]} from the stored grid"""
+    if not 0 <= z <= 22:
+        return jsonify({'error': 'Invalid zoom level', 'success': False}), 400
+    
+    tile = heatmap_tiles.tile(z, x, y)
+    if tile['version'] is None:
+        analytics_scheduler.request('heatmap')
+    
+    response = jsonify({'success': True, **tile})
+    response.headers['Cache-Control'] = 'private, max-age=300'
+    return response
 
 @app.route('/api/geocode')
 def geocode():
@@ -1251,7 +1468,14 @@ def geocode():
     if not location:
         return jsonify({'error': 'Location parameter is required'}), 400
     
-    lat, lng = get_location_coordinates(location)
+    try:
+        lat, lng = get_location_coordinates(location)
+    except GeocodeUnavailable:
+        return jsonify({
+            'error': 'Geocoding is temporarily unavailable',
+            'success': False,
+            'location': location
+        }), 503
     if lat and lng:
         return jsonify({
             'lat': lat, 
@@ -1265,24 +1489,212 @@ def geocode():
         'location': location
     }), 404
 
+@app.route('/api/geocode/suggest')
+def geocode_suggest():
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), 25)
+    if not query:
+        return jsonify({'suggestions': [], 'success': True})
+    
+    suggestions = [{
+        'name': place['name'],
+        'lat': place['lat'],
+        'lng': place['lng']
+    } for place in get_gazetteer().suggest(query, limit=limit)]
+    return jsonify({'suggestions': suggestions, 'success': True})
+
+@app.route('/api/cases/nearby')
+def nearby_cases_api():
+    """Missing children last seen near a point (lat, lng, radius_km<=50, limit<=200), nearest first"""
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    radius_km = request.args.get('radius_km', 5.0, type=float)
+    if lat is None or lng is None or not -90 <= lat <= 90 or not -180 <= lng <= 180 or radius_km <= 0:
+        return jsonify({'error': 'Valid lat, lng and a positive radius_km are required', 'success': False}), 400
+    
+    limit = max(request.args.get('limit', 50, type=int), 1)
+    cases = nearby_cases(db, MissingChild, lat, lng, radius_km, limit=limit)
+    return jsonify({'cases': cases, 'count': len(cases), 'success': True})
+
+@app.route('/api/cases/<report_id>/search-area')
+@login_required
+def case_search_area(report_id):
+    """Predicted current location of a child from the last seen point and sightings (?format=geojson)"""
+    area = search_area_predictor.predict(report_id)
+    if area is None:
+        return jsonify({'error': 'Case not found', 'success': False}), 404
+    if request.args.get('format') == 'geojson':
+        return jsonify(to_geojson(area))
+    return jsonify({'success': True, **area})
+
+@app.route('/api/sighting-candidates')
+@login_required
+def sighting_candidates():
+    """Other missing cases linked to sightings by proximity (?report_id=&status=pending|confirmed|dismissed|all)"""
+    status = request.args.get('status', 'pending')
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    candidates = sighting_matcher.candidates(
+        report_id=request.args.get('report_id'),
+        status=None if status == 'all' else status,
+        limit=limit
+    )
+    return jsonify({'candidates': candidates, 'count': len(candidates), 'success': True})
+
+@app.route('/api/sighting-candidates/<int:candidate_id>', methods=['POST'])
+@login_required
+def review_sighting_candidate(candidate_id):
+    """Confirm or dismiss a candidate link (JSON or form field 'status')"""
+    data = request.get_json(silent=True) or request.form
+    try:
+        candidate = sighting_matcher.review(candidate_id, data.get('status'))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    if candidate is None:
+        return jsonify({'error': 'Sighting candidate not found', 'success': False}), 404
+    return jsonify({'candidate': candidate, 'success': True})
+
+@app.route('/api/geocode/stats')
+@login_required
+def geocode_stats():
+    return jsonify({
+        'success': True,
+        'cache': geocode_cache.stats(),
+        'providers': provider_geocoder.metrics()
+    })
+
 @app.route('/api/analytics/update')
 @login_required
 def update_analytics():
-    try:
-        zones = analyze_risk_zones()
-        patterns = analyze_demographic_patterns()
-        insights = generate_predictive_insights()
-        
-        return jsonify({
-            'success': True,
-            'zones': len(zones),
-            'insights': insights
-        })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    """Explicit refresh: schedules a full risk-zone rebuild plus a fresh analytics snapshot"""
+    analytics_scheduler.request('analytics')
+    return jsonify({
+        'success': True,
+        'message': 'Analytics update scheduled',
+        'job': 'analytics'
+    }), 202
+
+def refresh_analytics():
+    """Full risk-zone rebuild, then a fresh analytics snapshot (scheduler job)"""
+    analyze_risk_zones()
+    # Zone bookkeeping does not change the data version, so the snapshot is forced
+    snapshot = analytics_snapshots.get('comprehensive', build_analytics_snapshot, force=True)
+    return {
+        'zones': len(snapshot['zones']),
+        'insights': len(snapshot['insights']),
+        'data_version': snapshot['data_version']
+    }
+
+analytics_scheduler.add_job(
+    'analytics', refresh_analytics,
+    interval_seconds=app.config['ANALYTICS_REFRESH_INTERVAL_MINUTES'] * 60,
+    new_cases=app.config['ANALYTICS_REFRESH_NEW_CASES']
+)
+
+def build_heatmap_snapshot():
+    """Time-decayed kernel density over case and sighting coordinates (stored as the 'heatmap' snapshot)"""
+    now = calendar.timegm(datetime.utcnow().utctimetuple())
+    half_life = app.config['HEATMAP_HALF_LIFE_DAYS']
+    lats, lngs, weights, counts = [], [], [], []
+    # Geocoded rows only: pending/failed sightings sit at the (0, 0) placeholder
+    for model, lat, lng, when, weight in (
+        (MissingChild, MissingChild.last_seen_lat, MissingChild.last_seen_lng, MissingChild.date_reported, 1.0),
+        (Sighting, Sighting.latitude, Sighting.longitude, Sighting.sighting_time, app.config['HEATMAP_SIGHTING_WEIGHT'])
+    ):
+        rows = db.session.execute(
+            db.select(lat, lng, when).where(model.geocode_status == DONE, lat.isnot(None), lng.isnot(None))
+        ).all()
+        lats.extend(row[0] for row in rows)
+        lngs.extend(row[1] for row in rows)
+        times = [calendar.timegm(row[2].utctimetuple()) if row[2] else now for row in rows]
+        weights.extend(weight * decay_weights(times, now, half_life))
+        counts.append(len(rows))
+
+    heatmap = kde_grid(
+        lats, lngs, weights,
+        cell_km=app.config['HEATMAP_CELL_KM'],
+        bandwidth_km=app.config['HEATMAP_BANDWIDTH_KM']
+    )
+    return {
+        'heatmap': encode_grid(heatmap) if heatmap is not None else None,
+        'cases': counts[0],
+        'sightings': counts[1]
+    }
+
+def refresh_heatmap():
+    """Recompute the stored heatmap grid (scheduler job; sightings are not in the data version)"""
+    snapshot = analytics_snapshots.get('heatmap', build_heatmap_snapshot, force=True)
+    return {'cases': snapshot['cases'], 'sightings': snapshot['sightings'], 'data_version': snapshot['data_version']}
+
+analytics_scheduler.add_job(
+    'heatmap', refresh_heatmap,
+    interval_seconds=app.config['ANALYTICS_REFRESH_INTERVAL_MINUTES'] * 60,
+    new_cases=app.config['ANALYTICS_REFRESH_NEW_CASES']
+)
+
+def build_hotspot_snapshot():
+    """Space-time scan over recent cases and sightings (stored as the 'hotspots' snapshot)"""
+    now = datetime.utcnow()
+    since = now - timedelta(days=app.config['HOTSPOT_BASELINE_DAYS'])
+    points = []
+    # Geocoded rows only: pending/failed sightings sit at the (0, 0) placeholder
+    for model, lat, lng, when in (
+        (MissingChild, MissingChild.last_seen_lat, MissingChild.last_seen_lng, MissingChild.date_reported),
+        (Sighting, Sighting.latitude, Sighting.longitude, Sighting.sighting_time)
+    ):
+        rows = db.session.execute(
+            db.select(lat, lng, when).where(model.geocode_status == DONE, lat.isnot(None), lng.isnot(None), when >= since)
+        ).all()
+        points.append((
+            [row[0] for row in rows],
+            [row[1] for row in rows],
+            [calendar.timegm(row[2].utctimetuple()) for row in rows]
+        ))
+
+    return compute_hotspots(
+        points[0], points[1],
+        now=now,
+        cell_km=app.config['HOTSPOT_CELL_KM'],
+        bin_hours=app.config['HOTSPOT_BIN_HOURS'],
+        window_hours=app.config['HOTSPOT_WINDOW_HOURS'],
+        baseline_days=app.config['HOTSPOT_BASELINE_DAYS'],
+        replicates=app.config['HOTSPOT_REPLICATES']
+    )
+
+def refresh_hotspots():
+    """Recompute the hotspot snapshot (scheduler job; windows end now, so it is always forced)"""
+    snapshot = analytics_snapshots.get('hotspots', build_hotspot_snapshot, force=True)
+    return {'hotspots': len(snapshot['hotspots']), 'significant': snapshot['significant']}
+
+analytics_scheduler.add_job('hotspots', refresh_hotspots, interval_seconds=app.config['HOTSPOT_REFRESH_MINUTES'] * 60)
+
+# Full recount of the case counters, in case anything changed cases around their triggers
+analytics_scheduler.add_job(
+    'case_counts', case_counters.reconcile,
+    interval_seconds=app.config['CASE_COUNT_RECONCILE_MINUTES'] * 60
+)
+
+@app.route('/api/analytics/hotspots')
+@login_required
+def get_hotspots():
+    """Emerging space-time clusters of cases and sightings (?significant=1 for p <= 0.05 only)"""
+    snapshot, _current = analytics_snapshots.peek('hotspots')
+    if snapshot is None:
+        analytics_scheduler.request('hotspots')
+        return jsonify({'success': True, 'hotspots': [], 'pending': True})
+
+    hotspots = snapshot.get('hotspots', [])
+    if request.args.get('significant') == '1':
+        hotspots = [hotspot for hotspot in hotspots if hotspot['significant']]
+    return jsonify({
+        'success': True,
+        'hotspots': hotspots,
+        'count': len(hotspots),
+        'cases': snapshot.get('cases'),
+        'sightings': snapshot.get('sightings'),
+        'as_of': snapshot.get('as_of'),
+        'parameters': snapshot.get('parameters'),
+        'computed_at': snapshot.get('computed_at')
+    })
 
 @app.route('/test-sms')
 @app.route('/test-telegram')
@@ -1389,6 +1801,22 @@ def create_tables():
             except Exception as migration_error:
                 print(f"⚠️ Migration error: {str(migration_error)}")
                 # Continue anyway - the column might exist or be added later
+
+            # Geohash of rows stored before the column existed
+            try:
+                cases = backfill_geohashes(db, MissingChild, MissingChild.last_seen_lat, MissingChild.last_seen_lng, MissingChild.geohash)
+                sightings = backfill_geohashes(db, Sighting, Sighting.latitude, Sighting.longitude, Sighting.geohash)
+                if cases or sightings:
+                    print(f"✅ Geohash backfilled for {cases} cases and {sightings} sightings")
+            except Exception as backfill_error:
+                db.session.rollback()
+                print(f"⚠️ Geohash backfill error: {str(backfill_error)}")
+
+            # Versioned schema migrations (indexes for the hot query patterns, ...)
+            try:
+                apply_migrations(db.engine)
+            except Exception as migrations_error:
+                print(f"⚠️ Schema migration error: {str(migrations_error)}")
             
             # Create admin user if it doesn't exist
             admin_user = User.query.filter_by(username='admin').first()
@@ -1446,10 +1874,17 @@ def debug_case(report_id):
     
     return jsonify(debug_info)
 
+def start_background_workers():
+    """Start background workers once the tables exist"""
+    background_geocoder.start()
+    analytics_scheduler.start()
+
 if __name__ == '__main__':
     create_tables()
+    start_background_workers()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
 else:
     # This runs in production with Gunicorn
     create_tables()
+    start_background_workers()
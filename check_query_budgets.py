@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Query-budget check for the pages
+Renders the home page, case detail, admin dashboard (plain, by status, a
+later page, a search) and admin case detail through the Flask test client,
+then calls the case-service endpoints the gateway pages are built from (case
+list, search, stats), and fails if any of them sends more SQL statements than
+its budget. Budgets are fixed numbers, so a page that starts loading sightings
+or counts one case at a time (an N+1) fails as soon as a page shows more than
+one case.
+
+The monolith has no page templates of its own in this tree, so its pages are
+rendered with the gateway's templates (the same pages) when they are missing.
+
+Runs against the database in DATABASE_URL, which should hold some cases with
+sightings and an admin user:
+
+    DATABASE_URL=... python check_query_budgets.py [-v]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Add the current directory to Python path
+sys.path.insert(0, ROOT)
+
+from shared.auth import get_service_headers
+from shared.pagination import keyset_page
+from shared.query_budget import query_budget, QueryBudgetExceeded
+
+# Statements per page, including Flask-Login loading the admin user (monolith pages)
+BUDGETS = {
+    'home': 1,
+    'case detail': 2,
+    'admin dashboard': 3,
+    'admin dashboard, by status': 3,
+    'admin dashboard, next page': 3,
+    'admin dashboard, search': 5,
+    'admin case detail': 3,
+    'case-service cases': 1,
+    'case-service cases, by status': 1,
+    'case-service cases, next page': 1,
+    'case-service search': 3,
+    'case-service stats': 1,
+}
+
+
+def load_case_service():
+    """Import services/case-service/app.py under its own module name (it is also called app)"""
+    spec = importlib.util.spec_from_file_location(
+        'case_service_app', os.path.join(ROOT, 'services', 'case-service', 'app.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def check(label, client, engine, url, verbose, headers=None):
+    """Request url and report it; returns True when it failed or went over budget"""
+    if not url:
+        print(f"⏭️ [{label}] skipped (not enough data)")
+        return False
+    try:
+        with query_budget(engine, BUDGETS[label], label) as counter:
+            response = client.get(url, headers=headers)
+        error = None if response.status_code == 200 else f'HTTP {response.status_code}'
+    except QueryBudgetExceeded as e:
+        error = str(e)
+    print(f"{'❌' if error else '✅'} [{label}] {counter.count}/{BUDGETS[label]} queries  {url}")
+    if error:
+        print(f"      {error}")
+    elif verbose:
+        for statement in counter.statements:
+            print(f"      {statement[:160]}")
+    return bool(error)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render the pages and fail when one exceeds its query budget')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print the statements of every page')
+    args = parser.parse_args()
+
+    from app import app, db, MissingChild, Sighting, User
+
+    # app.py only creates an empty templates/errors directory; the pages live with the gateway
+    if not os.path.isfile(os.path.join(app.root_path, app.template_folder, 'index.html')):
+        app.template_folder = os.path.join(ROOT, 'gateway', 'templates')
+
+    client = app.test_client()
+    with app.app_context():
+        # The case with the most sightings makes an N+1 on the detail pages obvious
+        busiest = db.session.execute(
+            db.select(Sighting.report_id).group_by(Sighting.report_id)
+            .order_by(db.func.count(Sighting.id).desc()).limit(1)
+        ).scalar() or db.session.execute(db.select(MissingChild.report_id).limit(1)).scalar()
+        admin = db.session.execute(db.select(User.id).limit(1)).scalar()
+        word = db.session.execute(db.select(MissingChild.name).limit(1)).scalar()
+        _rows, cursor = keyset_page(db, db.select(MissingChild.date_reported, MissingChild.id),
+                                    MissingChild.date_reported, MissingChild.id,
+                                    limit=app.config['CASE_PAGE_SIZE'])
+        engine = db.engine
+
+    if not busiest or not admin:
+        print("❌ The database needs at least one case and one admin user")
+        return 1
+
+    pages = [
+        ('home', '/'),
+        ('case detail', f'/case/{busiest}'),
+        ('admin dashboard', '/admin/dashboard'),
+        ('admin dashboard, by status', '/admin/dashboard?status=missing'),
+        ('admin dashboard, next page', f'/admin/dashboard?cursor={cursor}' if cursor else None),
+        ('admin dashboard, search', f'/admin/dashboard?q={word.split()[0]}' if word else None),
+        ('admin case detail', f'/admin/case/{busiest}'),
+    ]
+
+    failures = 0
+    for label, url in pages:
+        # Public pages anonymously (visiting them logs an admin out), admin pages signed in
+        with client.session_transaction() as session:
+            session.clear()
+            if label.startswith('admin'):
+                session['_user_id'] = str(admin)
+        failures += check(label, client, engine, url, args.verbose)
+
+    service = load_case_service()
+    client = service.app.test_client()
+    headers = get_service_headers()
+    cursor = (client.get('/api/cases', headers=headers).get_json() or {}).get('next_cursor')
+    with service.app.app_context():
+        engine = service.db.engine
+    words = [w for w in (word or '').split() if len(w) >= 2]
+
+    endpoints = [
+        ('case-service cases', '/api/cases'),
+        ('case-service cases, by status', '/api/cases?status=missing'),
+        ('case-service cases, next page', f'/api/cases?cursor={cursor}' if cursor else None),
+        ('case-service search', f'/api/cases/search?q={words[0]}' if words else None),
+        ('case-service stats', '/api/stats'),
+    ]
+    for label, url in endpoints:
+        failures += check(label, client, engine, url, args.verbose, headers)
+
+    if failures:
+        print(f"❌ {failures} page{'' if failures == 1 else 's'} over budget or failing")
+        return 1
+    print("✅ Every page stays within its query budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Query-plan check for the hot query patterns
+Runs EXPLAIN on the queries behind the home page, case detail, admin
+dashboard and analytics jobs, and fails if any of them reads a table with a
+sequential scan instead of an index. Whole-table aggregates (demographics,
+heatmap, column-store reload) are full reads by design and are not listed.
+
+On PostgreSQL, sequential scans are disabled for the check (SET LOCAL
+enable_seqscan = off), so a Seq Scan in a plan means no index can serve the
+query at all, whatever the table size. Run it after the schema migrations:
+
+    DATABASE_URL=... python check_query_plans.py [-v]
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import text, tuple_
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from shared.config import Config
+from shared.models import db, MissingChild, Sighting, SightingCandidate, RiskZone, Analytics
+from shared.migrations import applied_versions, MIGRATIONS
+
+
+def hot_queries(report_id, report_ids):
+    """(page, description, select) for every query checked"""
+    now = datetime.utcnow()
+    since = now - timedelta(days=28)
+    after = (now - timedelta(days=7), 1000)
+
+    def claimable(model):
+        # Same shape as BackgroundGeocoder._claimable: pending, or an abandoned claim
+        return (model.geocode_status == 'pending') | (
+            (model.geocode_status == 'geocoding') & (model.geocode_claimed_at < now - timedelta(minutes=5)))
+
+    def keyset(query):
+        # Same shape as shared.pagination.keyset_page for a page after a cursor
+        return (query.where(tuple_(MissingChild.date_reported, MissingChild.id) < tuple_(*after))
+                .order_by(MissingChild.date_reported.desc(), MissingChild.id.desc()).limit(51))
+
+    return [
+        ('home', 'recent missing cases',
+         db.select(MissingChild).where(MissingChild.status == 'missing')
+         .order_by(MissingChild.date_reported.desc()).limit(5)),
+
+        ('case detail', 'case by report id',
+         db.select(MissingChild).where(MissingChild.report_id == report_id)),
+        ('case detail', 'sightings of the case, newest first',
+         db.select(Sighting).where(Sighting.report_id == report_id).order_by(Sighting.sighting_time.desc())),
+        ('case detail', 'candidate links of the case',
+         db.select(SightingCandidate, Sighting).join(Sighting, Sighting.id == SightingCandidate.sighting_id)
+         .where(SightingCandidate.report_id == report_id, SightingCandidate.status == 'pending')
+         .order_by(SightingCandidate.created_at.desc(), SightingCandidate.id.desc()).limit(50)),
+
+        ('dashboard', 'first page',
+         db.select(MissingChild).order_by(MissingChild.date_reported.desc(), MissingChild.id.desc()).limit(51)),
+        ('dashboard', 'page after a cursor', keyset(db.select(MissingChild))),
+        ('dashboard', 'page after a cursor, by status',
+         keyset(db.select(MissingChild).where(MissingChild.status == 'missing'))),
+        ('dashboard', 'sighting counts of a page',
+         db.select(Sighting.report_id, db.func.count(Sighting.id))
+         .where(Sighting.report_id.in_(report_ids)).group_by(Sighting.report_id)),
+        ('dashboard', 'case counts by status',
+         text("SELECT status, sum(cases) FROM case_count WHERE dimension = 'all' GROUP BY status")),
+
+        ('analytics', 'latest snapshot of a type',
+         db.select(Analytics).where(Analytics.analysis_type == 'comprehensive')
+         .order_by(Analytics.created_at.desc(), Analytics.id.desc()).limit(1)),
+        ('analytics', 'case data version',
+         db.select(db.func.count(MissingChild.id), db.func.max(MissingChild.id), db.func.max(MissingChild.updated_at))),
+        ('analytics', 'column-store refresh since the watermark',
+         db.select(MissingChild.id, MissingChild.updated_at)
+         .where((MissingChild.id > 1000) | (MissingChild.updated_at >= now - timedelta(hours=1)))),
+        ('analytics', 'hotspot window: cases',
+         db.select(MissingChild.last_seen_lat, MissingChild.last_seen_lng, MissingChild.date_reported)
+         .where(MissingChild.date_reported >= since)),
+        ('analytics', 'hotspot window: sightings',
+         db.select(Sighting.latitude, Sighting.longitude, Sighting.sighting_time)
+         .where(Sighting.sighting_time >= since)),
+        ('analytics', 'active risk zones by score',
+         db.select(RiskZone).where(RiskZone.is_active.is_(True)).order_by(RiskZone.risk_score.desc())),
+
+        ('geocoder', 'pending cases', db.select(MissingChild.id).where(claimable(MissingChild))),
+        ('geocoder', 'pending sightings', db.select(Sighting.id).where(claimable(Sighting))),
+    ]
+
+
+def explain(conn, statement):
+    """Plan lines of a select on the connection's database"""
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+        return [row[3] for row in rows]
+
+    with conn.begin():
+        conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        rows = conn.exec_driver_sql(f'EXPLAIN {compiled}', params).all()
+    return [row[0] for row in rows]
+
+
+def sequential_scans(dialect, plan):
+    """Plan lines that read a whole table"""
+    if dialect == 'sqlite':
+        # "SCAN t" reads the table; "SCAN t USING (COVERING) INDEX i" walks an index
+        return [line for line in plan if re.match(r'^SCAN \w+$', line.strip())]
+    return [line for line in plan if 'Seq Scan on' in line]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN the hot queries and fail on sequential scans')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    with app.app_context():
+        pending = [version for version, _description, _statements in MIGRATIONS
+                   if version not in applied_versions(db.engine)]
+        if pending:
+            print(f"⚠️ Schema migrations not applied yet: {pending} (start a service or run migrate_db.py)")
+
+        report_ids = db.session.execute(
+            db.select(MissingChild.report_id).order_by(MissingChild.id.desc()).limit(50)
+        ).scalars().all() or ['MC00000000']
+        failures = 0
+
+        with db.engine.connect() as conn:
+            dialect = conn.dialect.name
+            print(f"🔍 Checking query plans on {dialect}")
+            for page, description, statement in hot_queries(report_ids[0], report_ids):
+                plan = explain(conn, statement)
+                scans = sequential_scans(dialect, plan)
+                failures += bool(scans)
+                print(f"{'❌' if scans else '✅'} [{page}] {description}")
+                for line in (plan if args.verbose else scans):
+                    print(f"      {line}")
+
+    if failures:
+        print(f"❌ {failures} quer{'y' if failures == 1 else 'ies'} fall back to sequential scans")
+        return 1
+    print("✅ Every hot query is served by an index")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
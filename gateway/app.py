@@ -7,6 +7,7 @@ from flask import Flask, render_template, request, jsonify, redirect, url_for, f
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
+from collections import Counter
 from datetime import datetime, timedelta
 from io import BytesIO
 import os
@@ -18,6 +19,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from shared.config import Config
 from shared.models import db, MissingChild, Sighting, User
+from shared.database import prepare_database
 from routes import api_proxy
 
 app = Flask(__name__)
@@ -27,8 +29,9 @@ app.config.from_object(Config)
 login_manager = LoginManager(app)
 login_manager.login_view = 'admin_login'
 
-# Initialize database
+# Initialize database (tables and migrations also when started by gunicorn)
 db.init_app(app)
+prepare_database(app)
 
 # In-memory tracking for failed admin login attempts
 FAILED_ADMIN_LOGINS = {}
@@ -118,11 +121,11 @@ def guard_admin_routes():
 @app.route('/')
 def index():
     """Homepage - show recent missing cases"""
-    success, cases, error = api_proxy.get_all_cases({'status': 'missing', 'limit': 5})
+    success, page, error = api_proxy.get_all_cases({'status': 'missing'}, limit=5)
+    cases = page['cases'] if success else []
 
     if not success:
         flash(f'Error loading cases: {error}', 'danger')
-        cases = []
 
     return render_template('index.html', recent_cases=cases)
 
@@ -143,12 +146,6 @@ def report_missing():
         description = request.form['description']
         emergency_contact = request.form['emergency_contact']
 
-        # Geocode location
-        success, lat, lng, error = api_proxy.geocode_location(location)
-        if not success:
-            flash(f'Warning: Could not geocode location - {error}', 'warning')
-            lat, lng = None, None
-
         photo_url = None
         audio_url = None
 
@@ -174,7 +171,7 @@ def report_missing():
                 else:
                     flash(f'Audio upload failed: {error}', 'warning')
 
-        # Create case via Case Service
+        # Create case via Case Service (coordinates are resolved there in the background)
         case_data = {
             'report_id': report_id,
             'name': name,
@@ -182,8 +179,6 @@ def report_missing():
             'gender': gender,
             'last_seen_location': location,
             'location_subcategory': location_subcategory,
-            'last_seen_lat': lat,
-            'last_seen_lng': lng,
             'description': description,
             'photo_filename': photo_url,
             'audio_filename': audio_url,
@@ -221,11 +216,6 @@ def report_found(report_id):
         description = request.form.get('description', '')
         reporter_phone = request.form.get('reporter_phone', '')
 
-        # Geocode location
-        success_geo, lat, lng, error_geo = api_proxy.geocode_location(location)
-        if not success_geo:
-            lat, lng = 0, 0
-
         # Handle sighting photo upload
         sighting_photo_url = None
         if 'photo' in request.files:
@@ -246,12 +236,10 @@ def report_found(report_id):
                 face_match_score = match_score
                 print(f"🔍 Face match score: {match_score}%")
 
-        # Create sighting via Case Service
+        # Create sighting via Case Service (coordinates are resolved there in the background)
         sighting_data = {
             'report_id': report_id,
             'location': location,
-            'latitude': lat,
-            'longitude': lng,
             'description': description,
             'reporter_phone': reporter_phone,
             'photo_filename': sighting_photo_url,
@@ -369,24 +357,36 @@ def admin_login():
 @app.route('/admin/dashboard')
 @login_required
 def admin_dashboard():
-    """Admin dashboard"""
-    success, all_cases, error = api_proxy.get_all_cases()
-
+    """Admin dashboard: case counts and one page of cases or search results (?q=, ?status=, ?cursor=)"""
+    status = request.args.get('status') or None
+    search_query = request.args.get('q', '').strip()
+    if search_query:
+        success, page, error = api_proxy.search_cases(search_query, status=status, cursor=request.args.get('cursor'))
+    else:
+        success, page, error = api_proxy.get_all_cases({'status': status} if status else None,
+                                                       cursor=request.args.get('cursor'))
     if not success:
         flash(f'Error loading cases: {error}', 'danger')
-        all_cases = []
+        page = {'cases': [], 'next_cursor': None}
+
+    success_stats, stats, error_stats = api_proxy.get_case_stats()
+    if not success_stats:
+        stats = {}
 
-    # Calculate stats
-    missing_cases = [c for c in all_cases if c.get('status') == 'missing']
-    found_cases = [c for c in all_cases if c.get('status') == 'found']
-    closed_cases = [c for c in all_cases if c.get('status') == 'closed']
+    cases = page['cases']
+    for case in cases:
+        if case.get('date_reported'):
+            case['date_reported'] = datetime.fromisoformat(case['date_reported'])
 
     return render_template('admin/dashboard.html',
-                         all_cases=all_cases,
-                         total_cases=len(all_cases),
-                         missing_count=len(missing_cases),
-                         found_count=len(found_cases),
-                         closed_count=len(closed_cases))
+                         cases=cases,
+                         sighting_counts={case['report_id']: case.get('sighting_count', 0) for case in cases},
+                         next_cursor=page['next_cursor'],
+                         status_filter=status,
+                         search_query=search_query,
+                         total_cases=stats.get('total', 0),
+                         active_cases=stats.get('missing', 0),
+                         found_cases=stats.get('found', 0))
 
 
 @app.route('/admin/case/<report_id>')
@@ -402,7 +402,12 @@ def admin_case_detail(report_id):
     if not success_sightings:
         sightings = []
 
-    return render_template('admin/case_detail.html', child=case, sightings=sightings)
+    # Sightings filed on other cases near this one's last seen location
+    success_candidates, candidates, error_candidates = api_proxy.get_sighting_candidates(report_id, status='all')
+    if not success_candidates:
+        candidates = []
+
+    return render_template('admin/case_detail.html', child=case, sightings=sightings, candidates=candidates)
 
 
 @app.route('/admin/update_status/<report_id>/<status>')
@@ -428,6 +433,23 @@ def update_case_status(report_id, status):
     return redirect(url_for('admin_case_detail', report_id=report_id))
 
 
+@app.route('/admin/sighting-candidates/<int:candidate_id>/<status>', methods=['POST'])
+@login_required
+def review_sighting_candidate(candidate_id, status):
+    """Confirm or dismiss a sighting linked to a case by proximity"""
+    report_id = request.form.get('report_id', '')
+    success, candidate, error = api_proxy.review_sighting_candidate(candidate_id, status)
+
+    if success:
+        flash(f'Sighting link {status}', 'success')
+    else:
+        flash(f'Error reviewing sighting link: {error}', 'danger')
+
+    if report_id:
+        return redirect(url_for('admin_case_detail', report_id=report_id))
+    return redirect(url_for('admin_dashboard'))
+
+
 @app.route('/admin/delete_case/<report_id>', methods=['POST'])
 @login_required
 def delete_case(report_id):
@@ -462,12 +484,25 @@ def admin_analytics():
         flash(f'Error loading demographics: {error_demo}', 'warning')
 
     if not success_insights:
-        insights = []
+        insights = {}
         flash(f'Error loading insights: {error_insights}', 'warning')
 
+    if demographics.get('stale') or insights.get('stale'):
+        flash('Analytics are being recomputed in the background - refresh shortly for the latest figures', 'info')
+
+    # The template expects Counters (most_common) and plain insight strings
+    patterns = demographics.get('patterns') or {}
+    for key in ('age_groups', 'gender_distribution', 'time_patterns', 'location_types'):
+        patterns[key] = Counter(patterns.get(key) or {})
+    patterns.setdefault('recovery_rates', {})
+    insight_messages = [
+        f"{insight.get('icon', '')} {insight.get('message', '')}".strip() if isinstance(insight, dict) else insight
+        for insight in insights.get('insights', [])
+    ]
+
     return render_template('admin/analytics.html',
-                         patterns=demographics,
-                         insights=insights)
+                         patterns=patterns,
+                         insights=insight_messages)
 
 
 @app.route('/admin/risk-zones')
@@ -480,18 +515,89 @@ def admin_risk_zones():
         risk_zones = []
         flash(f'Error loading risk zones: {error}', 'warning')
 
-    # Get all cases for map
-    success_cases, all_cases, error_cases = api_proxy.get_all_cases()
-    if not success_cases:
-        all_cases = []
-
+    # Density comes from heatmap tiles and cases from clustered map points, both fetched per viewport
     return render_template('admin/risk_zones.html',
-                         risk_zones=risk_zones,
-                         all_cases=all_cases)
+                         risk_zones=risk_zones)
 
 
 # ==================== API ROUTES ====================
 
+@app.route('/api/geocode/suggest')
+def geocode_suggest():
+    """Location autocomplete for the report and sighting forms"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': True, 'suggestions': []})
+
+    success, suggestions, error = api_proxy.suggest_locations(query, request.args.get('limit', 10, type=int))
+    if not success:
+        return jsonify({'success': False, 'suggestions': [], 'error': error}), 502
+
+    return jsonify({'success': True, 'suggestions': suggestions})
+
+
+@app.route('/api/cases/nearby')
+def nearby_cases():
+    """Missing children last seen near a point (?lat=&lng=&radius_km=&limit=), for the public pages"""
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None:
+        return jsonify({'success': False, 'error': 'lat and lng are required'}), 400
+
+    success, result, error = api_proxy.get_nearby_cases(
+        lat, lng,
+        request.args.get('radius_km', 5.0, type=float),
+        request.args.get('limit', 50, type=int)
+    )
+    if not success:
+        return jsonify({'success': False, 'error': error}), 502
+    return jsonify(result)
+
+
+@app.route('/api/cases/<report_id>/search-area')
+@login_required
+def case_search_area(report_id):
+    """Predicted current location of a child for search teams (?format=json|geojson)"""
+    fmt = 'geojson' if request.args.get('format') == 'geojson' else 'json'
+    success, area, error = api_proxy.get_search_area(report_id, fmt)
+    if not success:
+        return jsonify({'success': False, 'error': error}), 502
+    return jsonify(area)
+
+
+@app.route('/api/map/points')
+@login_required
+def map_points():
+    """Clustered case points for the admin map viewport (?bbox=west,south,east,north&zoom=z)"""
+    success, points, error = api_proxy.get_map_points(request.args.get('bbox', ''), request.args.get('zoom', 0, type=int))
+    if not success:
+        return jsonify({'success': False, 'error': error}), 502
+    return jsonify(points)
+
+
+@app.route('/api/heatmap/tiles/<int:z>/<int:x>/<int:y>.json')
+@login_required
+def heatmap_tile(z, x, y):
+    """Risk heatmap tile for the admin map (proxied from the analytics service)"""
+    success, tile, error = api_proxy.get_heatmap_tile(z, x, y)
+    if not success:
+        return jsonify({'success': False, 'error': error}), 502
+
+    response = jsonify(tile)
+    response.headers['Cache-Control'] = 'private, max-age=300'
+    return response
+
+
+@app.route('/api/analytics/hotspots')
+@login_required
+def hotspots():
+    """Emerging space-time hotspots for the admin map (proxied from the analytics service)"""
+    success, data, error = api_proxy.get_hotspots(request.args.get('significant') == '1')
+    if not success:
+        return jsonify({'success': False, 'error': error}), 502
+    return jsonify(data)
+
+
 @app.route('/api/analytics/update', methods=['POST'])
 @login_required
 def update_analytics():
@@ -499,7 +605,8 @@ def update_analytics():
     success, error = api_proxy.update_risk_zones()
 
     if success:
-        return jsonify({'success': True, 'message': 'Analytics updated successfully'})
+        # The analytics service recomputes in the background
+        return jsonify({'success': True, 'message': 'Analytics update scheduled'}), 202
     else:
         return jsonify({'success': False, 'error': error}), 500
 
@@ -528,9 +635,4 @@ def server_error(e):
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-
-    # Create tables if they don't exist
-    with app.app_context():
-        db.create_all()
-
     app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
@@ -45,19 +45,41 @@ def create_case(case_data: Dict[str, Any]) -> Tuple[bool, Optional[Dict], Option
         return False, None, f'Case service error: {str(e)}'
 
 
-def get_all_cases(filters: Optional[Dict] = None) -> Tuple[bool, Optional[List], Optional[str]]:
-    """Get all missing child cases with optional filters"""
+def get_all_cases(filters: Optional[Dict] = None, cursor: Optional[str] = None,
+                  limit: Optional[int] = None) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """
+    Get one page of missing child cases (newest first) with optional filters
+
+    Args:
+        filters: status, gender, reported_after, reported_before, order
+        cursor: next_cursor of the previous page (None for the first page)
+        limit: Page size (the case service caps it)
+
+    Returns:
+        Tuple of (success, page, error_message); page has cases, next_cursor and has_more
+    """
     try:
         case_service_url = os.environ.get('CASE_SERVICE_URL', 'http://case-service:5001')
+        params = dict(filters or {})
+        if cursor:
+            params['cursor'] = cursor
+        if limit:
+            params['limit'] = limit
+
         response = requests.get(
             f'{case_service_url}/api/cases',
-            params=filters or {},
+            params=params,
             headers=get_service_headers(),
             timeout=30
         )
 
         if response.status_code == 200:
-            return True, response.json().get('cases', []), None
+            data = response.json()
+            return True, {
+                'cases': data.get('cases', []),
+                'next_cursor': data.get('next_cursor'),
+                'has_more': data.get('has_more', False)
+            }, None
         else:
             return False, None, response.json().get('error', 'Failed to fetch cases')
 
@@ -65,6 +87,109 @@ def get_all_cases(filters: Optional[Dict] = None) -> Tuple[bool, Optional[List],
         return False, None, f'Case service error: {str(e)}'
 
 
+def search_cases(query: str, status: Optional[str] = None, cursor: Optional[str] = None,
+                 limit: Optional[int] = None) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """
+    Ranked full-text search over cases and their sightings
+
+    Returns:
+        Tuple of (success, page, error_message); page has cases, next_cursor and has_more
+    """
+    try:
+        case_service_url = os.environ.get('CASE_SERVICE_URL', 'http://case-service:5001')
+        params = {'q': query}
+        for name, value in (('status', status), ('cursor', cursor), ('limit', limit)):
+            if value:
+                params[name] = value
+
+        response = requests.get(
+            f'{case_service_url}/api/cases/search',
+            params=params,
+            headers=get_service_headers(),
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            return True, {
+                'cases': data.get('results', []),
+                'next_cursor': data.get('next_cursor'),
+                'has_more': data.get('has_more', False)
+            }, None
+        else:
+            return False, None, response.json().get('error', 'Search failed')
+
+    except Exception as e:
+        return False, None, f'Case service error: {str(e)}'
+
+
+def get_case_stats(days: Optional[int] = None, areas: Optional[int] = None) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """
+    Get case counts by status (total, missing, found, closed)
+
+    Args:
+        days: Also get cases reported per day over the last N days (by_day)
+        areas: Also get the N areas with the most missing cases (by_area)
+    """
+    try:
+        case_service_url = os.environ.get('CASE_SERVICE_URL', 'http://case-service:5001')
+        params = {name: value for name, value in (('days', days), ('areas', areas)) if value}
+        response = requests.get(
+            f'{case_service_url}/api/stats',
+            params=params,
+            headers=get_service_headers(),
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            return True, response.json().get('stats', {}), None
+        else:
+            return False, None, response.json().get('error', 'Failed to fetch stats')
+
+    except Exception as e:
+        return False, None, f'Case service error: {str(e)}'
+
+
+def get_map_points(bbox: str, zoom: int) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """Get clustered case points for a map viewport (bbox = 'west,south,east,north')"""
+    try:
+        case_service_url = os.environ.get('CASE_SERVICE_URL', 'http://case-service:5001')
+        response = requests.get(
+            f'{case_service_url}/api/cases/map-points',
+            params={'bbox': bbox, 'zoom': zoom},
+            headers=get_service_headers(),
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            return True, response.json(), None
+        else:
+            return False, None, response.json().get('error', 'Failed to fetch map points')
+
+    except Exception as e:
+        return False, None, f'Case service error: {str(e)}'
+
+
+def get_nearby_cases(lat: float, lng: float, radius_km: float = 5.0, limit: int = 50) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """Get missing children last seen near a point, nearest first"""
+    try:
+        case_service_url = os.environ.get('CASE_SERVICE_URL', 'http://case-service:5001')
+        response = requests.get(
+            f'{case_service_url}/api/cases/nearby',
+            params={'lat': lat, 'lng': lng, 'radius_km': radius_km, 'limit': limit},
+            headers=get_service_headers(),
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            return True, response.json(), None
+        else:
+            return False, None, response.json().get('error', 'Failed to fetch nearby cases')
+
+    except Exception as e:
+        return False, None, f'Case service error: {str(e)}'
+
+
 def get_case(report_id: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
     """Get a specific case by report_id"""
     try:
@@ -162,6 +287,69 @@ def get_sightings(report_id: str) -> Tuple[bool, Optional[List], Optional[str]]:
         return False, None, f'Case service error: {str(e)}'
 
 
+def get_search_area(report_id: str, fmt: str = 'json') -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """Get the predicted current location of a child (fmt: json or geojson)"""
+    try:
+        case_service_url = os.environ.get('CASE_SERVICE_URL', 'http://case-service:5001')
+        response = requests.get(
+            f'{case_service_url}/api/cases/{report_id}/search-area',
+            params={'format': fmt},
+            headers=get_service_headers(),
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            return True, response.json(), None
+        else:
+            return False, None, response.json().get('error', 'Failed to predict search area')
+
+    except Exception as e:
+        return False, None, f'Case service error: {str(e)}'
+
+
+def get_sighting_candidates(report_id: Optional[str] = None, status: str = 'pending') -> Tuple[bool, Optional[List], Optional[str]]:
+    """Get other missing cases linked to sightings by proximity (optionally for one case)"""
+    try:
+        case_service_url = os.environ.get('CASE_SERVICE_URL', 'http://case-service:5001')
+        params = {'status': status}
+        if report_id:
+            params['report_id'] = report_id
+        response = requests.get(
+            f'{case_service_url}/api/sighting-candidates',
+            params=params,
+            headers=get_service_headers(),
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            return True, response.json().get('candidates', []), None
+        else:
+            return False, None, response.json().get('error', 'Failed to fetch sighting candidates')
+
+    except Exception as e:
+        return False, None, f'Case service error: {str(e)}'
+
+
+def review_sighting_candidate(candidate_id: int, status: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """Confirm or dismiss a sighting candidate link"""
+    try:
+        case_service_url = os.environ.get('CASE_SERVICE_URL', 'http://case-service:5001')
+        response = requests.put(
+            f'{case_service_url}/api/sighting-candidates/{candidate_id}',
+            json={'status': status},
+            headers=get_service_headers(),
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            return True, response.json().get('candidate'), None
+        else:
+            return False, None, response.json().get('error', 'Failed to review sighting candidate')
+
+    except Exception as e:
+        return False, None, f'Case service error: {str(e)}'
+
+
 # ==================== MEDIA SERVICE API ====================
 
 def upload_photo(photo_file, filename: str) -> Tuple[bool, Optional[str], Optional[str]]:
@@ -357,6 +545,27 @@ def geocode_location(location: str) -> Tuple[bool, Optional[float], Optional[flo
         return False, None, None, f'Geocoding service error: {str(e)}'
 
 
+def suggest_locations(query: str, limit: int = 10) -> Tuple[bool, Optional[List], Optional[str]]:
+    """Autocomplete location names from the offline gazetteer"""
+    try:
+        geocoding_service_url = os.environ.get('GEOCODING_SERVICE_URL', 'http://geocoding-service:5004')
+
+        response = requests.get(
+            f'{geocoding_service_url}/api/geocode/suggest',
+            params={'q': query, 'limit': limit},
+            headers=get_service_headers(),
+            timeout=5
+        )
+
+        if response.status_code == 200:
+            return True, response.json().get('suggestions', []), None
+        else:
+            return False, None, response.json().get('error', 'Suggest failed')
+
+    except Exception as e:
+        return False, None, f'Geocoding service error: {str(e)}'
+
+
 # ==================== ANALYTICS SERVICE API ====================
 
 def get_risk_zones() -> Tuple[bool, Optional[List], Optional[str]]:
@@ -380,17 +589,17 @@ def get_risk_zones() -> Tuple[bool, Optional[List], Optional[str]]:
 
 
 def update_risk_zones() -> Tuple[bool, Optional[str]]:
-    """Trigger risk zone recalculation"""
+    """Schedule risk zone recalculation (runs in the analytics service's background scheduler)"""
     try:
         analytics_service_url = os.environ.get('ANALYTICS_SERVICE_URL', 'http://analytics-service:5005')
 
         response = requests.post(
             f'{analytics_service_url}/api/analytics/risk-zones/update',
             headers=get_service_headers(),
-            timeout=120  # Longer timeout for heavy computation
+            timeout=10
         )
 
-        if response.status_code == 200:
+        if response.status_code in (200, 202):
             return True, None
         else:
             return False, response.json().get('error', 'Failed to update risk zones')
@@ -399,6 +608,47 @@ def update_risk_zones() -> Tuple[bool, Optional[str]]:
         return False, f'Analytics service error: {str(e)}'
 
 
+def get_heatmap_tile(z: int, x: int, y: int) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """Get one precomputed risk heatmap tile (XYZ)"""
+    try:
+        analytics_service_url = os.environ.get('ANALYTICS_SERVICE_URL', 'http://analytics-service:5005')
+
+        response = requests.get(
+            f'{analytics_service_url}/api/analytics/heatmap/tiles/{z}/{x}/{y}.json',
+            headers=get_service_headers(),
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            return True, response.json(), None
+        else:
+            return False, None, response.json().get('error', 'Failed to fetch heatmap tile')
+
+    except Exception as e:
+        return False, None, f'Analytics service error: {str(e)}'
+
+
+def get_hotspots(significant_only: bool = False) -> Tuple[bool, Optional[Dict], Optional[str]]:
+    """Get emerging space-time hotspots of cases and sightings"""
+    try:
+        analytics_service_url = os.environ.get('ANALYTICS_SERVICE_URL', 'http://analytics-service:5005')
+
+        response = requests.get(
+            f'{analytics_service_url}/api/analytics/hotspots',
+            params={'significant': '1'} if significant_only else None,
+            headers=get_service_headers(),
+            timeout=10
+        )
+
+        if response.status_code == 200:
+            return True, response.json(), None
+        else:
+            return False, None, response.json().get('error', 'Failed to fetch hotspots')
+
+    except Exception as e:
+        return False, None, f'Analytics service error: {str(e)}'
+
+
 def get_demographics() -> Tuple[bool, Optional[Dict], Optional[str]]:
     """Get demographic patterns"""
     try:
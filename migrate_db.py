@@ -1,10 +1,13 @@
 """
 Manual database migration script to add face_match_score column
+and apply the versioned schema migrations (shared/migrations.py)
 Run this if auto-migration fails
 """
 import os
 from sqlalchemy import create_engine, text
 
+from shared.migrations import apply_migrations
+
 # Get database URL from environment
 database_url = os.environ.get('DATABASE_URL')
 
@@ -36,6 +39,9 @@ try:
             conn.execute(text("ALTER TABLE sighting ADD COLUMN face_match_score FLOAT"))
             conn.commit()
             print("✅ face_match_score column added successfully!")
+
+    applied = apply_migrations(engine)
+    print(f"✅ Schema migrations applied: {applied or 'none pending'}")
             
 except Exception as e:
     print(f"❌ Migration failed: {str(e)}")
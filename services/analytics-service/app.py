@@ -1,19 +1,28 @@
 """
-Analytics Service - Risk zone analysis, demographic patterns, predictive insights
+Analytics Service - Risk zone analysis, demographic patterns, predictive insights, risk heatmap
 Port: 5005
 """
 import os
-import math
-from datetime import datetime
+import calendar
+from datetime import datetime, timedelta
 from functools import wraps
-from collections import Counter
 from flask import Flask, request, jsonify
+import numpy as np
 
 # Import shared components
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from shared.config import Config
-from shared.models import db, MissingChild, RiskZone, Analytics
+from shared.models import db, MissingChild, Sighting, RiskZone, Analytics, JobLock
+from shared.database import prepare_database
+from shared.risk_zones import RiskZoneMaintainer
+from shared.snapshots import SnapshotStore
+from shared.scheduler import AnalyticsScheduler
+from shared.case_arrays import CaseArrays
+from shared.heatmap import HeatmapTiles, decay_weights, encode_grid, kde_grid
+from shared.hotspots import compute_hotspots
+from shared.case_counts import CaseCounters
+from shared.geocode_worker import DONE
 
 
 app = Flask(__name__)
@@ -22,6 +31,38 @@ app.config.from_object(Config)
 # Initialize database
 db.init_app(app)
 
+# Columnar snapshot of every case, loaded once per process and topped up by
+# id/updated_at watermark; scoring and demographics run vectorized over it
+case_arrays = CaseArrays(
+    db, MissingChild,
+    overlap_seconds=app.config['CASE_ARRAYS_OVERLAP_SECONDS'],
+    reload_seconds=app.config['CASE_ARRAYS_RELOAD_MINUTES'] * 60
+)
+
+# Full risk-zone rebuilds (the case service updates zones incrementally on writes)
+risk_zone_maintainer = RiskZoneMaintainer(
+    db, MissingChild, RiskZone,
+    radius_km=app.config['RISK_ZONE_RADIUS_KM'],
+    min_points=app.config['RISK_ZONE_MIN_CASES'],
+    arrays=case_arrays
+)
+
+# Demographics/insights are stored per case-data version and reused until cases change
+snapshots = SnapshotStore(db, MissingChild, Analytics)
+
+# Heatmap tiles are rendered from the stored 'heatmap' snapshot and cached per process
+heatmap_tiles = HeatmapTiles(snapshots)
+
+# Case counters are maintained by database triggers; the scheduler recounts them periodically
+case_counters = CaseCounters(db)
+
+# Rebuilds and snapshot refreshes run here, off the request path; one worker per job (DB lease)
+analytics_scheduler = AnalyticsScheduler(
+    app, db, JobLock, Analytics, MissingChild,
+    lease_seconds=app.config['ANALYTICS_JOB_LEASE_SECONDS'],
+    poll_seconds=app.config['ANALYTICS_SCHEDULER_POLL_SECONDS']
+)
+
 
 # ==================== AUTHENTICATION MIDDLEWARE ====================
 
@@ -39,82 +80,6 @@ def require_api_key(f):
     return decorated_function
 
 
-# ==================== HELPER FUNCTIONS ====================
-
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two coordinates using Haversine formula (in km)"""
-    R = 6371  # Earth's radius in kilometers
-
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
-
-    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-
-    return R * c
-
-
-def calculate_risk_score(cases):
-    """Calculate risk score for a zone based on multiple factors"""
-    if not cases:
-        return 0
-
-    # Incident count score (0-50 points)
-    incident_score = min(len(cases) * 10, 50)
-
-    # Recency score (0-20 points based on how recent the cases are)
-    now = datetime.utcnow()
-    recency_scores = []
-
-    for case in cases:
-        days_ago = (now - case.created_at).days
-        if days_ago <= 30:
-            recency_scores.append(20)
-        elif days_ago <= 90:
-            recency_scores.append(15)
-        elif days_ago <= 365:
-            recency_scores.append(10)
-        else:
-            recency_scores.append(5)
-
-    recency_score = sum(recency_scores) / len(recency_scores) if recency_scores else 0
-
-    # Age vulnerability score (0-15 points - younger children = higher score)
-    age_scores = []
-    for case in cases:
-        if case.age <= 5:
-            age_scores.append(15)
-        elif case.age <= 10:
-            age_scores.append(12)
-        elif case.age <= 15:
-            age_scores.append(8)
-        else:
-            age_scores.append(5)
-
-    age_score = sum(age_scores) / len(age_scores) if age_scores else 0
-
-    # Total score (max 100)
-    total_score = incident_score + recency_score + age_score
-    return min(total_score, 100)
-
-
-def get_age_group(age):
-    """Helper function to get age group"""
-    if age <= 5:
-        return '0-5 years'
-    elif age <= 10:
-        return '6-10 years'
-    elif age <= 15:
-        return '11-15 years'
-    else:
-        return '16+ years'
-
-
 # ==================== HEALTH CHECK ====================
 
 @app.route('/health', methods=['GET'])
@@ -176,100 +141,34 @@ def get_risk_zones():
 @require_api_key
 def update_risk_zones():
     """
-    Recalculate risk zones based on current case data
+    Schedule a recalculation of risk zones and insights (returns 202 at once)
 
-    Algorithm:
+    Algorithm (refresh_analytics job, run by the scheduler):
     1. Get all cases with coordinates
-    2. Cluster cases within 2km radius
+    2. Cluster cases with grid-indexed DBSCAN (RISK_ZONE_RADIUS_KM, RISK_ZONE_MIN_CASES)
     3. Calculate risk score for each cluster
-    4. Save to database
-    """
-    try:
-        # Get all cases with coordinates
-        cases = db.session.execute(
-            db.select(MissingChild)
-            .where(MissingChild.lat.isnot(None))
-            .where(MissingChild.lng.isnot(None))
-        ).scalars().all()
-
-        if len(cases) < 2:
-            return jsonify({
-                'success': True,
-                'message': 'Not enough cases with coordinates to calculate risk zones',
-                'zones_created': 0
-            }), 200
-
-        zones = []
-        processed = set()
-
-        # Clustering algorithm - group cases within 2km
-        for i, case in enumerate(cases):
-            if i in processed:
-                continue
-
-            zone_cases = [case]
-            processed.add(i)
-
-            # Find nearby cases
-            for j, other_case in enumerate(cases[i+1:], i+1):
-                if j in processed:
-                    continue
-
-                distance = calculate_distance(
-                    case.lat, case.lng,
-                    other_case.lat, other_case.lng
-                )
-
-                if distance <= 2.0:  # 2km radius
-                    zone_cases.append(other_case)
-                    processed.add(j)
-
-            # Only create zone if 2+ cases in cluster
-            if len(zone_cases) >= 2:
-                avg_lat = sum(c.lat for c in zone_cases) / len(zone_cases)
-                avg_lng = sum(c.lng for c in zone_cases) / len(zone_cases)
-                risk_score = calculate_risk_score(zone_cases)
-                zone_name = f"Zone_{len(zones)+1}"
-
-                zones.append({
-                    'name': zone_name,
-                    'lat': avg_lat,
-                    'lng': avg_lng,
-                    'risk_score': risk_score,
-                    'incident_count': len(zone_cases)
-                })
-
-        # Clear existing zones and save new ones
-        db.session.execute(db.delete(RiskZone))
-
-        for zone in zones:
-            risk_zone = RiskZone(
-                zone_name=zone['name'],
-                latitude=zone['lat'],
-                longitude=zone['lng'],
-                risk_score=zone['risk_score'],
-                incident_count=zone['incident_count'],
-                radius_km=2.0
-            )
-            db.session.add(risk_zone)
+    4. Save to database and refresh the demographics/insights snapshots
 
-        db.session.commit()
+    The case service keeps zones current incrementally on every write; this
+    full rebuild (also run every ANALYTICS_REFRESH_INTERVAL_MINUTES or after
+    ANALYTICS_REFRESH_NEW_CASES new cases) is the consistency check.
+    Progress is visible at /api/analytics/jobs.
+    """
+    analytics_scheduler.request('analytics')
+    return jsonify({
+        'success': True,
+        'message': 'Risk zone update scheduled',
+        'job': 'analytics'
+    }), 202
 
-        return jsonify({
-            'success': True,
-            'message': f'Risk zones updated successfully',
-            'zones_created': len(zones)
-        }), 200
 
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({
-            'error': f'Failed to update risk zones: {str(e)}',
-            'success': False
-        }), 500
+# ==================== DEMOGRAPHICS ====================
 
+def compute_demographics():
+    """Demographic patterns over all cases (stored as the 'demographics' snapshot)"""
+    # Vectorized over the in-memory case arrays (only new/changed cases are fetched)
+    return case_arrays.refresh().demographic_patterns()
 
-# ==================== DEMOGRAPHICS ====================
 
 @app.route('/api/analytics/demographics', methods=['GET'])
 @require_api_key
@@ -283,88 +182,19 @@ def get_demographics():
     - Time patterns (when incidents occur)
     - Location type patterns
     - Recovery rates
+
+    Served from the latest stored snapshot; when cases changed since (or on
+    ?refresh=1) the scheduler is asked to recompute it and 'stale' is set.
     """
     try:
-        cases = db.session.execute(db.select(MissingChild)).scalars().all()
-
-        if not cases:
-            return jsonify({
-                'success': True,
-                'patterns': {},
-                'message': 'No cases available for analysis'
-            }), 200
-
-        patterns = {
-            'age_groups': {},
-            'gender_distribution': {},
-            'time_patterns': {},
-            'location_types': {},
-            'recovery_rates': {}
-        }
-
-        # Count age groups
-        age_counter = Counter()
-        gender_counter = Counter()
-        time_counter = Counter()
-        location_counter = Counter()
-
-        for case in cases:
-            # Age groups
-            age_counter[get_age_group(case.age)] += 1
-
-            # Gender distribution
-            gender_counter[case.gender] += 1
-
-            # Time patterns
-            hour = case.created_at.hour
-            if 6 <= hour < 12:
-                time_counter['Morning (6-12)'] += 1
-            elif 12 <= hour < 18:
-                time_counter['Afternoon (12-18)'] += 1
-            elif 18 <= hour < 24:
-                time_counter['Evening (18-24)'] += 1
-            else:
-                time_counter['Night (0-6)'] += 1
-
-            # Location types
-            location = case.location.lower()
-            if any(word in location for word in ['park', 'playground']):
-                location_counter['Parks/Playgrounds'] += 1
-            elif any(word in location for word in ['school', 'university', 'college']):
-                location_counter['Educational'] += 1
-            elif any(word in location for word in ['mall', 'store', 'shop', 'market']):
-                location_counter['Commercial'] += 1
-            elif any(word in location for word in ['home', 'house', 'residence']):
-                location_counter['Residential'] += 1
-            else:
-                location_counter['Other'] += 1
-
-        # Convert counters to dicts
-        patterns['age_groups'] = dict(age_counter)
-        patterns['gender_distribution'] = dict(gender_counter)
-        patterns['time_patterns'] = dict(time_counter)
-        patterns['location_types'] = dict(location_counter)
-
-        # Calculate recovery rates
-        found_cases = [c for c in cases if c.status == 'found']
-        total_cases = len(cases)
-
-        if total_cases > 0:
-            patterns['recovery_rates']['overall'] = round((len(found_cases) / total_cases) * 100, 2)
-
-            # Recovery rates by age group
-            age_recovery = {}
-            for age_group in patterns['age_groups']:
-                age_cases = [c for c in cases if get_age_group(c.age) == age_group]
-                age_found = [c for c in age_cases if c.status == 'found']
-                if age_cases:
-                    age_recovery[age_group] = round((len(age_found) / len(age_cases)) * 100, 2)
-
-            patterns['recovery_rates']['by_age'] = age_recovery
+        snapshot, stale = current_snapshot('demographics')
 
         return jsonify({
             'success': True,
-            'patterns': patterns
+            'patterns': snapshot.get('patterns', {}),
+            'stale': stale,
+            'data_version': snapshot.get('data_version'),
+            'computed_at': snapshot.get('computed_at')
         }), 200
 
     except Exception as e:
@@ -376,6 +206,89 @@ def get_demographics():
 
 # ==================== PREDICTIVE INSIGHTS ====================
 
+def compute_insights():
+    """Human-readable insights (stored as the 'insights' snapshot)"""
+    # Get risk zones
+    zones = db.session.execute(
+        db.select(RiskZone).order_by(RiskZone.risk_score.desc())
+    ).scalars().all()
+
+    # Get demographic patterns (in-memory case arrays)
+    patterns = case_arrays.refresh().demographic_patterns()
+
+    insights = []
+
+    # Risk zone insights
+    if zones:
+        high_risk_zones = [z for z in zones if z.risk_score > 70]
+        medium_risk_zones = [z for z in zones if 40 <= z.risk_score <= 70]
+
+        if high_risk_zones:
+            insights.append({
+                'type': 'high_risk',
+                'icon': '🔴',
+                'message': f"HIGH RISK: {len(high_risk_zones)} zones identified with elevated risk (score >70)"
+            })
+        if medium_risk_zones:
+            insights.append({
+                'type': 'medium_risk',
+                'icon': '🟡',
+                'message': f"MEDIUM RISK: {len(medium_risk_zones)} zones require monitoring (score 40-70)"
+            })
+
+    # Demographic insights
+    if patterns:
+        age_counter = patterns['age_groups']
+        time_counter = patterns['time_patterns']
+        location_counter = patterns['location_types']
+
+        # Most vulnerable age group
+        if age_counter:
+            most_vulnerable = max(age_counter.items(), key=lambda x: x[1])
+            insights.append({
+                'type': 'demographics',
+                'icon': '👶',
+                'message': f"DEMOGRAPHICS: {most_vulnerable[0]} age group has highest incident rate ({most_vulnerable[1]} cases)"
+            })
+
+        # Peak time
+        if time_counter:
+            peak_time = max(time_counter.items(), key=lambda x: x[1])
+            insights.append({
+                'type': 'timing',
+                'icon': '⏰',
+                'message': f"TIMING: Most incidents occur during {peak_time[0]} ({peak_time[1]} cases)"
+            })
+
+        # Common locations
+        if location_counter:
+            common_location = max(location_counter.items(), key=lambda x: x[1])
+            insights.append({
+                'type': 'locations',
+                'icon': '📍',
+                'message': f"LOCATIONS: {common_location[0]} areas account for most incidents ({common_location[1]} cases)"
+            })
+
+        # Recovery rate
+        recovery_rate = patterns['recovery_rates'].get('overall')
+
+        if recovery_rate is not None:
+            if recovery_rate > 80:
+                insights.append({
+                    'type': 'positive',
+                    'icon': '✅',
+                    'message': f"POSITIVE: High recovery rate of {recovery_rate:.1f}%"
+                })
+            elif recovery_rate < 50:
+                insights.append({
+                    'type': 'concern',
+                    'icon': '⚠️',
+                    'message': f"CONCERN: Low recovery rate of {recovery_rate:.1f}% - review response protocols"
+                })
+
+    return insights
+
+
 @app.route('/api/analytics/insights', methods=['GET'])
 @require_api_key
 def get_insights():
@@ -388,125 +301,265 @@ def get_insights():
     - Peak incident times
     - Common locations
     - Recovery rates
+
+    Served from the latest stored snapshot; when cases changed since (or on
+    ?refresh=1) the scheduler is asked to recompute it and 'stale' is set.
     """
     try:
-        # Get risk zones
-        zones = db.session.execute(
-            db.select(RiskZone).order_by(RiskZone.risk_score.desc())
-        ).scalars().all()
+        snapshot, stale = current_snapshot('insights')
+        insights = snapshot.get('insights', [])
 
-        # Get demographic patterns
-        cases = db.session.execute(db.select(MissingChild)).scalars().all()
+        return jsonify({
+            'success': True,
+            'insights': insights,
+            'count': len(insights),
+            'stale': stale,
+            'data_version': snapshot.get('data_version'),
+            'computed_at': snapshot.get('computed_at')
+        }), 200
 
-        insights = []
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to generate insights: {str(e)}',
+            'success': False
+        }), 500
 
-        # Risk zone insights
-        if zones:
-            high_risk_zones = [z for z in zones if z.risk_score > 70]
-            medium_risk_zones = [z for z in zones if 40 <= z.risk_score <= 70]
 
-            if high_risk_zones:
-                insights.append({
-                    'type': 'high_risk',
-                    'icon': '🔴',
-                    'message': f"HIGH RISK: {len(high_risk_zones)} zones identified with elevated risk (score >70)"
-                })
-            if medium_risk_zones:
-                insights.append({
-                    'type': 'medium_risk',
-                    'icon': '🟡',
-                    'message': f"MEDIUM RISK: {len(medium_risk_zones)} zones require monitoring (score 40-70)"
-                })
+# ==================== HEATMAP ====================
+
+def compute_heatmap():
+    """Time-decayed kernel density over case and sighting coordinates (stored as the 'heatmap' snapshot)"""
+    arrays = case_arrays.refresh()
+    geocoded = arrays.geocoded()
+    # Only geocoded sightings: pending/failed ones sit at the (0, 0) placeholder
+    sightings = db.session.execute(
+        db.select(Sighting.latitude, Sighting.longitude, Sighting.sighting_time)
+        .where(Sighting.geocode_status == DONE)
+    ).all()
+
+    now = calendar.timegm(datetime.utcnow().utctimetuple())
+    half_life = app.config['HEATMAP_HALF_LIFE_DAYS']
+    sighting_times = [calendar.timegm(s.sighting_time.utctimetuple()) if s.sighting_time else now for s in sightings]
+
+    lats = np.concatenate([arrays.lat[geocoded], [s.latitude for s in sightings]])
+    lngs = np.concatenate([arrays.lng[geocoded], [s.longitude for s in sightings]])
+    weights = np.concatenate([
+        decay_weights(arrays.reported[geocoded], now, half_life),
+        app.config['HEATMAP_SIGHTING_WEIGHT'] * decay_weights(sighting_times, now, half_life)
+    ])
+
+    heatmap = kde_grid(
+        lats, lngs, weights,
+        cell_km=app.config['HEATMAP_CELL_KM'],
+        bandwidth_km=app.config['HEATMAP_BANDWIDTH_KM']
+    )
+    return {
+        'heatmap': encode_grid(heatmap) if heatmap is not None else None,
+        'cases': int(len(geocoded)),
+        'sightings': len(sightings)
+    }
+
+
+@app.route('/api/analytics/heatmap', methods=['GET'])
+@require_api_key
+def get_heatmap():
+    """Heatmap metadata: extent, resolution, peak density and when it was computed"""
+    try:
+        heatmap, version = heatmap_tiles.current()
+        if heatmap is None:
+            analytics_scheduler.request('heatmap')
+            return jsonify({'success': True, 'heatmap': None, 'pending': True}), 200
 
-        # Demographic insights
-        if cases:
-            # Age group analysis
-            age_counter = Counter()
-            gender_counter = Counter()
-            time_counter = Counter()
-            location_counter = Counter()
-
-            for case in cases:
-                age_counter[get_age_group(case.age)] += 1
-                gender_counter[case.gender] += 1
-
-                hour = case.created_at.hour
-                if 6 <= hour < 12:
-                    time_counter['Morning (6-12)'] += 1
-                elif 12 <= hour < 18:
-                    time_counter['Afternoon (12-18)'] += 1
-                elif 18 <= hour < 24:
-                    time_counter['Evening (18-24)'] += 1
-                else:
-                    time_counter['Night (0-6)'] += 1
-
-                location = case.location.lower()
-                if any(word in location for word in ['park', 'playground']):
-                    location_counter['Parks/Playgrounds'] += 1
-                elif any(word in location for word in ['school', 'university']):
-                    location_counter['Educational'] += 1
-                elif any(word in location for word in ['mall', 'store', 'shop']):
-                    location_counter['Commercial'] += 1
-                elif any(word in location for word in ['home', 'house', 'residence']):
-                    location_counter['Residential'] += 1
-                else:
-                    location_counter['Other'] += 1
-
-            # Most vulnerable age group
-            if age_counter:
-                most_vulnerable = max(age_counter.items(), key=lambda x: x[1])
-                insights.append({
-                    'type': 'demographics',
-                    'icon': '👶',
-                    'message': f"DEMOGRAPHICS: {most_vulnerable[0]} age group has highest incident rate ({most_vulnerable[1]} cases)"
-                })
+        rows, cols = heatmap['grid'].shape
+        return jsonify({
+            'success': True,
+            'heatmap': {
+                'version': version,
+                'bounds': [
+                    [heatmap['min_lat'], heatmap['min_lng']],
+                    [heatmap['min_lat'] + rows * heatmap['lat_step'], heatmap['min_lng'] + cols * heatmap['lng_step']]
+                ],
+                'shape': [rows, cols],
+                'cell_km': heatmap['cell_km'],
+                'bandwidth_km': heatmap['bandwidth_km'],
+                'max': heatmap['max'],
+                'computed_at': heatmap['computed_at']
+            }
+        }), 200
 
-            # Peak time
-            if time_counter:
-                peak_time = max(time_counter.items(), key=lambda x: x[1])
-                insights.append({
-                    'type': 'timing',
-                    'icon': '⏰',
-                    'message': f"TIMING: Most incidents occur during {peak_time[0]} ({peak_time[1]} cases)"
-                })
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to fetch heatmap: {str(e)}',
+            'success': False
+        }), 500
 
-            # Common locations
-            if location_counter:
-                common_location = max(location_counter.items(), key=lambda x: x[1])
-                insights.append({
-                    'type': 'locations',
-                    'icon': '📍',
-                    'message': f"LOCATIONS: {common_location[0]} areas account for most incidents ({common_location[1]} cases)"
-                })
 
-            # Recovery rate
-            found_cases = [c for c in cases if c.status == 'found']
-            total_cases = len(cases)
-
-            if total_cases > 0:
-                recovery_rate = (len(found_cases) / total_cases) * 100
-                if recovery_rate > 80:
-                    insights.append({
-                        'type': 'positive',
-                        'icon': '✅',
-                        'message': f"POSITIVE: High recovery rate of {recovery_rate:.1f}%"
-                    })
-                elif recovery_rate < 50:
-                    insights.append({
-                        'type': 'concern',
-                        'icon': '⚠️',
-                        'message': f"CONCERN: Low recovery rate of {recovery_rate:.1f}% - review response protocols"
-                    })
+@app.route('/api/analytics/heatmap/tiles/<int:z>/<int:x>/<int:y>.json', methods=['GET'])
+@require_api_key
+def get_heatmap_tile(z, x, y):
+    """
+    One XYZ heatmap tile: {size, max, cells: [[row, col, density], ...]}
+
+    Rendered from the precomputed grid (cached), so the cost does not depend
+    on the number of incidents.
+    """
+    try:
+        if not 0 <= z <= 22:
+            return jsonify({'error': 'Invalid zoom level', 'success': False}), 400
+
+        tile = heatmap_tiles.tile(z, x, y)
+        if tile['version'] is None:
+            analytics_scheduler.request('heatmap')
+
+        response = jsonify({'success': True, **tile})
+        response.headers['Cache-Control'] = 'public, max-age=300'
+        return response, 200
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to render heatmap tile: {str(e)}',
+            'success': False
+        }), 500
+
+
+# ==================== HOTSPOTS ====================
+
+def compute_hotspot_snapshot():
+    """Space-time scan over recent cases and sightings (stored as the 'hotspots' snapshot)"""
+    now = datetime.utcnow()
+    since = now - timedelta(days=app.config['HOTSPOT_BASELINE_DAYS'])
+    arrays = case_arrays.refresh()
+    geocoded = arrays.geocoded()
+    # Only geocoded sightings: a burst of failed geocodes would pile up at the (0, 0) placeholder
+    sightings = db.session.execute(
+        db.select(Sighting.latitude, Sighting.longitude, Sighting.sighting_time)
+        .where(Sighting.geocode_status == DONE)
+        .where(Sighting.sighting_time >= since)
+    ).all()
+
+    return compute_hotspots(
+        (arrays.lat[geocoded], arrays.lng[geocoded], arrays.reported[geocoded]),
+        (
+            [s.latitude for s in sightings],
+            [s.longitude for s in sightings],
+            [calendar.timegm(s.sighting_time.utctimetuple()) for s in sightings]
+        ),
+        now=now,
+        cell_km=app.config['HOTSPOT_CELL_KM'],
+        bin_hours=app.config['HOTSPOT_BIN_HOURS'],
+        window_hours=app.config['HOTSPOT_WINDOW_HOURS'],
+        baseline_days=app.config['HOTSPOT_BASELINE_DAYS'],
+        replicates=app.config['HOTSPOT_REPLICATES']
+    )
+
+
+@app.route('/api/analytics/hotspots', methods=['GET'])
+@require_api_key
+def get_hotspots():
+    """
+    Emerging space-time clusters of cases and sightings
+
+    Served from the 'hotspots' snapshot, recomputed every HOTSPOT_REFRESH_MINUTES
+    by the scheduler; ?significant=1 keeps only hotspots with p <= 0.05.
+    """
+    try:
+        snapshot, _current = snapshots.peek('hotspots')
+        if snapshot is None:
+            analytics_scheduler.request('hotspots')
+            return jsonify({'success': True, 'hotspots': [], 'pending': True}), 200
+
+        hotspots = snapshot.get('hotspots', [])
+        if request.args.get('significant') == '1':
+            hotspots = [hotspot for hotspot in hotspots if hotspot['significant']]
 
         return jsonify({
             'success': True,
-            'insights': insights,
-            'count': len(insights)
+            'hotspots': hotspots,
+            'count': len(hotspots),
+            'cases': snapshot.get('cases'),
+            'sightings': snapshot.get('sightings'),
+            'as_of': snapshot.get('as_of'),
+            'parameters': snapshot.get('parameters'),
+            'computed_at': snapshot.get('computed_at')
         }), 200
 
     except Exception as e:
         return jsonify({
-            'error': f'Failed to generate insights: {str(e)}',
+            'error': f'Failed to fetch hotspots: {str(e)}',
+            'success': False
+        }), 500
+
+
+# ==================== SCHEDULED JOBS ====================
+
+def refresh_analytics():
+    """Full risk-zone rebuild, then fresh demographics/insights snapshots (scheduler job)"""
+    zones = risk_zone_maintainer.rebuild()
+    demographics = snapshots.get('demographics', lambda: {'patterns': compute_demographics()})
+    # Zone bookkeeping does not change the data version, so insights are forced
+    insights = snapshots.get('insights', lambda: {'insights': compute_insights()}, force=True)
+    return {
+        'zones': len(zones),
+        'insights': len(insights['insights']),
+        'data_version': demographics['data_version']
+    }
+
+
+def refresh_heatmap():
+    """Recompute the stored heatmap grid (scheduler job; sightings are not in the data version)"""
+    snapshot = snapshots.get('heatmap', compute_heatmap, force=True)
+    return {'cases': snapshot['cases'], 'sightings': snapshot['sightings'], 'data_version': snapshot['data_version']}
+
+
+def refresh_hotspots():
+    """Recompute the hotspot snapshot (scheduler job; windows end now, so it is always forced)"""
+    snapshot = snapshots.get('hotspots', compute_hotspot_snapshot, force=True)
+    return {'hotspots': len(snapshot['hotspots']), 'significant': snapshot['significant']}
+
+
+for job_name, job_fn in (('analytics', refresh_analytics), ('heatmap', refresh_heatmap)):
+    analytics_scheduler.add_job(
+        job_name, job_fn,
+        interval_seconds=app.config['ANALYTICS_REFRESH_INTERVAL_MINUTES'] * 60,
+        new_cases=app.config['ANALYTICS_REFRESH_NEW_CASES']
+    )
+analytics_scheduler.add_job('hotspots', refresh_hotspots, interval_seconds=app.config['HOTSPOT_REFRESH_MINUTES'] * 60)
+
+# Full recount of the case counters, in case anything changed cases around their triggers
+analytics_scheduler.add_job(
+    'case_counts', case_counters.reconcile,
+    interval_seconds=app.config['CASE_COUNT_RECONCILE_MINUTES'] * 60
+)
+
+
+def current_snapshot(analysis_type):
+    """
+    Latest stored snapshot without computing inline
+
+    Schedules a refresh when it is missing, out of date or ?refresh=1 was passed.
+
+    Returns:
+        tuple: (payload dict, empty if none yet; whether it is stale)
+    """
+    snapshot, current = snapshots.peek(analysis_type)
+    if not current or request.args.get('refresh') == '1':
+        analytics_scheduler.request('analytics')
+    return snapshot or {}, not current
+
+
+@app.route('/api/analytics/jobs', methods=['GET'])
+@require_api_key
+def get_jobs():
+    """Scheduled jobs: interval, lease holder and last run (duration, result)"""
+    try:
+        return jsonify({
+            'success': True,
+            'jobs': analytics_scheduler.status()
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to fetch jobs: {str(e)}',
             'success': False
         }), 500
 
@@ -526,9 +579,11 @@ def internal_error(e):
 
 # ==================== RUN SERVER ====================
 
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
+# Schema first: gunicorn imports this module without running __main__
+prepare_database(app)
+# Every worker polls, the job lease picks one to run each job
+analytics_scheduler.start()
 
+if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5005))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -3,8 +3,10 @@ Case Service - Handles CRUD operations for cases and sightings
 Port: 5001
 """
 import os
+import uuid
 from datetime import datetime
 from functools import wraps
+import requests
 from flask import Flask, request, jsonify
 from sqlalchemy import desc
 
@@ -12,7 +14,19 @@ from sqlalchemy import desc
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from shared.config import Config
-from shared.models import db, MissingChild, Sighting
+from shared.models import db, MissingChild, Sighting, RiskZone, SightingCandidate
+from shared.auth import get_service_headers
+from shared.database import prepare_database
+from shared.geocode_worker import BackgroundGeocoder, PENDING, DONE
+from shared.geocoding import GeocodeUnavailable
+from shared.risk_zones import RiskZoneMaintainer
+from shared.map_clusters import MapPointIndex
+from shared.spatial import nearby_cases
+from shared.sighting_matcher import SightingMatcher
+from shared.search_area import SearchAreaPredictor, to_geojson
+from shared.pagination import keyset_page, page_size
+from shared.search import CaseSearch
+from shared.case_counts import CaseCounters
 
 
 app = Flask(__name__)
@@ -38,6 +52,91 @@ def require_api_key(f):
     return decorated_function
 
 
+# ==================== BACKGROUND GEOCODING ====================
+
+def geocode_via_service(location_name):
+    """
+    Resolve a location through the Geocoding Service
+
+    Returns (None, None) only when the service says the location was not
+    found (404); outages, timeouts and other errors raise GeocodeUnavailable
+    so the background geocoder retries the row later.
+    """
+    try:
+        response = requests.get(
+            f"{app.config['GEOCODING_SERVICE_URL']}/api/geocode",
+            params={'location': location_name},
+            headers=get_service_headers(),
+            timeout=60
+        )
+    except requests.RequestException as e:
+        print(f"⚠️ Geocoding service error: {str(e)}")
+        raise GeocodeUnavailable(str(e)) from e
+
+    if response.status_code == 200:
+        data = response.json()
+        return data.get('lat'), data.get('lng')
+    if response.status_code == 404:
+        return None, None
+    print(f"⚠️ Geocoding service returned HTTP {response.status_code}")
+    raise GeocodeUnavailable(f'Geocoding service HTTP {response.status_code}')
+
+
+# Risk zones around a case are re-clustered whenever it is added, moved or deleted
+risk_zone_maintainer = RiskZoneMaintainer(
+    db, MissingChild, RiskZone,
+    radius_km=app.config['RISK_ZONE_RADIUS_KM'],
+    min_points=app.config['RISK_ZONE_MIN_CASES']
+)
+
+
+# Sightings are checked against the other missing cases last seen near them
+sighting_matcher = SightingMatcher(
+    db, MissingChild, Sighting, SightingCandidate,
+    radius_km=app.config['SIGHTING_MATCH_RADIUS_KM'],
+    window_days=app.config['SIGHTING_MATCH_WINDOW_DAYS'],
+    max_candidates=app.config['SIGHTING_MATCH_MAX_CANDIDATES']
+)
+
+
+def match_sighting(sighting):
+    """Queue other nearby missing cases for review; never fails the caller"""
+    try:
+        return sighting_matcher.match(sighting)
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Sighting matching failed for sighting {sighting.id}: {str(e)}")
+        return 0
+
+
+def on_location_resolved(kind, record):
+    """Background geocoder hook: a case or sighting just got coordinates"""
+    if kind == 'case':
+        risk_zone_maintainer.refresh_around([(record.last_seen_lat, record.last_seen_lng)])
+    else:
+        match_sighting(record)
+
+
+# Likely current location per case, refitted only when its sightings change
+search_area_predictor = SearchAreaPredictor(db, MissingChild, Sighting)
+
+# Full-text search (FTS5 / tsvector index kept in sync by database triggers)
+case_search = CaseSearch(db, MissingChild, Sighting)
+
+# Headline counts per status/day/area (counters kept by database triggers)
+case_counters = CaseCounters(db)
+
+
+# Map points are pre-clustered per zoom and rebuilt only when the case data version changes
+map_point_index = MapPointIndex(db, MissingChild)
+
+
+# Cases and sightings are saved first; coordinates are filled in afterwards
+background_geocoder = BackgroundGeocoder(
+    app, db, MissingChild, Sighting, geocode_via_service, on_resolved=on_location_resolved
+)
+
+
 # ==================== HEALTH CHECK ====================
 
 @app.route('/health', methods=['GET'])
@@ -68,26 +167,30 @@ def create_case():
     """
     Create a new missing child case
 
+    The case is stored immediately. If coordinates are not supplied the case is
+    marked geocode_status='pending' and resolved in the background.
+
     Expected JSON body:
     {
+        "report_id": "MC20260214...",  (optional, generated if missing)
         "name": "Child Name",
         "age": 7,
         "gender": "Male",
-        "location": "Location Name",
-        "lat": 18.5167,
-        "lng": 73.9282,
-        "photo_filename": "https://...",
-        "audio_filename": "https://...",  (optional)
+        "last_seen_location": "Location Name",
+        "location_subcategory": "Near gate 2",  (optional)
+        "last_seen_lat": 18.5167,  (optional)
+        "last_seen_lng": 73.9282,  (optional)
         "description": "Description",
-        "contact_info": "Contact details",
-        "last_seen": "2024-01-15T10:30:00Z"  (optional)
+        "photo_filename": "https://...",  (optional)
+        "audio_filename": "https://...",  (optional)
+        "emergency_contact": "Contact details"  (optional)
     }
     """
     try:
         data = request.get_json()
 
         # Validate required fields
-        required_fields = ['name', 'age', 'gender', 'location', 'photo_filename', 'description', 'contact_info']
+        required_fields = ['name', 'age', 'gender', 'last_seen_location', 'description']
         missing_fields = [f for f in required_fields if f not in data]
         if missing_fields:
             return jsonify({
@@ -95,49 +198,41 @@ def create_case():
                 'success': False
             }), 400
 
-        # Parse last_seen datetime if provided
-        last_seen = None
-        if 'last_seen' in data and data['last_seen']:
-            try:
-                last_seen = datetime.fromisoformat(data['last_seen'].replace('Z', '+00:00'))
-            except ValueError:
-                return jsonify({
-                    'error': 'Invalid last_seen datetime format. Use ISO 8601 format.',
-                    'success': False
-                }), 400
+        report_id = data.get('report_id') or f"MC{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
+        lat = data.get('last_seen_lat')
+        lng = data.get('last_seen_lng')
 
         # Create new case
         new_case = MissingChild(
+            report_id=report_id,
             name=data['name'],
             age=int(data['age']),
             gender=data['gender'],
-            location=data['location'],
-            lat=data.get('lat'),
-            lng=data.get('lng'),
-            photo_filename=data['photo_filename'],
-            audio_filename=data.get('audio_filename'),
+            last_seen_location=data['last_seen_location'],
+            location_subcategory=data.get('location_subcategory'),
+            last_seen_lat=lat,
+            last_seen_lng=lng,
             description=data['description'],
-            contact_info=data['contact_info'],
-            last_seen=last_seen or datetime.utcnow(),
-            status='missing'
+            photo_filename=data.get('photo_filename'),
+            audio_filename=data.get('audio_filename'),
+            emergency_contact=data.get('emergency_contact'),
+            status='missing',
+            geocode_status=DONE if lat is not None and lng is not None else PENDING
         )
 
         db.session.add(new_case)
         db.session.commit()
 
+        if new_case.geocode_status == PENDING:
+            background_geocoder.enqueue('case', new_case.id)
+        else:
+            risk_zone_maintainer.refresh_around([(lat, lng)])
+
         return jsonify({
             'success': True,
             'report_id': new_case.report_id,
             'message': 'Case created successfully',
-            'case': {
-                'report_id': new_case.report_id,
-                'name': new_case.name,
-                'age': new_case.age,
-                'gender': new_case.gender,
-                'location': new_case.location,
-                'status': new_case.status,
-                'created_at': new_case.created_at.isoformat()
-            }
+            'case': new_case.to_dict()
         }), 201
 
     except Exception as e:
@@ -152,64 +247,68 @@ def create_case():
 @require_api_key
 def get_all_cases():
     """
-    Get all cases with optional filters
+    One page of cases, newest first, with optional filters
+
+    Keyset pagination on (date_reported, id): pass the returned next_cursor
+    back as ?cursor= for the following page. Every page is a bounded index
+    scan, so its cost does not grow with the number of cases.
 
     Query parameters:
     - status: Filter by status (missing, found, closed)
-    - limit: Limit number of results (default: all)
-    - order_by: Sort field (created_at, last_seen) - default: created_at
+    - gender: Filter by gender
+    - reported_after, reported_before: ISO dates/datetimes bounding date_reported
+    - limit: Page size (default CASE_PAGE_SIZE, capped at CASE_PAGE_SIZE_MAX)
+    - cursor: next_cursor of the previous page
     - order: Sort direction (asc, desc) - default: desc
     """
     try:
-        # Get filter parameters
-        status_filter = request.args.get('status')
-        limit = request.args.get('limit', type=int)
-        order_by = request.args.get('order_by', 'created_at')
-        order_dir = request.args.get('order', 'desc')
-
-        # Build query
-        query = db.select(MissingChild)
-
-        # Apply status filter
-        if status_filter:
-            query = query.where(MissingChild.status == status_filter)
-
-        # Apply ordering
-        order_column = getattr(MissingChild, order_by, MissingChild.created_at)
-        if order_dir == 'desc':
-            query = query.order_by(desc(order_column))
-        else:
-            query = query.order_by(order_column)
+        limit = page_size(
+            request.args.get('limit', type=int),
+            default=app.config['CASE_PAGE_SIZE'],
+            maximum=app.config['CASE_PAGE_SIZE_MAX']
+        )
 
-        # Apply limit
-        if limit:
-            query = query.limit(limit)
+        # Build query; each case's sighting count is a correlated subquery of the page query
+        sighting_count = (db.select(db.func.count(Sighting.id))
+                          .where(Sighting.report_id == MissingChild.report_id)
+                          .scalar_subquery().label('sighting_count'))
+        query = db.select(MissingChild, sighting_count)
+        for param, column in (('status', MissingChild.status), ('gender', MissingChild.gender)):
+            if request.args.get(param):
+                query = query.where(column == request.args[param])
+        try:
+            if request.args.get('reported_after'):
+                query = query.where(MissingChild.date_reported >= datetime.fromisoformat(request.args['reported_after']))
+            if request.args.get('reported_before'):
+                query = query.where(MissingChild.date_reported < datetime.fromisoformat(request.args['reported_before']))
+        except ValueError:
+            return jsonify({
+                'error': 'reported_after/reported_before must be ISO dates',
+                'success': False
+            }), 400
 
-        # Execute query
-        cases = db.session.execute(query).scalars().all()
+        try:
+            rows, next_cursor = keyset_page(
+                db, query, MissingChild.date_reported, MissingChild.id,
+                cursor=request.args.get('cursor'),
+                limit=limit,
+                descending=request.args.get('order', 'desc') != 'asc'
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
 
-        # Format response
         cases_list = [{
-            'report_id': case.report_id,
-            'name': case.name,
-            'age': case.age,
-            'gender': case.gender,
-            'location': case.location,
-            'lat': case.lat,
-            'lng': case.lng,
-            'photo_filename': case.photo_filename,
-            'audio_filename': case.audio_filename,
-            'description': case.description,
-            'contact_info': case.contact_info,
-            'last_seen': case.last_seen.isoformat(),
-            'status': case.status,
-            'created_at': case.created_at.isoformat()
-        } for case in cases]
+            **case.to_dict(),
+            'sighting_count': count
+        } for case, count in rows]
 
         return jsonify({
             'success': True,
             'cases': cases_list,
-            'count': len(cases_list)
+            'count': len(cases_list),
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         }), 200
 
     except Exception as e:
@@ -219,6 +318,128 @@ def get_all_cases():
         }), 500
 
 
+@app.route('/api/cases/search', methods=['GET'])
+@require_api_key
+def search_cases():
+    """
+    Ranked full-text search over cases and their sightings
+
+    Matches name, description, last seen location/sub-location and sighting
+    descriptions; every word must match (as a prefix), name hits rank first.
+
+    Query parameters:
+    - q: Search text (required), e.g. "red jacket"
+    - status: Filter by status (missing, found, closed)
+    - limit: Page size (default CASE_PAGE_SIZE, capped at CASE_PAGE_SIZE_MAX)
+    - cursor: next_cursor of the previous page
+    """
+    try:
+        limit = page_size(
+            request.args.get('limit', type=int),
+            default=app.config['CASE_PAGE_SIZE'],
+            maximum=app.config['CASE_PAGE_SIZE_MAX']
+        )
+        try:
+            results, next_cursor = case_search.search(
+                request.args.get('q', ''),
+                status=request.args.get('status') or None,
+                cursor=request.args.get('cursor'),
+                limit=limit
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
+
+        return jsonify({
+            'success': True,
+            'query': request.args.get('q', ''),
+            'results': results,
+            'count': len(results),
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to search cases: {str(e)}',
+            'success': False
+        }), 500
+
+
+@app.route('/api/cases/map-points', methods=['GET'])
+@require_api_key
+def get_map_points():
+    """
+    Clustered case points for a map viewport
+
+    Query parameters:
+    - bbox: west,south,east,north in degrees (required)
+    - zoom: Map zoom level (required)
+
+    Returns only clusters ({lat, lng, count, missing, expansion_zoom}) and
+    single points ({id, lat, lng, status}) visible at that zoom.
+    """
+    try:
+        bbox = [float(value) for value in request.args.get('bbox', '').split(',')]
+        zoom = request.args.get('zoom', type=int)
+        if len(bbox) != 4 or zoom is None:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'bbox=west,south,east,north and zoom are required', 'success': False}), 400
+
+    try:
+        result = map_point_index.query(*bbox, zoom)
+        return jsonify({'success': True, **result}), 200
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to fetch map points: {str(e)}',
+            'success': False
+        }), 500
+
+
+@app.route('/api/cases/nearby', methods=['GET'])
+@require_api_key
+def get_nearby_cases():
+    """
+    Cases last seen near a point, nearest first
+
+    Query parameters:
+    - lat, lng: Point in degrees (required)
+    - radius_km: Search radius (default: 5, max: 50)
+    - status: Case status (default: missing, 'all' for any)
+    - limit: Max cases (default: 50, max: 200)
+
+    Uses the indexed geohash column: a few index range scans over the cells
+    covering the circle, then an exact distance filter.
+    """
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    radius_km = request.args.get('radius_km', 5.0, type=float)
+    if lat is None or lng is None or not -90 <= lat <= 90 or not -180 <= lng <= 180 or radius_km <= 0:
+        return jsonify({'error': 'Valid lat, lng and a positive radius_km are required', 'success': False}), 400
+
+    status = request.args.get('status', 'missing')
+    limit = max(request.args.get('limit', 50, type=int), 1)
+
+    try:
+        cases = nearby_cases(
+            db, MissingChild, lat, lng, radius_km,
+            status=None if status == 'all' else status, limit=limit
+        )
+        return jsonify({
+            'success': True,
+            'cases': cases,
+            'count': len(cases)
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to fetch nearby cases: {str(e)}',
+            'success': False
+        }), 500
+
+
 @app.route('/api/cases/<report_id>', methods=['GET'])
 @require_api_key
 def get_case(report_id):
@@ -259,6 +480,38 @@ def get_case(report_id):
         }), 500
 
 
+@app.route('/api/cases/<report_id>/search-area', methods=['GET'])
+@require_api_key
+def get_search_area(report_id):
+    """
+    Predicted current location of a missing child
+
+    Query parameters:
+    - format: json (default; includes the probability grid) or geojson
+              (trajectory, predicted point and search circles)
+
+    Speed and heading come from the last seen point and the geocoded
+    sightings in time order.
+    """
+    try:
+        area = search_area_predictor.predict(report_id)
+        if area is None:
+            return jsonify({
+                'error': 'Case not found',
+                'success': False
+            }), 404
+
+        if request.args.get('format') == 'geojson':
+            return jsonify(to_geojson(area)), 200
+        return jsonify({'success': True, **area}), 200
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to predict search area: {str(e)}',
+            'success': False
+        }), 500
+
+
 @app.route('/api/cases/<report_id>', methods=['PUT'])
 @require_api_key
 def update_case(report_id):
@@ -286,18 +539,27 @@ def update_case(report_id):
             }), 404
 
         data = request.get_json()
+        old_position = (case.last_seen_lat, case.last_seen_lng)
+        old_zone_id = case.risk_zone_id
+        old_age = case.age
 
         # Update allowed fields
         allowed_fields = [
-            'name', 'age', 'gender', 'location', 'lat', 'lng',
-            'photo_filename', 'audio_filename', 'description',
-            'contact_info', 'status'
+            'name', 'age', 'gender', 'last_seen_location', 'location_subcategory',
+            'last_seen_lat', 'last_seen_lng', 'photo_filename', 'audio_filename',
+            'description', 'emergency_contact', 'status'
         ]
 
         for field in allowed_fields:
             if field in data:
                 setattr(case, field, data[field])
 
+        # A new location without coordinates is resolved in the background
+        relocated = 'last_seen_location' in data and 'last_seen_lat' not in data
+        if relocated:
+            case.last_seen_lat, case.last_seen_lng = None, None
+            case.geocode_status = PENDING
+
         # Update last_seen if provided
         if 'last_seen' in data and data['last_seen']:
             try:
@@ -310,6 +572,13 @@ def update_case(report_id):
 
         db.session.commit()
 
+        new_position = (case.last_seen_lat, case.last_seen_lng)
+        if relocated:
+            background_geocoder.enqueue('case', case.id)
+        if new_position != old_position or case.age != old_age:
+            # Age feeds the zone risk score, position the clustering
+            risk_zone_maintainer.refresh_around([old_position, new_position], zone_ids=[old_zone_id])
+
         return jsonify({
             'success': True,
             'message': 'Case updated successfully',
@@ -340,7 +609,11 @@ def delete_case(report_id):
                 'success': False
             }), 404
 
-        # Delete associated sightings first (due to foreign key constraint)
+        old_position = (case.last_seen_lat, case.last_seen_lng)
+        old_zone_id = case.risk_zone_id
+
+        # Delete candidate links and sightings first (due to foreign key constraints)
+        sighting_matcher.forget_cases([report_id])
         db.session.execute(
             db.delete(Sighting).where(Sighting.report_id == report_id)
         )
@@ -349,6 +622,8 @@ def delete_case(report_id):
         db.session.delete(case)
         db.session.commit()
 
+        risk_zone_maintainer.refresh_around([old_position], zone_ids=[old_zone_id])
+
         return jsonify({
             'success': True,
             'message': 'Case deleted successfully'
@@ -383,7 +658,13 @@ def bulk_delete_cases():
                 'success': False
             }), 400
 
-        # Delete sightings first
+        deleted = db.session.execute(
+            db.select(MissingChild.last_seen_lat, MissingChild.last_seen_lng, MissingChild.risk_zone_id)
+            .where(MissingChild.report_id.in_(report_ids))
+        ).all()
+
+        # Delete candidate links and sightings first
+        sighting_matcher.forget_cases(report_ids)
         db.session.execute(
             db.delete(Sighting).where(Sighting.report_id.in_(report_ids))
         )
@@ -395,6 +676,11 @@ def bulk_delete_cases():
 
         db.session.commit()
 
+        risk_zone_maintainer.refresh_around(
+            [(row.last_seen_lat, row.last_seen_lng) for row in deleted],
+            zone_ids=[row.risk_zone_id for row in deleted]
+        )
+
         return jsonify({
             'success': True,
             'message': f'Deleted {result.rowcount} cases',
@@ -417,23 +703,26 @@ def create_sighting():
     """
     Create a new sighting report
 
+    The sighting is stored immediately. If coordinates are not supplied it is
+    marked geocode_status='pending' and resolved in the background.
+
     Expected JSON body:
     {
         "report_id": "MC202602140A1B2C3D",
         "location": "Sighting Location",
-        "lat": 18.5167,
-        "lng": 73.9282,
-        "sighting_photo": "https://...",
-        "description": "Sighting description",
-        "contact_info": "Reporter contact",
-        "match_score": 0.92  (optional, from face comparison)
+        "latitude": 18.5167,  (optional)
+        "longitude": 73.9282,  (optional)
+        "description": "Sighting description",  (optional)
+        "reporter_phone": "Reporter contact",  (optional)
+        "photo_filename": "https://...",  (optional)
+        "face_match_score": 92.0  (optional, from face comparison)
     }
     """
     try:
         data = request.get_json()
 
         # Validate required fields
-        required_fields = ['report_id', 'location', 'sighting_photo', 'description', 'contact_info']
+        required_fields = ['report_id', 'location']
         missing_fields = [f for f in required_fields if f not in data]
         if missing_fields:
             return jsonify({
@@ -452,32 +741,38 @@ def create_sighting():
                 'success': False
             }), 404
 
-        # Create sighting
+        lat = data.get('latitude')
+        lng = data.get('longitude')
+        resolved = lat is not None and lng is not None
+
+        # Create sighting (0, 0 placeholder until the background geocoder runs)
         new_sighting = Sighting(
             report_id=data['report_id'],
             location=data['location'],
-            lat=data.get('lat'),
-            lng=data.get('lng'),
-            sighting_photo=data['sighting_photo'],
-            description=data['description'],
-            contact_info=data['contact_info'],
-            match_score=data.get('match_score')
+            latitude=lat if resolved else 0,
+            longitude=lng if resolved else 0,
+            description=data.get('description'),
+            reporter_phone=data.get('reporter_phone'),
+            photo_filename=data.get('photo_filename'),
+            face_match_score=data.get('face_match_score'),
+            geocode_status=DONE if resolved else PENDING
         )
 
         db.session.add(new_sighting)
         db.session.commit()
 
+        candidates = 0
+        if new_sighting.geocode_status == PENDING:
+            background_geocoder.enqueue('sighting', new_sighting.id)
+        else:
+            candidates = match_sighting(new_sighting)
+
         return jsonify({
             'success': True,
             'sighting_id': new_sighting.id,
             'message': 'Sighting created successfully',
-            'sighting': {
-                'id': new_sighting.id,
-                'report_id': new_sighting.report_id,
-                'location': new_sighting.location,
-                'match_score': new_sighting.match_score,
-                'created_at': new_sighting.created_at.isoformat()
-            }
+            'sighting': new_sighting.to_dict(),
+            'candidate_cases': candidates
         }), 201
 
     except Exception as e:
@@ -537,40 +832,99 @@ def get_sightings(report_id):
         }), 500
 
 
-# ==================== STATS ENDPOINT ====================
+@app.route('/api/sighting-candidates', methods=['GET'])
+@require_api_key
+def get_sighting_candidates():
+    """
+    Other missing cases linked to sightings by proximity, for admin review
 
-@app.route('/api/stats', methods=['GET'])
+    Query parameters:
+    - report_id: Only links to this case (optional)
+    - status: pending, confirmed, dismissed or all (default: pending)
+    - limit: Max links (default: 50, max: 200)
+    """
+    status = request.args.get('status', 'pending')
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+
+    try:
+        candidates = sighting_matcher.candidates(
+            report_id=request.args.get('report_id'),
+            status=None if status == 'all' else status,
+            limit=limit
+        )
+        return jsonify({
+            'success': True,
+            'candidates': candidates,
+            'count': len(candidates)
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to fetch sighting candidates: {str(e)}',
+            'success': False
+        }), 500
+
+
+@app.route('/api/sighting-candidates/<int:candidate_id>', methods=['PUT'])
 @require_api_key
-def get_stats():
-    """Get case statistics"""
+def review_sighting_candidate(candidate_id):
+    """
+    Confirm or dismiss a candidate link
+
+    Expected JSON body:
+    {
+        "status": "confirmed"  (pending, confirmed or dismissed)
+    }
+    """
     try:
-        total_cases = db.session.execute(
-            db.select(db.func.count(MissingChild.id))
-        ).scalar()
+        data = request.get_json() or {}
+        candidate = sighting_matcher.review(candidate_id, data.get('status'))
+        if candidate is None:
+            return jsonify({
+                'error': 'Sighting candidate not found',
+                'success': False
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'candidate': candidate
+        }), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': f'Failed to review sighting candidate: {str(e)}',
+            'success': False
+        }), 500
+
 
-        missing_count = db.session.execute(
-            db.select(db.func.count(MissingChild.id))
-            .where(MissingChild.status == 'missing')
-        ).scalar()
+# ==================== STATS ENDPOINT ====================
 
-        found_count = db.session.execute(
-            db.select(db.func.count(MissingChild.id))
-            .where(MissingChild.status == 'found')
-        ).scalar()
+@app.route('/api/stats', methods=['GET'])
+@require_api_key
+def get_stats():
+    """
+    Get case statistics from the case counters (no COUNT over the cases table)
 
-        closed_count = db.session.execute(
-            db.select(db.func.count(MissingChild.id))
-            .where(MissingChild.status == 'closed')
-        ).scalar()
+    Query parameters:
+    - days: Also return cases reported per day over the last N days (by_day)
+    - areas: Also return the N areas with the most missing cases (by_area)
+    """
+    try:
+        stats = case_counters.status_counts()
+        days = request.args.get('days', type=int)
+        if days:
+            stats['by_day'] = case_counters.daily(days=min(days, 366))
+        areas = request.args.get('areas', type=int)
+        if areas:
+            stats['by_area'] = case_counters.areas(limit=min(areas, 200))
 
         return jsonify({
             'success': True,
-            'stats': {
-                'total': total_cases,
-                'missing': missing_count,
-                'found': found_count,
-                'closed': closed_count
-            }
+            'stats': stats
         }), 200
 
     except Exception as e:
@@ -595,9 +949,11 @@ def internal_error(e):
 
 # ==================== RUN SERVER ====================
 
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
+# Schema first: gunicorn imports this module without running __main__
+prepare_database(app)
+# Resume geocodes left pending by a restart (rows are claimed, so each is geocoded by one worker)
+background_geocoder.start()
 
+if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -3,52 +3,134 @@ Geocoding Microservice
 Handles location name to coordinate conversion using Google Maps API and Nominatim
 Port: 5004
 """
-from flask import Flask, jsonify, request
-from functools import lru_cache
+from flask import Flask, Response, jsonify, request, stream_with_context
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+import json
 import os
 import sys
 import time
-import threading
 
 # Add parent directory to path for shared imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
 
 from shared.config import Config
 from shared.auth import require_service_api_key
+from shared.geocode_cache import GeocodeCache, normalize_location
+from shared.gazetteer import get_gazetteer
+from shared.rate_limiter import SharedRateLimiter
+from shared.singleflight import SingleFlight
+from shared.geocoding import GeocodeUnavailable, HedgedGeocoder
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
-# Rate limiting for Nominatim API
-_last_geocode_request = 0
-_geocode_lock = threading.Lock()
-
-
-@lru_cache(maxsize=100)  # Cache 100 most recent locations
-def geocode_location(location_name):
+# Persistent geocode cache shared by all workers (and the monolith, if co-located)
+geocode_cache = GeocodeCache(
+    app.config['GEOCODE_CACHE_PATH'],
+    ttl_seconds=app.config['GEOCODE_CACHE_TTL_DAYS'] * 24 * 3600,
+    negative_ttl_seconds=app.config['GEOCODE_NEGATIVE_TTL_SECONDS']
+)
+
+# Identical concurrent lookups share one upstream request
+geocode_single_flight = SingleFlight(geocode_cache)
+
+# Races Google Maps / Nominatim and tracks per-provider health
+provider_geocoder = HedgedGeocoder(
+    min_hedge_delay=app.config['GEOCODE_HEDGE_MIN_DELAY_SECONDS'],
+    max_hedge_delay=app.config['GEOCODE_HEDGE_MAX_DELAY_SECONDS'],
+    failure_threshold=app.config['GEOCODE_CIRCUIT_FAILURE_THRESHOLD'],
+    open_seconds=app.config['GEOCODE_CIRCUIT_OPEN_SECONDS']
+)
+
+# Rate limiting for Nominatim API (shared by every worker via the cache file)
+nominatim_limiter = SharedRateLimiter(
+    app.config['GEOCODE_CACHE_PATH'],
+    'nominatim',
+    rate=app.config['NOMINATIM_RATE_LIMIT']
+)
+
+
+def geocode_location(location_name, nominatim_wait=None):
     """
     Get coordinates from location name using Google Maps (if configured) or Nominatim
 
     Args:
         location_name: Name of the location to geocode
+        nominatim_wait: Max seconds to queue for Nominatim (default NOMINATIM_MAX_WAIT_SECONDS)
 
     Returns:
         tuple: (latitude, longitude) or (None, None) if not found
+
+    Raises:
+        GeocodeUnavailable: no provider could answer right now
     """
     if not location_name:
         return None, None
 
-    # Try Google Maps first if API key is configured (more reliable)
-    lat, lng = _geocode_with_google_maps(location_name)
-    if lat and lng:
+    local = _lookup_local(location_name)
+    if local is not None:
+        return local
+
+    return _geocode_remote(location_name, nominatim_wait=nominatim_wait)
+
+
+def _lookup_local(location_name):
+    """
+    Resolve from the gazetteer or the shared cache without any network call
+
+    Returns:
+        tuple: (lat, lng), (None, None) for a cached "no match", or None if unknown locally
+    """
+    # Known localities resolve from the bundled gazetteer without any I/O
+    lat, lng = get_gazetteer().coordinates(location_name)
+    if lat is not None:
         return lat, lng
 
-    # Fallback to Nominatim (free but rate-limited)
-    return _geocode_with_nominatim(location_name)
+    # Check the shared cache before paying for an upstream round trip
+    return geocode_cache.get(location_name)
+
+
+def _geocode_remote(location_name, nominatim_wait=None):
+    """Resolve through the upstream providers, sharing one request per location"""
+    return geocode_single_flight.do(
+        location_name,
+        lambda: _geocode_with_providers(location_name, nominatim_wait=nominatim_wait)
+    )
+
+
+def _geocode_providers(nominatim_wait=None):
+    """Configured providers in preference order, as (name, fn) pairs"""
+    providers = []
+    # Google Maps first if an API key is configured (more reliable)
+    if app.config.get('GOOGLE_MAPS_API_KEY') or os.environ.get('GOOGLE_MAPS_API_KEY'):
+        providers.append(('google', _geocode_with_google_maps))
+    # Nominatim (free but rate-limited) as the fallback / hedge
+    providers.append(('nominatim', lambda name: _geocode_with_nominatim(name, max_wait=nominatim_wait)))
+    return providers
+
+
+def _geocode_with_providers(location_name, nominatim_wait=None):
+    """Race the configured providers and remember the answer, including a no-match"""
+    try:
+        lat, lng, provider = provider_geocoder.geocode(location_name, _geocode_providers(nominatim_wait))
+    except GeocodeUnavailable as e:
+        # Transient failure - don't cache or report "not found"; callers retry later
+        print(f"❌ No geocoding provider could answer for '{location_name}': {str(e)}")
+        raise
+
+    if lat is not None and lng is not None:
+        geocode_cache.set(location_name, lat, lng, provider=provider)
+    else:
+        geocode_cache.set_negative(location_name)
+    return lat, lng
 
 
 def _geocode_with_google_maps(location_name):
-    """Geocode using Google Maps API (optional, requires API key)"""
+    """
+    Geocode using Google Maps API (optional, requires API key)
+
+    Returns (None, None) for ZERO_RESULTS; raises GeocodeUnavailable on errors.
+    """
     import requests
 
     google_api_key = app.config.get('GOOGLE_MAPS_API_KEY') or os.environ.get('GOOGLE_MAPS_API_KEY')
@@ -73,29 +155,35 @@ def _geocode_with_google_maps(location_name):
             lng = location['lng']
             print(f"✅ Geocoded '{location_name}' to: {lat}, {lng} (Google Maps)")
             return lat, lng
-        else:
-            print(f"⚠️ Google Maps: No results for '{location_name}' (status: {data.get('status')})")
+        elif data['status'] == 'ZERO_RESULTS':
+            print(f"⚠️ Google Maps: No results for '{location_name}'")
             return None, None
+        else:
+            # OVER_QUERY_LIMIT, REQUEST_DENIED, UNKNOWN_ERROR, ...
+            print(f"❌ Google Maps error for '{location_name}' (status: {data.get('status')})")
+            raise GeocodeUnavailable(f"Google Maps status {data.get('status')}")
 
+    except GeocodeUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Google Maps geocoding error: {str(e)}")
-        return None, None
+        raise GeocodeUnavailable(str(e))
+
 
+def _geocode_with_nominatim(location_name, max_wait=None):
+    """
+    Geocode using Nominatim API with a shared rate limit and deadline-bounded retries
 
-def _geocode_with_nominatim(location_name):
-    """Geocode using Nominatim API with rate limiting and retry logic"""
+    Returns (None, None) only when Nominatim answered with no results; raises
+    GeocodeUnavailable when it could not answer at all.
+    """
     import requests
 
-    global _last_geocode_request
+    if max_wait is None:
+        max_wait = app.config['NOMINATIM_MAX_WAIT_SECONDS']
+    deadline = time.time() + max_wait
 
     try:
-        # Rate limiting: ensure at least 1 second between requests
-        with _geocode_lock:
-            time_since_last = time.time() - _last_geocode_request
-            if time_since_last < 1.0:
-                time.sleep(1.0 - time_since_last)
-            _last_geocode_request = time.time()
-
         location_encoded = location_name.strip().replace(' ', '+')
         url = f"https://nominatim.openstreetmap.org/search?format=json&q={location_encoded}&limit=1"
 
@@ -106,6 +194,11 @@ def _geocode_with_nominatim(location_name):
         # Retry logic with exponential backoff
         max_retries = 2
         for attempt in range(max_retries + 1):
+            # Rate limiting: wait for our turn in the cross-process queue, but never past the deadline
+            if not nominatim_limiter.acquire(timeout=deadline - time.time()):
+                print(f"⏳ Nominatim queue too long for '{location_name}', giving up")
+                raise GeocodeUnavailable('Nominatim rate limit queue full')
+
             try:
                 timeout = 15 if attempt == 0 else 20  # Increase timeout on retry
                 response = requests.get(url, headers=headers, timeout=timeout)
@@ -124,26 +217,114 @@ def _geocode_with_nominatim(location_name):
             except requests.exceptions.Timeout:
                 if attempt < max_retries:
                     wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s
+                    if time.time() + wait_time >= deadline:
+                        print(f"❌ Nominatim timeout for '{location_name}', no time left to retry")
+                        raise GeocodeUnavailable('Nominatim timeout')
                     print(f"⏱️ Nominatim timeout for '{location_name}', retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries + 1})")
                     time.sleep(wait_time)
                     continue
                 else:
                     print(f"❌ Nominatim timeout for '{location_name}' after {max_retries + 1} attempts")
-                    return None, None
+                    raise GeocodeUnavailable('Nominatim timeout')
 
             except requests.exceptions.HTTPError as e:
                 if e.response.status_code == 403:
                     print(f"❌ Nominatim rate limit (403) for '{location_name}'")
-                    # Wait longer on 403
+                    # Back off every worker at once instead of sleeping in this request thread
+                    nominatim_limiter.penalize(5)
                     if attempt < max_retries:
-                        time.sleep(5)
                         continue
                 print(f"❌ Nominatim HTTP error {e.response.status_code} for '{location_name}'")
-                return None, None
+                raise GeocodeUnavailable(f'Nominatim HTTP {e.response.status_code}')
 
+    except GeocodeUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Nominatim error for '{location_name}': {str(e)}")
-        return None, None
+        raise GeocodeUnavailable(str(e))
+
+
+# Batch Engine
+
+def iter_batch_geocode(locations, concurrency, deadline_seconds):
+    """
+    Geocode many locations, yielding one result per input as soon as it resolves
+
+    - Inputs are collapsed on their normalized form, so each distinct place
+      costs at most one upstream request however often it repeats
+    - Gazetteer/cache hits are answered first, without touching the network
+    - Misses fan out to a bounded thread pool; Google calls run concurrently
+      while Nominatim calls still queue on the shared cross-process limiter
+    - Anything unresolved when the deadline passes is reported with
+      error='deadline' so the caller can resubmit it (finished lookups are
+      cached by then, so resubmissions are cheap)
+
+    Yields:
+        dict: {"index", "location", "lat", "lng", "success", "source"[, "error"]}
+    """
+    deadline = time.time() + deadline_seconds
+
+    # Group input positions by normalized location
+    groups = {}
+    for index, location in enumerate(locations):
+        key = normalize_location(location) if isinstance(location, str) else ''
+        groups.setdefault(key, []).append(index)
+
+    def results_for(key, lat, lng, source, error=None):
+        for index in groups[key]:
+            result = {
+                'index': index,
+                'location': locations[index],
+                'lat': lat,
+                'lng': lng,
+                'success': lat is not None and lng is not None,
+                'source': source
+            }
+            if error:
+                result['error'] = error
+            yield result
+
+    remote_keys = []
+    for key, indices in groups.items():
+        if not key:
+            yield from results_for(key, None, None, 'invalid', error='Empty location')
+            continue
+        local = _lookup_local(locations[indices[0]])
+        if local is not None:
+            # Includes cached "no match" answers, which are final until they expire
+            yield from results_for(key, local[0], local[1], 'local')
+        else:
+            remote_keys.append(key)
+
+    if not remote_keys:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch-geocode')
+    futures = {
+        executor.submit(
+            _geocode_remote,
+            locations[groups[key][0]],
+            nominatim_wait=max(0.0, deadline - time.time())
+        ): key
+        for key in remote_keys
+    }
+    pending = set(remote_keys)
+    try:
+        for future in as_completed(futures, timeout=max(0.0, deadline - time.time())):
+            key = futures[future]
+            pending.discard(key)
+            try:
+                lat, lng = future.result()
+            except Exception as e:
+                yield from results_for(key, None, None, 'remote', error=str(e))
+                continue
+            yield from results_for(key, lat, lng, 'remote')
+    except FuturesTimeout:
+        for key in pending:
+            yield from results_for(key, None, None, 'remote', error='deadline')
+    finally:
+        # Queued lookups are dropped; in-flight ones finish and land in the cache
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 # API Routes
@@ -178,7 +359,14 @@ def geocode():
             'success': False
         }), 400
 
-    lat, lng = geocode_location(location)
+    try:
+        lat, lng = geocode_location(location)
+    except GeocodeUnavailable:
+        return jsonify({
+            'error': 'Geocoding is temporarily unavailable',
+            'success': False,
+            'location': location
+        }), 503
 
     if lat and lng:
         return jsonify({
@@ -195,17 +383,91 @@ def geocode():
     }), 404
 
 
+@app.route('/api/geocode/suggest', methods=['GET'])
+@require_service_api_key
+def geocode_suggest():
+    """
+    Autocomplete location names from the offline gazetteer
+
+    Query Parameters:
+        q (str): Prefix typed so far
+        limit (int): Maximum suggestions (default 10, max 25)
+
+    Returns:
+        JSON: {"suggestions": [{"name": str, "lat": float, "lng": float}, ...], "success": bool}
+    """
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), 25)
+
+    if not query:
+        return jsonify({
+            'suggestions': [],
+            'success': True
+        })
+
+    suggestions = [{
+        'name': place['name'],
+        'lat': place['lat'],
+        'lng': place['lng']
+    } for place in get_gazetteer().suggest(query, limit=limit)]
+
+    return jsonify({
+        'suggestions': suggestions,
+        'success': True
+    })
+
+
+@app.route('/api/geocode/cache/stats', methods=['GET'])
+@require_service_api_key
+def geocode_cache_stats():
+    """
+    Report persistent cache hit/miss counters
+
+    Returns:
+        JSON: {"cache": {"hits": int, "misses": int, "hit_rate": float, "entries": int}, "success": bool}
+    """
+    return jsonify({
+        'cache': geocode_cache.stats(),
+        'success': True
+    })
+
+
+@app.route('/api/geocode/providers', methods=['GET'])
+@require_service_api_key
+def geocode_provider_stats():
+    """
+    Report per-provider health for this worker process
+
+    Returns:
+        JSON: {"providers": {name: {"state": str, "p50_ms": float, "p95_ms": float,
+               "error_rate": float, "hedged": int, ...}}, "success": bool}
+    """
+    return jsonify({
+        'providers': provider_geocoder.metrics(),
+        'success': True
+    })
+
+
 @app.route('/api/geocode/batch', methods=['POST'])
 @require_service_api_key
 def geocode_batch():
     """
     Geocode multiple locations in batch
 
+    Duplicate locations are geocoded once, misses are resolved concurrently
+    (GEOCODE_BATCH_CONCURRENCY) and the whole batch is bounded by
+    GEOCODE_BATCH_DEADLINE_SECONDS.
+
     Request Body:
         {"locations": ["location1", "location2", ...]}
 
+    Query Parameters:
+        stream (bool): Stream NDJSON lines as results resolve (also via Accept: application/x-ndjson)
+
     Returns:
         JSON: {"results": [{"location": str, "lat": float, "lng": float, "success": bool}, ...]}
+        NDJSON: one result object per line in completion order (with "index" into the input),
+                followed by a {"done": true, ...} summary line
     """
     data = request.get_json()
 
@@ -223,18 +485,44 @@ def geocode_batch():
             'success': False
         }), 400
 
-    results = []
-    for location in locations:
-        lat, lng = geocode_location(location)
-        results.append({
-            'location': location,
-            'lat': lat,
-            'lng': lng,
-            'success': lat is not None and lng is not None
-        })
+    max_locations = app.config['GEOCODE_BATCH_MAX_LOCATIONS']
+    if len(locations) > max_locations:
+        return jsonify({
+            'error': f'At most {max_locations} locations per batch',
+            'success': False
+        }), 400
+
+    results = iter_batch_geocode(
+        locations,
+        concurrency=app.config['GEOCODE_BATCH_CONCURRENCY'],
+        deadline_seconds=app.config['GEOCODE_BATCH_DEADLINE_SECONDS']
+    )
+
+    wants_stream = (
+        request.args.get('stream', '').lower() in ('1', 'true', 'yes') or
+        'application/x-ndjson' in request.headers.get('Accept', '')
+    )
+
+    if wants_stream:
+        def generate():
+            resolved = 0
+            for result in results:
+                resolved += 1 if result['success'] else 0
+                yield json.dumps(result) + '\n'
+            yield json.dumps({
+                'done': True,
+                'total': len(locations),
+                'resolved': resolved
+            }) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    ordered = [None] * len(locations)
+    for result in results:
+        ordered[result.pop('index')] = result
 
     return jsonify({
-        'results': results,
+        'results': ordered,
         'success': True
     })
 
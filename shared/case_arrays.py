@@ -0,0 +1,288 @@
+"""
+Columnar in-memory snapshot of cases for analytics
+One NumPy array per field (a few bytes per case instead of a full ORM object)
+loaded once per process and refreshed incrementally by an id/updated_at
+watermark; risk scoring and demographics run vectorized over it
+
+updated_at is stamped when a writer flushes, not when it commits, so a slow
+transaction can commit a row stamped before the watermark. Refreshes re-read
+an overlap window behind the watermark to catch those rows, and the whole
+snapshot is reloaded periodically as a backstop.
+"""
+import calendar
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from shared.demographics import (
+    AGE_GROUPS, DEFAULT_LOCATION_TYPES, NIGHT_BUCKET, OLDEST_AGE_GROUP, OTHER_LOCATION_TYPE, TIME_BUCKETS
+)
+from shared.gazetteer import get_gazetteer
+
+
+STATUS_CODES = {'missing': 0, 'found': 1, 'closed': 2}
+OTHER_STATUS = 3
+NO_AREA = -1
+
+
+def _timestamp(value):
+    """Naive-UTC datetime -> epoch seconds (0 when missing)"""
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return 0
+
+
+class CaseArrays:
+    """
+    Compact column store over MissingChild
+
+    Arrays (aligned, sorted by id):
+        ids, lat, lng (NaN when not geocoded), age, status (STATUS_CODES),
+        reported (epoch seconds), area (index into area_names or -1),
+        gender (index into genders), location_type (index into location_labels)
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        case_model: MissingChild model class
+        location_types: [(label, [keywords])] for the location-type buckets
+        overlap_seconds: how far behind the updated_at watermark refreshes re-read
+        reload_seconds: full reload when the last one is older than this (0 = never)
+    """
+
+    def __init__(self, db, case_model, location_types=DEFAULT_LOCATION_TYPES,
+                 overlap_seconds=60, reload_seconds=3600):
+        self.db = db
+        self.case_model = case_model
+        self.location_types = location_types
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.reload_seconds = reload_seconds
+        self.location_labels = [label for label, _words in location_types] + [OTHER_LOCATION_TYPE]
+        self.genders = []
+        self.area_names = []
+        self._gender_codes = {}
+        self._area_codes = {}
+        self._location_cache = {}
+        self._lock = threading.Lock()
+        self._watermark = None  # (max updated_at, max id) seen so far
+        self._loaded_at = None  # time.monotonic() of the last full reload
+        self._set_arrays(self._empty())
+
+    @staticmethod
+    def _empty():
+        return {
+            'ids': np.empty(0, dtype=np.int64),
+            'lat': np.empty(0, dtype=np.float64),
+            'lng': np.empty(0, dtype=np.float64),
+            'age': np.empty(0, dtype=np.int16),
+            'status': np.empty(0, dtype=np.int8),
+            'reported': np.empty(0, dtype=np.int64),
+            'area': np.empty(0, dtype=np.int16),
+            'gender': np.empty(0, dtype=np.int16),
+            'location_type': np.empty(0, dtype=np.int8),
+        }
+
+    def _set_arrays(self, arrays):
+        self.ids = arrays['ids']
+        self.lat = arrays['lat']
+        self.lng = arrays['lng']
+        self.age = arrays['age']
+        self.status = arrays['status']
+        self.reported = arrays['reported']
+        self.area = arrays['area']
+        self.gender = arrays['gender']
+        self.location_type = arrays['location_type']
+
+    def _arrays(self):
+        return {
+            'ids': self.ids, 'lat': self.lat, 'lng': self.lng, 'age': self.age, 'status': self.status,
+            'reported': self.reported, 'area': self.area, 'gender': self.gender,
+            'location_type': self.location_type
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ==================== LOADING ====================
+
+    def _select(self):
+        case = self.case_model
+        return self.db.select(
+            case.id, case.last_seen_lat, case.last_seen_lng, case.age, case.status,
+            case.date_reported, case.gender, case.last_seen_location, case.updated_at
+        )
+
+    def _code(self, codes, names, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def _classify_location(self, text):
+        """(location type index, area code) for a free-text location, memoized"""
+        cached = self._location_cache.get(text)
+        if cached is None:
+            lowered = (text or '').lower()
+            location_type = len(self.location_types)
+            for index, (_label, words) in enumerate(self.location_types):
+                if any(word in lowered for word in words):
+                    location_type = index
+                    break
+            place = get_gazetteer().lookup(text)
+            area_id = place.get('area_id') if place else None
+            area = self._code(self._area_codes, self.area_names, area_id) if area_id else NO_AREA
+            cached = self._location_cache[text] = (location_type, area)
+        return cached
+
+    def _columns(self, rows):
+        n = len(rows)
+        arrays = self._empty()
+        arrays['ids'] = np.fromiter((r.id for r in rows), dtype=np.int64, count=n)
+        arrays['lat'] = np.fromiter((np.nan if r.last_seen_lat is None else r.last_seen_lat for r in rows), dtype=np.float64, count=n)
+        arrays['lng'] = np.fromiter((np.nan if r.last_seen_lng is None else r.last_seen_lng for r in rows), dtype=np.float64, count=n)
+        arrays['age'] = np.fromiter((r.age for r in rows), dtype=np.int16, count=n)
+        arrays['status'] = np.fromiter((STATUS_CODES.get(r.status, OTHER_STATUS) for r in rows), dtype=np.int8, count=n)
+        arrays['reported'] = np.fromiter((_timestamp(r.date_reported) for r in rows), dtype=np.int64, count=n)
+        arrays['gender'] = np.fromiter(
+            (self._code(self._gender_codes, self.genders, r.gender) for r in rows), dtype=np.int16, count=n
+        )
+        classified = [self._classify_location(r.last_seen_location) for r in rows]
+        arrays['location_type'] = np.fromiter((c[0] for c in classified), dtype=np.int8, count=n)
+        arrays['area'] = np.fromiter((c[1] for c in classified), dtype=np.int16, count=n)
+        return arrays
+
+    def _advance_watermark(self, rows):
+        stamps = [r.updated_at for r in rows if r.updated_at is not None]
+        max_updated = max(stamps) if stamps else None
+        max_id = max((r.id for r in rows), default=0)
+        if self._watermark is not None:
+            old_updated, old_id = self._watermark
+            if old_updated is not None and (max_updated is None or old_updated > max_updated):
+                max_updated = old_updated
+            max_id = max(max_id, old_id)
+        self._watermark = (max_updated, max_id)
+
+    def reload(self):
+        """Load every case from scratch"""
+        with self._lock:
+            rows = self.db.session.execute(self._select().order_by(self.case_model.id)).all()
+            self._watermark = None
+            self._set_arrays(self._columns(rows))
+            self._advance_watermark(rows)
+            self._loaded_at = time.monotonic()
+        return self
+
+    def refresh(self):
+        """
+        Pull in cases inserted or updated since the last load
+
+        Rows past the id watermark or updated within the overlap window
+        behind the updated_at watermark are merged in place; the snapshot is
+        reloaded instead when it is older than reload_seconds or the row count
+        no longer matches (deletes).
+
+        Returns:
+            CaseArrays: self, for chaining
+        """
+        if self._watermark is None:
+            return self.reload()
+        if self.reload_seconds and time.monotonic() - self._loaded_at >= self.reload_seconds:
+            return self.reload()
+
+        case = self.case_model
+        with self._lock:
+            max_updated, max_id = self._watermark
+            changed = case.id > max_id
+            if max_updated is not None:
+                changed = changed | (case.updated_at >= max_updated - self.overlap)
+            # No ORDER BY: _merge re-sorts, and without it the OR is served by both indexes
+            rows = self.db.session.execute(self._select().where(changed)).all()
+
+            if rows:
+                self._merge(self._columns(rows))
+                self._advance_watermark(rows)
+
+            total = self.db.session.execute(self.db.select(self.db.func.count(case.id))).scalar()
+        if total != len(self.ids):
+            return self.reload()
+        return self
+
+    def _merge(self, fresh):
+        """Overwrite known ids in place, append new ones and keep the arrays sorted by id"""
+        current = self._arrays()
+        existing = np.isin(fresh['ids'], current['ids'])
+        if existing.any():
+            positions = np.searchsorted(current['ids'], fresh['ids'][existing])
+            for name, column in current.items():
+                column[positions] = fresh[name][existing]
+
+        added = ~existing
+        if added.any():
+            merged = {name: np.concatenate([current[name], fresh[name][added]]) for name in current}
+            order = np.argsort(merged['ids'], kind='stable')
+            current = {name: column[order] for name, column in merged.items()}
+        self._set_arrays(current)
+
+    # ==================== ANALYTICS ====================
+
+    def geocoded(self):
+        """Indices of cases that have coordinates"""
+        return np.flatnonzero(~(np.isnan(self.lat) | np.isnan(self.lng)))
+
+    def age_group_codes(self, indices=None):
+        """Age-group index per case (into age_group_labels())"""
+        ages = self.age if indices is None else self.age[indices]
+        bounds = np.array([max_age for max_age, _label in AGE_GROUPS])
+        return np.searchsorted(bounds, ages, side='left')
+
+    @staticmethod
+    def age_group_labels():
+        return [label for _max_age, label in AGE_GROUPS] + [OLDEST_AGE_GROUP]
+
+    def demographic_patterns(self):
+        """
+        Same output as shared.demographics.demographic_patterns, computed with bincount
+
+        Returns:
+            dict: age_groups, gender_distribution, time_patterns, location_types
+                  (Counter) and recovery_rates, or {} without cases
+        """
+        if not len(self.ids):
+            return {}
+
+        age_labels = self.age_group_labels()
+        age_codes = self.age_group_codes()
+        age_counts = np.bincount(age_codes, minlength=len(age_labels))
+        found = self.status == STATUS_CODES['found']
+        found_by_age = np.bincount(age_codes, weights=found, minlength=len(age_labels))
+
+        hours = (self.reported // 3600) % 24
+        time_labels = [label for _start, _end, label in TIME_BUCKETS] + [NIGHT_BUCKET]
+        time_codes = np.full(len(hours), len(TIME_BUCKETS))
+        for index, (start, end, _label) in enumerate(TIME_BUCKETS):
+            time_codes[(hours >= start) & (hours < end)] = index
+        time_counts = np.bincount(time_codes, minlength=len(time_labels))
+
+        gender_counts = np.bincount(self.gender, minlength=len(self.genders))
+        location_counts = np.bincount(self.location_type, minlength=len(self.location_labels))
+
+        def nonzero(labels, counts):
+            return Counter({label: int(count) for label, count in zip(labels, counts) if count})
+
+        patterns = {
+            'age_groups': nonzero(age_labels, age_counts),
+            'gender_distribution': nonzero(self.genders, gender_counts),
+            'time_patterns': nonzero(time_labels, time_counts),
+            'location_types': nonzero(self.location_labels, location_counts),
+            'recovery_rates': {
+                'overall': round(float(found.sum()) / len(self.ids) * 100, 2),
+                'by_age': {
+                    label: round(float(found_by_age[i]) / age_counts[i] * 100, 2)
+                    for i, label in enumerate(age_labels) if age_counts[i]
+                }
+            }
+        }
+        return patterns
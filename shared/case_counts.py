@@ -0,0 +1,101 @@
+"""
+Case counters
+Headline numbers (cases per status, per day reported, per area) are read
+from the small case_count table instead of counting missing_child rows.
+Database triggers (schema migration 3, see shared/migrations.py) keep the
+counters in step with every insert, status change and delete in the writer's
+own transaction; reconcile() recomputes them from the cases periodically in
+case anything wrote around the triggers (restores, manual edits).
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from shared.geo import geohash_decode
+from shared.migrations import case_count_rebuild_select
+
+
+STATUSES = ('missing', 'found', 'closed')
+
+
+class CaseCounters:
+    """
+    Reads and reconciles the case counters
+
+    Args:
+        db: Flask-SQLAlchemy instance (schema migration 3 applied)
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _grouped(self, dimension, status=None, where='', params=None, order='bucket', limit=None):
+        sql = f"SELECT bucket, sum(cases) AS cases FROM case_count WHERE dimension = :dimension{where}"
+        params = dict(params or {}, dimension=dimension)
+        if status:
+            sql += " AND status = :status"
+            params['status'] = status
+        sql += f" GROUP BY bucket HAVING sum(cases) > 0 ORDER BY {order}"
+        if limit:
+            sql += " LIMIT :limit"
+            params['limit'] = limit
+        return self.db.session.execute(text(sql), params).all()
+
+    def status_counts(self):
+        """{'total': n, 'missing': n, 'found': n, 'closed': n, ...} in one query on the counters"""
+        rows = self.db.session.execute(text(
+            "SELECT status, sum(cases) AS cases FROM case_count WHERE dimension = 'all' GROUP BY status"
+        )).all()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update({row.status: int(row.cases) for row in rows if row.status and row.cases})
+        counts['total'] = sum(int(row.cases) for row in rows)
+        return counts
+
+    def daily(self, days=30, status=None):
+        """Cases reported per day over the last days (oldest first; days without cases omitted)"""
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        rows = self._grouped('day', status, " AND bucket >= :since", {'since': since})
+        return [{'date': row.bucket, 'cases': int(row.cases)} for row in rows]
+
+    def areas(self, limit=20, status='missing'):
+        """Areas (geohash cells) with the most cases, with the cell centre and [[south, west], [north, east]] bounds"""
+        rows = self._grouped('area', status, " AND bucket <> ''", order='cases DESC, bucket', limit=limit)
+        areas = []
+        for row in rows:
+            lat, lng, lat_error, lng_error = geohash_decode(row.bucket)
+            areas.append({
+                'geohash': row.bucket,
+                'lat': round(lat, 5),
+                'lng': round(lng, 5),
+                'bounds': [[round(lat - lat_error, 5), round(lng - lng_error, 5)],
+                           [round(lat + lat_error, 5), round(lng + lng_error, 5)]],
+                'cases': int(row.cases)
+            })
+        return areas
+
+    def reconcile(self):
+        """
+        Recompute every counter from missing_child and replace the stored ones (scheduler job)
+
+        Returns:
+            dict: number of counters and how many of them had drifted
+        """
+        dialect = self.db.engine.dialect.name
+        counters = text("SELECT dimension, bucket, status, cases FROM case_count WHERE cases <> 0")
+        with self.db.engine.begin() as conn:
+            if dialect == 'postgresql':
+                # Writers' trigger updates wait for the rebuild instead of being lost in it
+                conn.execute(text("LOCK TABLE case_count IN EXCLUSIVE MODE"))
+            stored = {tuple(row[:3]): row[3] for row in conn.execute(counters)}
+            # On SQLite the DELETE takes the write lock, so no case changes until the rebuild commits
+            conn.execute(text("DELETE FROM case_count"))
+            conn.execute(text(
+                "INSERT INTO case_count (dimension, bucket, status, cases) " + case_count_rebuild_select(dialect)
+            ))
+            actual = {tuple(row[:3]): row[3] for row in conn.execute(counters)}
+
+        drifted = sum(stored.get(key, 0) != count for key, count in actual.items())
+        drifted += sum(key not in actual for key in stored)
+        if drifted:
+            print(f"🔧 Reconciled {drifted} drifted case counters")
+        return {'counters': len(actual), 'drifted': drifted}
@@ -0,0 +1,166 @@
+"""
+Grid-indexed DBSCAN for risk-zone detection
+Points are bucketed into a uniform lat/lng grid whose cells are small enough
+that any two points in the same cell are within the radius, so distances are
+only ever computed against neighbouring cells (NumPy-vectorized haversine)
+instead of between every pair of cases
+"""
+import math
+
+import numpy as np
+
+from shared.geo import KM_PER_DEGREE, haversine_matrix
+
+
+MAX_BLOCK = 2_000_000  # Max distance-matrix entries computed at once
+NOISE = -1
+
+
+class _Grid:
+    """Uniform grid over the points with cell diagonal <= eps_km"""
+
+    def __init__(self, lats, lngs, eps_km):
+        abs_lat = np.abs(lats)
+        # Size longitude cells for the widest row (closest to the equator) so no
+        # cell is wider than eps/sqrt(2) anywhere in the data
+        widest_cos = max(math.cos(math.radians(float(abs_lat.min()))), 1e-6)
+        narrowest_cos = max(math.cos(math.radians(min(float(abs_lat.max()), 89.0))), 1e-6)
+        side_km = eps_km / math.sqrt(2) * 0.999
+        self.lat_step = side_km / KM_PER_DEGREE
+        self.lng_step = side_km / (KM_PER_DEGREE * widest_cos)
+
+        # How many cells away a point within eps can be
+        self.lat_reach = int(math.ceil(eps_km / side_km))
+        self.lng_reach = int(math.ceil(eps_km / (side_km * narrowest_cos / widest_cos)))
+
+        rows = np.floor(lats / self.lat_step).astype(np.int64)
+        cols = np.floor(lngs / self.lng_step).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        keys = np.stack([rows[order], cols[order]], axis=1)
+        boundaries = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(order)]])
+
+        self.cells = {
+            (int(keys[start, 0]), int(keys[start, 1])): order[start:end]
+            for start, end in zip(starts, ends)
+        }
+
+    def neighbours(self, cell, include_self=True):
+        """Keys of occupied cells that may hold points within eps of this cell"""
+        row, col = cell
+        for d_row in range(-self.lat_reach, self.lat_reach + 1):
+            for d_col in range(-self.lng_reach, self.lng_reach + 1):
+                if not include_self and d_row == 0 and d_col == 0:
+                    continue
+                key = (row + d_row, col + d_col)
+                if key in self.cells:
+                    yield key
+
+
+def _any_within(lats, lngs, a, b, eps_km):
+    """Whether any point in index set a lies within eps of any point in b"""
+    step = max(1, MAX_BLOCK // max(len(b), 1))
+    for start in range(0, len(a), step):
+        rows = a[start:start + step]
+        if (haversine_matrix(lats[rows], lngs[rows], lats[b], lngs[b]) <= eps_km).any():
+            return True
+    return False
+
+
+def dbscan(lats, lngs, eps_km=2.0, min_points=2):
+    """
+    Density-based clustering of coordinates
+
+    Args:
+        lats, lngs: Sequences of coordinates in degrees
+        eps_km: Neighbourhood radius in kilometres
+        min_points: Points (including itself) a point needs within eps_km to be a core point
+
+    Returns:
+        numpy.ndarray: cluster label per point (0, 1, ...) or -1 for noise
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    n = len(lats)
+    labels = np.full(n, NOISE, dtype=np.int64)
+    if n == 0:
+        return labels
+
+    grid = _Grid(lats, lngs, eps_km)
+    core = np.zeros(n, dtype=bool)
+
+    # 1. Core points. A cell holding min_points or more points is all core
+    #    (every pair inside a cell is within eps); sparse cells count their
+    #    neighbours in the surrounding cells.
+    for cell, members in grid.cells.items():
+        if len(members) >= min_points:
+            core[members] = True
+            continue
+        candidates = np.concatenate([grid.cells[key] for key in grid.neighbours(cell)])
+        counts = (haversine_matrix(lats[members], lngs[members], lats[candidates], lngs[candidates]) <= eps_km).sum(axis=1)
+        core[members[counts >= min_points]] = True
+
+    # 2. Connect cells whose core points are within eps of each other (union-find over cells)
+    core_cells = {}
+    for cell, members in grid.cells.items():
+        cell_core = members[core[members]]
+        if len(cell_core):
+            core_cells[cell] = cell_core
+
+    parent = {cell: cell for cell in core_cells}
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for cell, cell_core in core_cells.items():
+        for other in grid.neighbours(cell, include_self=False):
+            if other not in core_cells or other < cell:
+                continue
+            root, other_root = find(cell), find(other)
+            if root != other_root and _any_within(lats, lngs, cell_core, core_cells[other], eps_km):
+                parent[other_root] = root
+
+    # Number clusters in order of their lowest point index, so output is stable
+    first_index = {}
+    for cell, cell_core in core_cells.items():
+        root = find(cell)
+        first_index[root] = min(first_index.get(root, n), int(cell_core.min()))
+    cluster_ids = {root: i for i, root in enumerate(sorted(first_index, key=first_index.get))}
+    for cell, cell_core in core_cells.items():
+        labels[cell_core] = cluster_ids[find(cell)]
+
+    # 3. Border points join the cluster of their nearest core point within eps
+    for cell, members in grid.cells.items():
+        border = members[~core[members]]
+        if not len(border):
+            continue
+        candidates = [core_cells[key] for key in grid.neighbours(cell) if key in core_cells]
+        if not candidates:
+            continue
+        candidates = np.concatenate(candidates)
+        distances = haversine_matrix(lats[border], lngs[border], lats[candidates], lngs[candidates])
+        nearest = distances.argmin(axis=1)
+        reachable = distances[np.arange(len(border)), nearest] <= eps_km
+        labels[border[reachable]] = labels[candidates[nearest[reachable]]]
+
+    return labels
+
+
+def cluster_members(labels):
+    """
+    Group point indices by cluster label, noise dropped
+
+    Returns:
+        list: one index array per cluster, in label order
+    """
+    labels = np.asarray(labels)
+    clustered = np.flatnonzero(labels != NOISE)
+    if not len(clustered):
+        return []
+    order = clustered[np.argsort(labels[clustered], kind='stable')]
+    boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+    return np.split(order, boundaries)
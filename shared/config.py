@@ -47,6 +47,70 @@ class Config:
     # Google Maps API (optional - for better geocoding)
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
 
+    # Persistent geocode cache (SQLite file shared by all workers)
+    GEOCODE_CACHE_PATH = os.environ.get('GEOCODE_CACHE_PATH', os.path.join(os.path.dirname(basedir), 'geocode_cache.db'))
+    GEOCODE_CACHE_TTL_DAYS = int(os.environ.get('GEOCODE_CACHE_TTL_DAYS', '30'))
+    GEOCODE_NEGATIVE_TTL_SECONDS = int(os.environ.get('GEOCODE_NEGATIVE_TTL_SECONDS', '600'))
+
+    # Nominatim usage policy: max 1 request/second across all workers
+    NOMINATIM_RATE_LIMIT = float(os.environ.get('NOMINATIM_RATE_LIMIT', '1.0'))
+    NOMINATIM_MAX_WAIT_SECONDS = float(os.environ.get('NOMINATIM_MAX_WAIT_SECONDS', '10'))
+
+    # Provider hedging and circuit breaker: a slow primary gets a head start of
+    # its own p95 latency (clamped) before the next provider is raced against it
+    GEOCODE_HEDGE_MIN_DELAY_SECONDS = float(os.environ.get('GEOCODE_HEDGE_MIN_DELAY_SECONDS', '0.5'))
+    GEOCODE_HEDGE_MAX_DELAY_SECONDS = float(os.environ.get('GEOCODE_HEDGE_MAX_DELAY_SECONDS', '3'))
+    GEOCODE_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('GEOCODE_CIRCUIT_FAILURE_THRESHOLD', '5'))
+    GEOCODE_CIRCUIT_OPEN_SECONDS = float(os.environ.get('GEOCODE_CIRCUIT_OPEN_SECONDS', '30'))
+
+    # Risk zones: DBSCAN radius and minimum cases per zone
+    RISK_ZONE_RADIUS_KM = float(os.environ.get('RISK_ZONE_RADIUS_KM', '2.0'))
+    RISK_ZONE_MIN_CASES = int(os.environ.get('RISK_ZONE_MIN_CASES', '2'))
+
+    # Analytics scheduler: full risk-zone rebuild and snapshot refresh every interval
+    # or after N new cases, run by one worker at a time (DB lease in job_lock)
+    ANALYTICS_REFRESH_INTERVAL_MINUTES = float(os.environ.get('ANALYTICS_REFRESH_INTERVAL_MINUTES', '60'))
+    ANALYTICS_REFRESH_NEW_CASES = int(os.environ.get('ANALYTICS_REFRESH_NEW_CASES', '25'))
+    ANALYTICS_JOB_LEASE_SECONDS = float(os.environ.get('ANALYTICS_JOB_LEASE_SECONDS', '600'))
+    ANALYTICS_SCHEDULER_POLL_SECONDS = float(os.environ.get('ANALYTICS_SCHEDULER_POLL_SECONDS', '15'))
+
+    # In-memory case snapshot: re-read window behind the updated_at watermark
+    # (rows committed late) and full reload interval
+    CASE_ARRAYS_OVERLAP_SECONDS = float(os.environ.get('CASE_ARRAYS_OVERLAP_SECONDS', '60'))
+    CASE_ARRAYS_RELOAD_MINUTES = float(os.environ.get('CASE_ARRAYS_RELOAD_MINUTES', '60'))
+
+    # Risk heatmap (KDE over cases and sightings, recomputed by the scheduler)
+    HEATMAP_CELL_KM = float(os.environ.get('HEATMAP_CELL_KM', '0.25'))
+    HEATMAP_BANDWIDTH_KM = float(os.environ.get('HEATMAP_BANDWIDTH_KM', '1.0'))
+    HEATMAP_HALF_LIFE_DAYS = float(os.environ.get('HEATMAP_HALF_LIFE_DAYS', '90'))
+    HEATMAP_SIGHTING_WEIGHT = float(os.environ.get('HEATMAP_SIGHTING_WEIGHT', '0.5'))
+
+    # Space-time hotspots (scan statistic over cases and sightings, recomputed every few minutes)
+    HOTSPOT_CELL_KM = float(os.environ.get('HOTSPOT_CELL_KM', '1.0'))
+    HOTSPOT_BIN_HOURS = float(os.environ.get('HOTSPOT_BIN_HOURS', '6'))
+    HOTSPOT_WINDOW_HOURS = float(os.environ.get('HOTSPOT_WINDOW_HOURS', '72'))
+    HOTSPOT_BASELINE_DAYS = float(os.environ.get('HOTSPOT_BASELINE_DAYS', '28'))
+    HOTSPOT_REPLICATES = int(os.environ.get('HOTSPOT_REPLICATES', '99'))
+    HOTSPOT_REFRESH_MINUTES = float(os.environ.get('HOTSPOT_REFRESH_MINUTES', '5'))
+
+    # Cross-case sighting matching: other missing cases last seen near a sighting
+    # (reported within the window of it) are queued for admin review
+    SIGHTING_MATCH_RADIUS_KM = float(os.environ.get('SIGHTING_MATCH_RADIUS_KM', '1.0'))
+    SIGHTING_MATCH_WINDOW_DAYS = float(os.environ.get('SIGHTING_MATCH_WINDOW_DAYS', '30'))
+    SIGHTING_MATCH_MAX_CANDIDATES = int(os.environ.get('SIGHTING_MATCH_MAX_CANDIDATES', '10'))
+
+    # Case listings: keyset pages on (date_reported, id)
+    CASE_PAGE_SIZE = int(os.environ.get('CASE_PAGE_SIZE', '50'))
+    CASE_PAGE_SIZE_MAX = int(os.environ.get('CASE_PAGE_SIZE_MAX', '200'))
+
+    # Case counters (status/day/area, kept by database triggers) are recomputed from the cases this often
+    CASE_COUNT_RECONCILE_MINUTES = float(os.environ.get('CASE_COUNT_RECONCILE_MINUTES', '60'))
+
+    # Batch geocoding (geocoding service)
+    GEOCODE_BATCH_CONCURRENCY = int(os.environ.get('GEOCODE_BATCH_CONCURRENCY', '8'))
+    GEOCODE_BATCH_MAX_LOCATIONS = int(os.environ.get('GEOCODE_BATCH_MAX_LOCATIONS', '5000'))
+    GEOCODE_BATCH_DEADLINE_SECONDS = float(os.environ.get('GEOCODE_BATCH_DEADLINE_SECONDS', '25'))
+
     # Telegram Bot (optional - for free alerts)
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
     TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID')
@@ -2,6 +2,7 @@
 Database initialization and helper functions
 """
 from shared.models import db
+from shared.migrations import apply_migrations
 from flask import Flask
 
 
@@ -30,6 +31,48 @@ def init_database(app: Flask):
             raise
 
 
+# (table, column, DDL type) for columns added after the initial schema
+ADDED_COLUMNS = [
+    ('sighting', 'face_match_score', 'FLOAT'),
+    ('missing_child', 'geocode_status', "VARCHAR(20) DEFAULT 'done'"),
+    ('sighting', 'geocode_status', "VARCHAR(20) DEFAULT 'done'"),
+    ('missing_child', 'risk_zone_id', 'INTEGER'),
+    ('missing_child', 'updated_at', 'TIMESTAMP'),
+    ('analytics', 'data_version', 'VARCHAR(100)'),
+    ('missing_child', 'geohash', 'VARCHAR(12)'),
+    ('sighting', 'geohash', 'VARCHAR(12)'),
+    ('missing_child', 'geocode_claimed_at', 'TIMESTAMP'),
+    ('sighting', 'geocode_claimed_at', 'TIMESTAMP'),
+]
+
+# (index, table, column) for indexes on added columns (create_all only indexes new tables)
+ADDED_INDEXES = [
+    ('ix_missing_child_geohash', 'missing_child', 'geohash'),
+    ('ix_sighting_geohash', 'sighting', 'geohash'),
+    ('ix_sighting_report_id', 'sighting', 'report_id'),
+]
+
+
+def prepare_database(app: Flask):
+    """
+    Create missing tables and apply every migration (run at import, so gunicorn workers do it too)
+
+    Each step is idempotent; when several workers start together, a step
+    another worker got to first fails harmlessly here and is already done.
+
+    Args:
+        app: Flask application instance
+    """
+    with app.app_context():
+        try:
+            db.create_all()
+            print("✅ Database tables created/verified")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Could not create tables (another worker may be creating them): {str(e)}")
+    migrate_database(app)
+
+
 def migrate_database(app: Flask):
     """
     Add missing columns to existing tables (migration helper)
@@ -41,22 +84,44 @@ def migrate_database(app: Flask):
         try:
             from sqlalchemy import inspect, text
             inspector = inspect(db.engine)
+            tables = inspector.get_table_names()
+
+            for table, column, ddl in ADDED_COLUMNS:
+                # Check if table exists
+                if table not in tables:
+                    print(f"⚠️ {table} table doesn't exist yet, skipping migration")
+                    continue
+
+                columns = [col['name'] for col in inspector.get_columns(table)]
 
-            # Check if sighting table exists
-            if 'sighting' not in inspector.get_table_names():
-                print("⚠️ Sighting table doesn't exist yet, skipping migration")
-                return
-
-            columns = [col['name'] for col in inspector.get_columns('sighting')]
-
-            if 'face_match_score' not in columns:
-                print("⚙️ Adding face_match_score column to sighting table...")
-                with db.engine.connect() as conn:
-                    conn.execute(text('ALTER TABLE sighting ADD COLUMN face_match_score FLOAT'))
-                    conn.commit()
-                print("✅ face_match_score column added")
-            else:
-                print("✅ face_match_score column already exists")
+                if column not in columns:
+                    print(f"⚙️ Adding {column} column to {table} table...")
+                    with db.engine.connect() as conn:
+                        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+                        conn.commit()
+                    print(f"✅ {column} column added")
+                else:
+                    print(f"✅ {column} column already exists")
+
+            for index, table, column in ADDED_INDEXES:
+                if table in tables:
+                    with db.engine.connect() as conn:
+                        conn.execute(text(f'CREATE INDEX IF NOT EXISTS {index} ON {table} ({column})'))
+                        conn.commit()
+
+            backfill_geohashes()
+            apply_migrations(db.engine)
         except Exception as e:
             print(f"⚠️ Migration error: {str(e)}")
             print("⚠️ If this persists, run migrate_db.py manually")
+
+
+def backfill_geohashes():
+    """Compute the geohash of cases and sightings stored before the column existed"""
+    from shared.models import MissingChild, Sighting
+    from shared.spatial import backfill_geohashes as backfill
+
+    cases = backfill(db, MissingChild, MissingChild.last_seen_lat, MissingChild.last_seen_lng, MissingChild.geohash)
+    sightings = backfill(db, Sighting, Sighting.latitude, Sighting.longitude, Sighting.geohash)
+    if cases or sightings:
+        print(f"✅ Geohash backfilled for {cases} cases and {sightings} sightings")
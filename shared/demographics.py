@@ -0,0 +1,110 @@
+"""
+Demographic analytics as SQL aggregates
+Age groups, gender, time of day, location type and recovery rates are bucketed
+with CASE expressions and counted with a single GROUP BY, so only a few
+hundred count rows ever leave the database however long the case history is
+"""
+from collections import Counter
+
+from sqlalchemy import case as sql_case, func, or_
+
+
+AGE_GROUPS = [
+    (5, '0-5 years'),
+    (10, '6-10 years'),
+    (15, '11-15 years'),
+]
+OLDEST_AGE_GROUP = '16+ years'
+
+TIME_BUCKETS = [
+    (6, 12, 'Morning (6-12)'),
+    (12, 18, 'Afternoon (12-18)'),
+    (18, 24, 'Evening (18-24)'),
+]
+NIGHT_BUCKET = 'Night (0-6)'
+
+# (label, keywords) checked in order against the lowercased location
+DEFAULT_LOCATION_TYPES = [
+    ('Parks/Playgrounds', ['park', 'playground']),
+    ('Educational', ['school', 'university', 'college']),
+    ('Commercial', ['mall', 'store', 'shop', 'market']),
+    ('Residential', ['home', 'house', 'residence']),
+]
+OTHER_LOCATION_TYPE = 'Other'
+
+
+def age_group_expression(case_model):
+    """SQL CASE mapping age to the age-group label"""
+    return sql_case(
+        *[(case_model.age <= max_age, label) for max_age, label in AGE_GROUPS],
+        else_=OLDEST_AGE_GROUP
+    )
+
+
+def time_of_day_expression(case_model):
+    """SQL CASE mapping the report hour to a time-of-day bucket"""
+    hour = func.extract('hour', case_model.date_reported)
+    return sql_case(
+        *[((hour >= start) & (hour < end), label) for start, end, label in TIME_BUCKETS],
+        else_=NIGHT_BUCKET
+    )
+
+
+def location_type_expression(case_model, location_types=DEFAULT_LOCATION_TYPES):
+    """SQL CASE mapping the last-seen location to a location type by keyword"""
+    location = func.lower(case_model.last_seen_location)
+    return sql_case(
+        *[(or_(*[location.like(f'%{word}%') for word in words]), label) for label, words in location_types],
+        else_=OTHER_LOCATION_TYPE
+    )
+
+
+def demographic_patterns(db, case_model, location_types=DEFAULT_LOCATION_TYPES):
+    """
+    Count cases per age group, gender, time of day and location type
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        case_model: MissingChild model class
+        location_types: [(label, [keywords])] for the location buckets
+
+    Returns:
+        dict: {"age_groups", "gender_distribution", "time_patterns",
+               "location_types": Counter, "recovery_rates": {"overall", "by_age"}}
+              or {} when there are no cases
+    """
+    age_group = age_group_expression(case_model).label('age_group')
+    time_of_day = time_of_day_expression(case_model).label('time_of_day')
+    location_type = location_type_expression(case_model, location_types).label('location_type')
+    found = func.sum(sql_case((case_model.status == 'found', 1), else_=0))
+
+    rows = db.session.execute(
+        db.select(age_group, case_model.gender, time_of_day, location_type, func.count(), found)
+        .group_by(age_group, case_model.gender, time_of_day, location_type)
+    ).all()
+
+    if not rows:
+        return {}
+
+    patterns = {
+        'age_groups': Counter(),
+        'gender_distribution': Counter(),
+        'time_patterns': Counter(),
+        'location_types': Counter(),
+        'recovery_rates': {}
+    }
+    found_by_age = Counter()
+    for age, gender, time_bucket, location, count, found_count in rows:
+        patterns['age_groups'][age] += count
+        patterns['gender_distribution'][gender] += count
+        patterns['time_patterns'][time_bucket] += count
+        patterns['location_types'][location] += count
+        found_by_age[age] += found_count or 0
+
+    total_cases = sum(patterns['age_groups'].values())
+    patterns['recovery_rates']['overall'] = round(sum(found_by_age.values()) / total_cases * 100, 2)
+    patterns['recovery_rates']['by_age'] = {
+        group: round(found_by_age[group] / count * 100, 2)
+        for group, count in patterns['age_groups'].items()
+    }
+    return patterns
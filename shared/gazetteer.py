@@ -0,0 +1,167 @@
+"""
+Offline gazetteer of the localities Sachet serves
+Resolves known place names and aliases to coordinates in-process (no
+network) and powers location autocomplete. Near-miss spellings are only ever
+suggested, never resolved: a fuzzy hit such as "Koregaon Park Mumbai" ->
+Pune's Koregaon Park would skip the real geocoders with wrong coordinates
+"""
+import json
+import os
+import re
+from collections import defaultdict
+
+
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer.json')
+SUGGEST_MIN_SCORE = 0.4  # Looser cut-off for typo-tolerant autocomplete
+
+
+def _key(text):
+    """Comparison key: lowercase alphanumerics separated by single spaces"""
+    text = (text or '').lower().replace("'", '')
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+
+def _trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """
+    In-memory index over place names and aliases
+
+    - exact: dict from normalized name/alias to place
+    - prefix: character trie over every name/alias and each of its word starts
+    - fuzzy: trigram inverted index scored with the Dice coefficient
+    """
+
+    def __init__(self, places, strip_suffixes=()):
+        self.places = places
+        self._suffixes = sorted({_key(s) for s in strip_suffixes if _key(s)}, key=len, reverse=True)
+        self._exact = {}
+        self._trie = {}
+        self._keys = []  # (key, place index, trigram count)
+        self._trigram_index = defaultdict(set)
+
+        for idx, place in enumerate(places):
+            for name in [place['name']] + place.get('aliases', []):
+                key = _key(name)
+                if not key:
+                    continue
+                self._exact.setdefault(key, idx)
+                key_id = len(self._keys)
+                grams = _trigrams(key)
+                self._keys.append((key, idx, len(grams)))
+                for gram in grams:
+                    self._trigram_index[gram].add(key_id)
+                # Index the full key and every word start, so "park" finds "Koregaon Park"
+                words = key.split(' ')
+                for start in range(len(words)):
+                    self._insert(' '.join(words[start:]), idx, rank=start)
+
+    @classmethod
+    def load(cls, path=DEFAULT_DATA_PATH):
+        """Build a gazetteer from a bundled JSON data file"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['places'], strip_suffixes=data.get('strip_suffixes', ()))
+
+    def _insert(self, key, idx, rank):
+        node = self._trie
+        for char in key:
+            node = node.setdefault(char, {})
+            # Best (lowest) rank seen for this place under this prefix
+            matches = node.setdefault('$', {})
+            if rank < matches.get(idx, rank + 1):
+                matches[idx] = rank
+
+    def _normalize(self, text):
+        key = _key(text)
+        # "Magarpatta, Pune, Maharashtra" -> "magarpatta"
+        changed = True
+        while changed and key:
+            changed = False
+            for suffix in self._suffixes:
+                if key != suffix and key.endswith(' ' + suffix):
+                    key = key[:-len(suffix) - 1].rstrip()
+                    changed = True
+        return key
+
+    def lookup(self, text):
+        """
+        Resolve free text to a known place by exact name or alias (after suffix normalisation)
+
+        Returns:
+            dict: place record ({id, name, lat, lng, ...}) or None
+        """
+        key = self._normalize(text)
+        if not key:
+            return None
+
+        idx = self._exact.get(key)
+        return self.places[idx] if idx is not None else None
+
+    def coordinates(self, text):
+        """Return (lat, lng) for a known place (exact name or alias only), or (None, None)"""
+        place = self.lookup(text)
+        if place:
+            return place['lat'], place['lng']
+        return None, None
+
+    def fuzzy(self, text, limit=5, min_score=0.0):
+        """Rank places by trigram similarity, returns [(place, score), ...]"""
+        key = _key(text)
+        grams = _trigrams(key) if key else set()
+        if not grams:
+            return []
+
+        shared = defaultdict(int)
+        for gram in grams:
+            for key_id in self._trigram_index.get(gram, ()):
+                shared[key_id] += 1
+
+        best = {}
+        for key_id, count in shared.items():
+            _candidate, idx, gram_count = self._keys[key_id]
+            score = 2.0 * count / (len(grams) + gram_count)
+            if score >= min_score and score > best.get(idx, 0.0):
+                best[idx] = score
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.places[idx], round(score, 3)) for idx, score in ranked]
+
+    def suggest(self, prefix, limit=10):
+        """
+        Autocomplete by prefix over names, aliases and word starts
+
+        Falls back to fuzzy matches when nothing shares the prefix (typos).
+        """
+        key = _key(prefix)
+        if not key:
+            return []
+
+        node = self._trie
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return [place for place, _score in self.fuzzy(key, limit=limit, min_score=SUGGEST_MIN_SCORE)]
+
+        matches = node.get('$', {})
+        ranked = sorted(matches.items(), key=lambda item: (item[1], len(self.places[item[0]]['name'])))
+        return [self.places[idx] for idx, _rank in ranked[:limit]]
+
+
+_gazetteer = None
+
+
+def get_gazetteer():
+    """Process-wide gazetteer loaded lazily from the bundled data file"""
+    global _gazetteer
+    if _gazetteer is None:
+        path = os.environ.get('GAZETTEER_PATH', DEFAULT_DATA_PATH)
+        try:
+            _gazetteer = Gazetteer.load(path)
+        except Exception as e:
+            print(f"⚠️ Gazetteer unavailable ({path}): {str(e)}")
+            _gazetteer = Gazetteer([])
+    return _gazetteer
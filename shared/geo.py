@@ -0,0 +1,173 @@
+"""
+Vectorized geo kernels shared by all services
+Great-circle distances (batch, one-to-many, pairwise), bounding-box
+prefilters, an equirectangular fast path for short distances and geohash
+encoding - all NumPy, so proximity features never loop over points in Python
+"""
+import math
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+MAX_LATITUDE = 89.0  # Longitude spans are computed no closer to the poles than this
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+_GEOHASH_INDEX = {char: i for i, char in enumerate(GEOHASH_ALPHABET)}
+
+
+# ==================== DISTANCES ====================
+
+def haversine(lats1, lngs1, lats2, lngs2):
+    """Great-circle distance in km, element-wise (inputs broadcast like NumPy arrays)"""
+    lat1 = np.radians(np.asarray(lats1, dtype=float))
+    lng1 = np.radians(np.asarray(lngs1, dtype=float))
+    lat2 = np.radians(np.asarray(lats2, dtype=float))
+    lng2 = np.radians(np.asarray(lngs2, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distances_from(lat, lng, lats, lngs):
+    """Distances in km from one point to many"""
+    return haversine(lat, lng, lats, lngs)
+
+
+def haversine_matrix(lats1, lngs1, lats2, lngs2):
+    """Pairwise great-circle distances in km, shape (len(lats1), len(lats2))"""
+    return haversine(
+        np.asarray(lats1, dtype=float)[:, None], np.asarray(lngs1, dtype=float)[:, None],
+        np.asarray(lats2, dtype=float)[None, :], np.asarray(lngs2, dtype=float)[None, :]
+    )
+
+
+def equirectangular(lats1, lngs1, lats2, lngs2):
+    """
+    Flat-earth approximation of the distance in km, element-wise
+
+    About 3x cheaper than haversine and within 0.1% below ~100 km (away from
+    the poles and the antimeridian); use it to rank or threshold nearby points.
+    """
+    lat1 = np.radians(np.asarray(lats1, dtype=float))
+    lat2 = np.radians(np.asarray(lats2, dtype=float))
+    d_lng = np.radians(np.asarray(lngs2, dtype=float) - np.asarray(lngs1, dtype=float))
+    x = d_lng * np.cos((lat1 + lat2) / 2)
+    return EARTH_RADIUS_KM * np.hypot(x, lat2 - lat1)
+
+
+# ==================== BOUNDING BOXES ====================
+
+def lng_degrees(km, lat):
+    """Longitude span of km at a latitude"""
+    return km / (KM_PER_DEGREE * math.cos(math.radians(min(abs(lat), MAX_LATITUDE))))
+
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) containing every point within radius_km of (lat, lng)"""
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lng = lng_degrees(radius_km, abs(lat) + d_lat)
+    return lat - d_lat, lat + d_lat, lng - d_lng, lng + d_lng
+
+
+def points_bounding_box(lats, lngs, margin_km=0.0):
+    """(min_lat, max_lat, min_lng, max_lng) around points, padded by margin_km"""
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    d_lat = margin_km / KM_PER_DEGREE
+    d_lng = lng_degrees(margin_km, float(np.abs(lats).max()) + d_lat)
+    return float(lats.min()) - d_lat, float(lats.max()) + d_lat, float(lngs.min()) - d_lng, float(lngs.max()) + d_lng
+
+
+def shrink_box(box, margin_km):
+    """box with margin_km trimmed from every side, None if nothing is left"""
+    min_lat, max_lat, min_lng, max_lng = box
+    d_lat = margin_km / KM_PER_DEGREE
+    d_lng = lng_degrees(margin_km, max(abs(min_lat), abs(max_lat)))
+    if min_lat + d_lat > max_lat - d_lat or min_lng + d_lng > max_lng - d_lng:
+        return None
+    return min_lat + d_lat, max_lat - d_lat, min_lng + d_lng, max_lng - d_lng
+
+
+def in_box(lats, lngs, box):
+    """Boolean mask of points inside (min_lat, max_lat, min_lng, max_lng)"""
+    min_lat, max_lat, min_lng, max_lng = box
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    return (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+
+
+def within_radius(lat, lng, lats, lngs, radius_km):
+    """
+    Indices and distances of points within radius_km of (lat, lng)
+
+    A bounding-box prefilter discards most points before the exact
+    haversine is computed on the rest.
+
+    Returns:
+        tuple: (indices into lats/lngs sorted by distance, distances in km)
+    """
+    candidates = np.flatnonzero(in_box(lats, lngs, bounding_box(lat, lng, radius_km)))
+    distances = distances_from(lat, lng, np.asarray(lats, dtype=float)[candidates], np.asarray(lngs, dtype=float)[candidates])
+    keep = distances <= radius_km
+    candidates, distances = candidates[keep], distances[keep]
+    order = np.argsort(distances, kind='stable')
+    return candidates[order], distances[order]
+
+
+# ==================== GEOHASH ====================
+
+def geohash_encode(lat, lng, precision=9):
+    """Geohash string of a point (precision 9 is about 5 m x 5 m)"""
+    return geohash_encode_many([lat], [lng], precision)[0]
+
+
+def geohash_encode_many(lats, lngs, precision=9):
+    """Geohash strings for arrays of points"""
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+
+    # Quantize each axis, then interleave (longitude first) into 5-bit characters
+    lat_q = np.minimum(((lats + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), (1 << lat_bits) - 1)
+    lng_q = np.minimum(((lngs + 180.0) / 360.0 * (1 << lng_bits)).astype(np.int64), (1 << lng_bits) - 1)
+    lat_q = np.maximum(lat_q, 0)
+    lng_q = np.maximum(lng_q, 0)
+
+    code = np.zeros(len(lats), dtype=np.int64)
+    for i in range(bits):
+        if i % 2 == 0:
+            bit = (lng_q >> (lng_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_q >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+
+    chars = np.array(list(GEOHASH_ALPHABET))
+    digits = np.stack([(code >> (5 * (precision - 1 - k))) & 31 for k in range(precision)], axis=1)
+    return [''.join(row) for row in chars[digits]]
+
+
+def geohash_bounds(geohash):
+    """(min_lat, max_lat, min_lng, max_lng) of a geohash cell"""
+    min_lat, max_lat, min_lng, max_lng = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = _GEOHASH_INDEX[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (min_lng + max_lng) / 2
+                min_lng, max_lng = (mid, max_lng) if bit else (min_lng, mid)
+            else:
+                mid = (min_lat + max_lat) / 2
+                min_lat, max_lat = (mid, max_lat) if bit else (min_lat, mid)
+            even = not even
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def geohash_decode(geohash):
+    """Centre of a geohash cell and its half-size: (lat, lng, lat_error, lng_error)"""
+    min_lat, max_lat, min_lng, max_lng = geohash_bounds(geohash)
+    return (min_lat + max_lat) / 2, (min_lng + max_lng) / 2, (max_lat - min_lat) / 2, (max_lng - min_lng) / 2
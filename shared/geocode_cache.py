@@ -0,0 +1,202 @@
+"""
+Persistent geocode cache shared by every worker process and service
+Backed by an on-disk SQLite file so gunicorn workers, redeploys and both the
+monolith and the geocoding service reuse the same resolved coordinates
+
+Hit/miss counters are kept in memory per process and added to the shared file
+at most every STATS_FLUSH_SECONDS (and when stats are read or the process
+exits), so a cache read never turns into a write transaction.
+"""
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600  # Place coordinates rarely change
+DEFAULT_NEGATIVE_TTL_SECONDS = 600  # "No match" answers are retried after 10 minutes
+PURGE_EVERY_N_WRITES = 200
+STATS_FLUSH_SECONDS = 30
+
+
+def normalize_location(location_name):
+    """
+    Normalize a free-text location so trivially different spellings share a key
+
+    Example: "  Magarpatta,  Pune " -> "magarpatta, pune"
+    """
+    if not location_name:
+        return ''
+    normalized = re.sub(r'\s+', ' ', location_name.strip().lower())
+    return normalized.strip(' .,;')
+
+
+class GeocodeCache:
+    """
+    SQLite-backed location -> (lat, lng) cache with TTL eviction and hit/miss counters
+
+    SQLite handles the cross-process locking, so any number of workers can
+    share one cache file. Connections are kept per thread. Unresolvable
+    locations are stored as (None, None) with a much shorter TTL.
+    """
+
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS, negative_ttl_seconds=DEFAULT_NEGATIVE_TTL_SECONDS,
+                 stats_flush_seconds=STATS_FLUSH_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.stats_flush_seconds = stats_flush_seconds
+        self._local = threading.local()
+        self._writes = 0
+        self._stats_lock = threading.Lock()
+        self._pending = {'hits': 0, 'misses': 0}  # Counted here, not yet in geocode_cache_stats
+        self._flushed_at = time.monotonic()
+        self._init_schema()
+        atexit.register(self.flush_stats)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                location_key TEXT PRIMARY KEY,
+                lat REAL,
+                lng REAL,
+                provider TEXT,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_geocode_cache_expires ON geocode_cache (expires_at)')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache_stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("INSERT OR IGNORE INTO geocode_cache_stats (name, value) VALUES ('hits', 0), ('misses', 0)")
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._pending[name] += 1
+            due = time.monotonic() - self._flushed_at >= self.stats_flush_seconds
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add this process's pending hit/miss counts to the shared counters (one statement)"""
+        with self._stats_lock:
+            pending = self._pending
+            self._pending = {'hits': 0, 'misses': 0}
+            self._flushed_at = time.monotonic()
+        if not any(pending.values()):
+            return
+        try:
+            self._connect().execute(
+                "UPDATE geocode_cache_stats SET value = value + CASE name WHEN 'hits' THEN ? ELSE ? END "
+                "WHERE name IN ('hits', 'misses')",
+                (pending['hits'], pending['misses'])
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Geocode cache stats error: {str(e)}")
+            with self._stats_lock:
+                for name, value in pending.items():
+                    self._pending[name] += value
+
+    def get(self, location_name, count_stats=True):
+        """
+        Look up a location
+
+        Returns:
+            tuple: (lat, lng) on a hit - (None, None) for a cached "no match" -
+                   or None on a miss / expired entry
+        """
+        key = normalize_location(location_name)
+        if not key:
+            return None
+
+        try:
+            row = self._connect().execute(
+                'SELECT lat, lng FROM geocode_cache WHERE location_key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Geocode cache read error: {str(e)}")
+            return None
+
+        if row is None:
+            if count_stats:
+                self._count('misses')
+            return None
+
+        if count_stats:
+            self._count('hits')
+        return row[0], row[1]
+
+    def set(self, location_name, lat, lng, provider=None, ttl_seconds=None):
+        """Store coordinates for a location, replacing any previous entry"""
+        key = normalize_location(location_name)
+        if not key:
+            return
+
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO geocode_cache (location_key, lat, lng, provider, created_at, expires_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, lat, lng, provider, now, now + ttl)
+            )
+            self._writes += 1
+            if self._writes % PURGE_EVERY_N_WRITES == 0:
+                self.purge_expired()
+        except sqlite3.Error as e:
+            print(f"⚠️ Geocode cache write error: {str(e)}")
+
+    def set_negative(self, location_name):
+        """Remember that no provider could resolve this location (short TTL)"""
+        self.set(location_name, None, None, provider='none', ttl_seconds=self.negative_ttl_seconds)
+
+    def purge_expired(self):
+        """Delete expired entries, returns the number of rows removed"""
+        try:
+            cursor = self._connect().execute('DELETE FROM geocode_cache WHERE expires_at <= ?', (time.time(),))
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"⚠️ Geocode cache purge error: {str(e)}")
+            return 0
+
+    def stats(self):
+        """Return hit/miss counters (as flushed by every process) and entry count"""
+        self.flush_stats()
+        conn = self._connect()
+        counters = dict(conn.execute('SELECT name, value FROM geocode_cache_stats').fetchall())
+        entries, negative_entries = conn.execute(
+            'SELECT COUNT(*), COUNT(*) - COUNT(lat) FROM geocode_cache WHERE expires_at > ?', (time.time(),)
+        ).fetchone()
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups * 100, 2) if lookups else 0.0,
+            'entries': entries,
+            'negative_entries': negative_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'negative_ttl_seconds': self.negative_ttl_seconds
+        }
@@ -0,0 +1,171 @@
+"""
+Background geocoding for case and sighting write paths
+Rows are saved immediately with geocode_status='pending'; a daemon thread
+resolves the coordinates afterwards so submit latency never depends on the
+geocoding providers. Every gunicorn worker runs one and re-queues the pending
+rows at startup; a worker claims a row (pending -> geocoding) with a single
+conditional UPDATE before geocoding it, so each row is geocoded only once
+
+Only a definite "no match" marks a row failed. When the providers cannot
+answer (outage, timeout) the claim is released back to pending, and every
+worker re-sweeps the claimable rows (pending, or claims abandoned for
+CLAIM_TIMEOUT) whenever its queue has been idle for a while; the idle delay
+doubles, up to MAX_SWEEP_INTERVAL, while the retries keep failing
+"""
+import queue
+import threading
+from datetime import datetime, timedelta
+
+
+PENDING = 'pending'
+IN_PROGRESS = 'geocoding'
+DONE = 'done'
+FAILED = 'failed'
+
+# A claim older than this is treated as abandoned (its worker died mid-geocode)
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+# Idle seconds before re-sweeping claimable rows, and the cap while retries keep failing
+SWEEP_INTERVAL = 60
+MAX_SWEEP_INTERVAL = 15 * 60
+
+
+class BackgroundGeocoder:
+    """
+    Fills in coordinates for pending MissingChild / Sighting rows off the request thread
+
+    Works with any Flask-SQLAlchemy app whose models follow the Sachet schema,
+    so the monolith and the case service share the same implementation.
+
+    Args:
+        app: Flask application (used for app contexts inside the worker thread)
+        db: Flask-SQLAlchemy instance bound to app
+        case_model: MissingChild model class
+        sighting_model: Sighting model class
+        geocode_fn: callable(location_name) -> (lat, lng), or (None, None) when the
+                    location is not found; raises when it cannot answer right now
+        on_resolved: optional callable(kind, record) run after coordinates are stored
+        sweep_interval: idle seconds before re-sweeping claimable rows
+        max_sweep_interval: cap on the sweep delay while retries keep failing
+    """
+
+    def __init__(self, app, db, case_model, sighting_model, geocode_fn, on_resolved=None,
+                 sweep_interval=SWEEP_INTERVAL, max_sweep_interval=MAX_SWEEP_INTERVAL):
+        self.app = app
+        self.db = db
+        self.case_model = case_model
+        self.sighting_model = sighting_model
+        self.geocode_fn = geocode_fn
+        self.on_resolved = on_resolved
+        self.sweep_interval = sweep_interval
+        self.max_sweep_interval = max_sweep_interval
+        self._sweep_delay = sweep_interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the worker thread (idempotent) and re-queue rows left pending by a restart"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='background-geocoder', daemon=True)
+            self._thread.start()
+        self.enqueue_pending()
+
+    def enqueue(self, kind, record_id):
+        """Queue a 'case' or 'sighting' row for geocoding"""
+        if self._thread is None:
+            self.start()
+        self._queue.put((kind, record_id))
+
+    def _claimable(self, model):
+        """Rows a worker may claim: pending, or claimed by a worker that never finished"""
+        return (model.geocode_status == PENDING) | (
+            (model.geocode_status == IN_PROGRESS) & (model.geocode_claimed_at < datetime.utcnow() - CLAIM_TIMEOUT)
+        )
+
+    def _claim(self, model, record_id):
+        """Atomically take a row for this worker; False if another worker has it or it is resolved"""
+        claimed = self.db.session.execute(
+            self.db.update(model)
+            .where(model.id == record_id, self._claimable(model))
+            .values(geocode_status=IN_PROGRESS, geocode_claimed_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        self.db.session.commit()
+        return claimed
+
+    def enqueue_pending(self):
+        """Queue every row still waiting for coordinates, returns how many were queued"""
+        queued = 0
+        try:
+            with self.app.app_context():
+                for kind, model in (('case', self.case_model), ('sighting', self.sighting_model)):
+                    ids = self.db.session.execute(
+                        self.db.select(model.id).where(self._claimable(model))
+                    ).scalars().all()
+                    for record_id in ids:
+                        self._queue.put((kind, record_id))
+                    queued += len(ids)
+        except Exception as e:
+            print(f"⚠️ Could not load pending geocodes: {str(e)}")
+        if queued:
+            print(f"🔄 Re-queued {queued} pending geocode jobs")
+        return queued
+
+    def pending_count(self):
+        """Number of jobs waiting in this process"""
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            try:
+                kind, record_id = self._queue.get(timeout=self._sweep_delay)
+            except queue.Empty:
+                # Picks up released rows and claims abandoned by a dead worker
+                self.enqueue_pending()
+                continue
+            try:
+                self._fill_coordinates(kind, record_id)
+                self._sweep_delay = self.sweep_interval
+            except Exception as e:
+                self._sweep_delay = min(self._sweep_delay * 2, self.max_sweep_interval)
+                print(f"⏳ Background geocode for {kind} {record_id} will be retried "
+                      f"(next sweep in {self._sweep_delay:.0f}s): {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _fill_coordinates(self, kind, record_id):
+        with self.app.app_context():
+            model = self.case_model if kind == 'case' else self.sighting_model
+            if not self._claim(model, record_id):
+                # Deleted meanwhile, or already handled by another worker
+                return
+            record = self.db.session.get(model, record_id)
+            if record is None:
+                return
+
+            location = record.last_seen_location if kind == 'case' else record.location
+            try:
+                lat, lng = self.geocode_fn(location)
+            except Exception:
+                # Providers could not answer - release the claim for the next sweep
+                record.geocode_status = PENDING
+                self.db.session.commit()
+                raise
+
+            if lat is not None and lng is not None:
+                if kind == 'case':
+                    record.last_seen_lat, record.last_seen_lng = lat, lng
+                else:
+                    record.latitude, record.longitude = lat, lng
+                record.geocode_status = DONE
+            else:
+                record.geocode_status = FAILED
+
+            self.db.session.commit()
+            print(f"📍 Background geocode {record.geocode_status} for {kind} {record_id}")
+
+            if record.geocode_status == DONE and self.on_resolved:
+                self.on_resolved(kind, record)
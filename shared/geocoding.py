@@ -0,0 +1,291 @@
+"""
+Geocoding provider plumbing shared by the monolith and the geocoding service
+- GeocodeUnavailable: a provider could not answer
+- ProviderHealth: per-provider latency/error metrics and circuit breaker
+- HedgedGeocoder: races providers so a slow primary never blocks a healthy secondary
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class GeocodeUnavailable(Exception):
+    """
+    A provider could not answer (timeout, HTTP error, rate-limit queue full)
+
+    Distinct from a definitive "no results" answer, which providers report as
+    (None, None): only the latter may be negatively cached.
+    """
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ProviderHealth:
+    """
+    Rolling latency window, error counters and circuit breaker for one provider
+
+    The circuit opens after failure_threshold consecutive failures and stays
+    open for open_seconds. After that a single trial call is let through
+    (half-open): success closes the circuit, failure re-opens it.
+
+    Metrics are per process - each gunicorn worker keeps its own view.
+    """
+
+    def __init__(self, name, failure_threshold=5, open_seconds=30.0, window=200):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._consecutive_failures = 0
+        self.calls = 0
+        self.successes = 0
+        self.no_results = 0
+        self.failures = 0
+        self.rejected = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.last_error = None
+
+    def allow(self):
+        """Whether a call may be sent to this provider right now"""
+        with self._lock:
+            if self._state == OPEN and time.time() - self._opened_at >= self.open_seconds:
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency, found=True):
+        """Record an answer (coordinates or a definitive "no results")"""
+        with self._lock:
+            self.calls += 1
+            if found:
+                self.successes += 1
+            else:
+                self.no_results += 1
+            self._latencies.append(latency)
+            self._consecutive_failures = 0
+            if self._state != CLOSED:
+                print(f"✅ Geocoding provider '{self.name}' recovered, circuit closed")
+            self._state = CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self, latency, error):
+        """Record a call that could not answer"""
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self.last_error = str(error)
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = OPEN
+                self._opened_at = time.time()
+                print(f"🚫 Geocoding provider '{self.name}' circuit opened for {self.open_seconds}s: {error}")
+
+    def record_hedge(self, won=False):
+        """Count a hedged call (started alongside a slow provider) and whether its answer won"""
+        with self._lock:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedged += 1
+
+    def percentile(self, fraction):
+        """Latency percentile over the rolling window in seconds, or None without samples"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        return _percentile(latencies, fraction)
+
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.time() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def snapshot(self):
+        """Metrics for the stats endpoints"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            calls = self.calls
+            snapshot = {
+                'state': self._state,
+                'calls': calls,
+                'successes': self.successes,
+                'no_results': self.no_results,
+                'failures': self.failures,
+                'error_rate': round(self.failures / calls * 100, 2) if calls else 0.0,
+                'consecutive_failures': self._consecutive_failures,
+                'rejected_by_circuit': self.rejected,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+                'last_error': self.last_error
+            }
+        for label, fraction in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            value = _percentile(latencies, fraction)
+            snapshot[label] = round(value * 1000, 1) if value is not None else None
+        snapshot['state'] = self.state()
+        return snapshot
+
+
+class HedgedGeocoder:
+    """
+    Query geocoding providers in preference order with hedging
+
+    The primary provider gets a head start equal to its own p95 latency
+    (clamped to [min_hedge_delay, max_hedge_delay]). If it has not answered by
+    then, the next provider is started as well and the first coordinates win.
+    A failure or "no results" from one provider starts the next one at once.
+    Providers whose circuit is open are skipped entirely.
+
+    Args:
+        min_hedge_delay: Lower bound on the head start (seconds)
+        max_hedge_delay: Upper bound, also used before any latency samples exist
+        failure_threshold: Consecutive failures that open a provider's circuit
+        open_seconds: How long an open circuit rejects calls
+        max_workers: Threads shared by all in-flight provider calls
+    """
+
+    def __init__(self, min_hedge_delay=0.5, max_hedge_delay=3.0, failure_threshold=5,
+                 open_seconds=30.0, max_workers=16):
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._health = {}
+        self._health_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='geocode-provider')
+
+    def health(self, name):
+        """ProviderHealth for a provider name (created on first use)"""
+        with self._health_lock:
+            health = self._health.get(name)
+            if health is None:
+                health = ProviderHealth(name, self.failure_threshold, self.open_seconds)
+                self._health[name] = health
+            return health
+
+    def hedge_delay(self, name):
+        """Head start given to a provider before the next one is started"""
+        p95 = self.health(name).percentile(0.95)
+        if p95 is None:
+            return self.max_hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, p95))
+
+    def metrics(self):
+        """Per-provider latency, error and circuit metrics"""
+        with self._health_lock:
+            names = list(self._health)
+        return {name: self.health(name).snapshot() for name in names}
+
+    def _call(self, name, fn, location_name):
+        health = self.health(name)
+        started = time.time()
+        try:
+            lat, lng = fn(location_name)
+        except Exception as e:
+            health.record_failure(time.time() - started, e)
+            if isinstance(e, GeocodeUnavailable):
+                raise
+            raise GeocodeUnavailable(f'{name}: {str(e)}') from e
+        health.record_success(time.time() - started, found=lat is not None and lng is not None)
+        return lat, lng
+
+    def geocode(self, location_name, providers):
+        """
+        Resolve a location with the first provider to answer
+
+        Args:
+            location_name: Location to geocode
+            providers: [(name, fn), ...] in preference order; fn(location_name)
+                       returns (lat, lng), (None, None) for "no results", or
+                       raises GeocodeUnavailable
+
+        Returns:
+            tuple: (lat, lng, provider_name), or (None, None, None) when every
+                   provider that answered found nothing
+
+        Raises:
+            GeocodeUnavailable: no provider could answer (all failed or circuits open)
+        """
+        providers = list(providers)
+        running = {}
+        hedges = set()
+        errors = []
+        answered_empty = False
+        next_index = 0
+        last_launched = None
+
+        def launch(hedge=False):
+            """Start the next provider whose circuit allows a call; False when none is left"""
+            nonlocal next_index, last_launched
+            while next_index < len(providers):
+                name, fn = providers[next_index]
+                next_index += 1
+                # Asked only for the provider actually started, so a half-open
+                # circuit's single trial is never taken by a call that never runs
+                if not self.health(name).allow():
+                    continue
+                future = self._executor.submit(self._call, name, fn, location_name)
+                running[future] = name
+                last_launched = name
+                if hedge:
+                    hedges.add(future)
+                    self.health(name).record_hedge()
+                return True
+            return False
+
+        if not launch():
+            raise GeocodeUnavailable('All geocoding providers are unavailable')
+        while running:
+            timeout = None
+            if next_index < len(providers):
+                timeout = self.hedge_delay(last_launched)
+
+            done, _pending = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slower than its usual p95 - start the next provider alongside it
+                launch(hedge=True)
+                continue
+
+            for future in done:
+                name = running.pop(future)
+                try:
+                    lat, lng = future.result()
+                except GeocodeUnavailable as e:
+                    errors.append(str(e))
+                else:
+                    if lat is not None and lng is not None:
+                        if future in hedges:
+                            self.health(name).record_hedge(won=True)
+                        # Losing calls finish in the background and still feed the metrics
+                        return lat, lng, name
+                    answered_empty = True
+
+                launch()
+
+        if answered_empty:
+            return None, None, None
+        raise GeocodeUnavailable('; '.join(errors) or 'No geocoding provider answered')
@@ -0,0 +1,237 @@
+"""
+Precomputed risk heatmap
+Case and sighting coordinates are binned onto a fixed lat/lng grid with
+exponential time decay and smoothed with a separable Gaussian kernel (KDE);
+the grid is stored once per refresh and served as small JSON raster tiles per
+zoom level, so the risk map costs the same however many incidents exist
+"""
+import base64
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from shared.geo import KM_PER_DEGREE, points_bounding_box
+
+
+TILE_SIZE = 32  # Raster cells per tile side
+EARTH_CIRCUMFERENCE_KM = 40075.016686
+MAX_GRID_CELLS = 4_000_000  # Cell size grows if the data would need more
+MAX_CACHED_TILES = 4096
+MIN_TILE_FRACTION = 0.01  # Cells below this fraction of the zoom level's max are left out
+
+
+def decay_weights(timestamps, now, half_life_days):
+    """Weight 1 for incidents happening now, halving every half_life_days"""
+    age_days = np.maximum(now - np.asarray(timestamps, dtype=float), 0) / 86400.0
+    return np.power(0.5, age_days / half_life_days)
+
+
+def _gaussian_taps(sigma_cells):
+    radius = max(1, int(math.ceil(3 * sigma_cells)))
+    offsets = np.arange(-radius, radius + 1)
+    taps = np.exp(-0.5 * (offsets / sigma_cells) ** 2)
+    return taps / taps.sum()
+
+
+def _smooth(grid, taps, axis):
+    """Convolve along one axis (zero padded) by summing shifted copies"""
+    radius = len(taps) // 2
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (radius, radius)
+    padded = np.pad(grid, pad)
+    out = np.zeros_like(grid)
+    size = grid.shape[axis]
+    for offset, weight in enumerate(taps):
+        out += weight * (padded[offset:offset + size] if axis == 0 else padded[:, offset:offset + size])
+    return out
+
+
+def kde_grid(lats, lngs, weights, cell_km=0.25, bandwidth_km=1.0):
+    """
+    Kernel density of weighted points on a regular lat/lng grid
+
+    Args:
+        lats, lngs: Point coordinates in degrees
+        weights: Weight per point (e.g. decay_weights)
+        cell_km: Grid resolution (grown automatically to stay under MAX_GRID_CELLS)
+        bandwidth_km: Gaussian kernel standard deviation
+
+    Returns:
+        dict: grid (float32, rows = latitude ascending), min_lat, min_lng,
+              lat_step, lng_step (degrees), cell_km, bandwidth_km; None without points
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    if not len(lats):
+        return None
+
+    min_lat, max_lat, min_lng, max_lng = points_bounding_box(lats, lngs, 3 * bandwidth_km + cell_km)
+
+    mean_cos = max(math.cos(math.radians((min_lat + max_lat) / 2)), 1e-6)
+    height_km = (max_lat - min_lat) * KM_PER_DEGREE
+    width_km = (max_lng - min_lng) * KM_PER_DEGREE * mean_cos
+    cell_km = max(cell_km, math.sqrt(height_km * width_km / MAX_GRID_CELLS))
+
+    lat_step = cell_km / KM_PER_DEGREE
+    lng_step = cell_km / (KM_PER_DEGREE * mean_cos)
+    rows = int(math.ceil((max_lat - min_lat) / lat_step)) + 1
+    cols = int(math.ceil((max_lng - min_lng) / lng_step)) + 1
+
+    row_index = np.clip(((lats - min_lat) / lat_step).astype(np.int64), 0, rows - 1)
+    col_index = np.clip(((lngs - min_lng) / lng_step).astype(np.int64), 0, cols - 1)
+    grid = np.zeros((rows, cols))
+    np.add.at(grid, (row_index, col_index), weights)
+
+    taps = _gaussian_taps(bandwidth_km / cell_km)
+    grid = _smooth(_smooth(grid, taps, 0), taps, 1)
+    # Per km^2, so values do not depend on the cell size
+    grid /= cell_km * cell_km
+
+    return {
+        'grid': grid.astype(np.float32),
+        'min_lat': min_lat,
+        'min_lng': min_lng,
+        'lat_step': lat_step,
+        'lng_step': lng_step,
+        'cell_km': cell_km,
+        'bandwidth_km': bandwidth_km
+    }
+
+
+def encode_grid(heatmap):
+    """JSON-safe form of a kde_grid result (grid zlib-compressed, base64)"""
+    grid = heatmap['grid']
+    encoded = {key: value for key, value in heatmap.items() if key != 'grid'}
+    encoded['shape'] = list(grid.shape)
+    encoded['max'] = float(grid.max()) if grid.size else 0.0
+    encoded['grid'] = base64.b64encode(zlib.compress(grid.astype(np.float32).tobytes())).decode('ascii')
+    return encoded
+
+
+def decode_grid(encoded):
+    """Inverse of encode_grid"""
+    heatmap = dict(encoded)
+    raw = zlib.decompress(base64.b64decode(encoded['grid']))
+    heatmap['grid'] = np.frombuffer(raw, dtype=np.float32).reshape(encoded['shape'])
+    return heatmap
+
+
+def _pool(grid):
+    """2x2 mean pooling (odd edges padded with zeros)"""
+    rows, cols = grid.shape
+    grid = np.pad(grid, ((0, rows % 2), (0, cols % 2)))
+    return grid.reshape(grid.shape[0] // 2, 2, grid.shape[1] // 2, 2).mean(axis=(1, 3))
+
+
+class HeatmapTiles:
+    """
+    Serves XYZ (Web Mercator) JSON raster tiles from the stored heatmap snapshot
+
+    The stored grid is decoded once per snapshot and a mean-pooled pyramid is
+    built lazily, so each zoom samples a level whose cells are about the size
+    of a tile cell; rendered tiles are kept in an LRU cache.
+
+    Args:
+        snapshots: shared.snapshots.SnapshotStore holding the 'heatmap' payload
+        analysis_type: Snapshot key
+        reload_seconds: How often to check for a newer snapshot
+    """
+
+    def __init__(self, snapshots, analysis_type='heatmap', reload_seconds=30):
+        self.snapshots = snapshots
+        self.analysis_type = analysis_type
+        self.reload_seconds = reload_seconds
+        self._heatmap = None
+        self._version = None
+        self._levels = []
+        self._checked_at = 0.0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def current(self):
+        """(heatmap dict or None, snapshot version) - re-read at most every reload_seconds"""
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.reload_seconds:
+                return self._heatmap, self._version
+            self._checked_at = time.monotonic()
+
+        version = self.snapshots.latest_id(self.analysis_type)
+        with self._lock:
+            if version != self._version:
+                row = self.snapshots.db.session.get(self.snapshots.analytics_model, version) if version else None
+                payload = self.snapshots.payload(row) if row is not None else {}
+                encoded = payload.get('heatmap')
+                self._heatmap = decode_grid(encoded) if encoded else None
+                if self._heatmap is not None:
+                    self._heatmap['computed_at'] = payload.get('computed_at')
+                self._version = version
+                self._levels = [self._heatmap['grid']] if self._heatmap is not None else []
+                self._tiles.clear()
+            return self._heatmap, self._version
+
+    def _level(self, index):
+        while len(self._levels) <= index and min(self._levels[-1].shape) > 1:
+            self._levels.append(_pool(self._levels[-1]))
+        index = min(index, len(self._levels) - 1)
+        return index, self._levels[index]
+
+    def tile(self, z, x, y):
+        """
+        One tile as {z, x, y, size, max, cells: [[row, col, value], ...]}
+
+        Rows/cols index a TILE_SIZE x TILE_SIZE raster from the tile's top-left
+        corner; values are densities (weighted incidents per km^2) and 'max' is
+        the peak at this zoom, for colour scaling.
+        """
+        heatmap, version = self.current()
+        key = (version, z, x, y)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+
+        tile = {'z': z, 'x': x, 'y': y, 'size': TILE_SIZE, 'max': 0.0, 'cells': [], 'version': version}
+        n = 2 ** z
+        if heatmap is not None and 0 <= x < n and 0 <= y < n:
+            self._render(heatmap, tile, n)
+
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > MAX_CACHED_TILES:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def _render(self, heatmap, tile, n):
+        z, x, y = tile['z'], tile['x'], tile['y']
+        offsets = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+        lngs = (x + offsets) / n * 360.0 - 180.0
+        lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+
+        # Pick the pyramid level whose cells best match a tile cell at this latitude
+        centre_lat = float(lats[TILE_SIZE // 2])
+        cell_km = EARTH_CIRCUMFERENCE_KM * math.cos(math.radians(centre_lat)) / (n * TILE_SIZE)
+        wanted = int(math.floor(math.log2(max(cell_km / heatmap['cell_km'], 1.0))))
+        with self._lock:
+            level, grid = self._level(wanted)
+        scale = 2 ** level
+
+        rows = np.floor((lats - heatmap['min_lat']) / (heatmap['lat_step'] * scale)).astype(np.int64)
+        cols = np.floor((lngs - heatmap['min_lng']) / (heatmap['lng_step'] * scale)).astype(np.int64)
+        row_ok = (rows >= 0) & (rows < grid.shape[0])
+        col_ok = (cols >= 0) & (cols < grid.shape[1])
+        tile['max'] = round(float(grid.max()), 6)
+        if not row_ok.any() or not col_ok.any():
+            return
+
+        values = np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.float32)
+        values[np.ix_(row_ok, col_ok)] = grid[np.ix_(rows[row_ok], cols[col_ok])]
+        threshold = tile['max'] * MIN_TILE_FRACTION
+        tile_rows, tile_cols = np.nonzero(values > threshold)
+        tile['cells'] = [
+            [int(r), int(c), round(float(values[r, c]), 6)] for r, c in zip(tile_rows, tile_cols)
+        ]
@@ -0,0 +1,212 @@
+"""
+Space-time hotspot detection
+Prospective space-time permutation scan statistic (Kulldorff, 2005) over
+cases and sightings: events are binned into km grid cells and time bins, every
+square zone of cells around an occupied cell is paired with every time window
+ending now (up to the last 72 hours), and zones whose recent count is far above
+what the area's own history predicts are reported with a Monte Carlo p-value.
+All sums run on binned counts with NumPy, so a refresh costs seconds at most
+"""
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from shared.geo import KM_PER_DEGREE
+
+
+MAX_RADIUS_CELLS = 2  # Zones are (2r+1)^2 cell squares, r = 0..MAX_RADIUS_CELLS
+MIN_EVENTS = 3  # Fewer recent events than this never make a hotspot
+MAX_HOTSPOTS = 10
+SIGNIFICANCE = 0.05
+
+
+def _llr(observed, expected, total):
+    """Poisson log-likelihood ratio of each cylinder (0 where not elevated)"""
+    observed = np.asarray(observed, dtype=float)
+    expected = np.asarray(expected, dtype=float)
+    elevated = (observed > expected) & (expected > 0) & (observed >= MIN_EVENTS)
+    llr = np.zeros(observed.shape)
+    c, e = observed[elevated], expected[elevated]
+    inside = c * np.log(c / e)
+    rest = total - c
+    outside = np.where(rest > 0, rest * np.log(np.maximum(rest, 1e-12) / np.maximum(total - e, 1e-12)), 0.0)
+    llr[elevated] = inside + outside
+    return llr
+
+
+class _Zones:
+    """
+    Occupied cells of a sparse grid and, for each offset of the largest zone,
+    where the neighbouring occupied cell is (found by binary search on keys)
+    """
+
+    def __init__(self, cell_x, cell_y):
+        self.span = int(cell_y.max()) + MAX_RADIUS_CELLS + 1
+        keys = cell_x.astype(np.int64) * self.span + cell_y
+        self.keys, self.inverse = np.unique(keys, return_inverse=True)
+        self.neighbours = []
+        for dx in range(-MAX_RADIUS_CELLS, MAX_RADIUS_CELLS + 1):
+            for dy in range(-MAX_RADIUS_CELLS, MAX_RADIUS_CELLS + 1):
+                wanted = self.keys + dx * self.span + dy
+                position = np.clip(np.searchsorted(self.keys, wanted), 0, len(self.keys) - 1)
+                found = self.keys[position] == wanted
+                self.neighbours.append((max(abs(dx), abs(dy)), np.flatnonzero(found), position[found]))
+
+    def sums(self, per_cell):
+        """
+        Zone totals for every centre and radius
+
+        Args:
+            per_cell: array (cells, ...) of counts per occupied cell
+
+        Returns:
+            array (cells, MAX_RADIUS_CELLS + 1, ...) of counts in each zone
+        """
+        rings = np.zeros((len(self.keys), MAX_RADIUS_CELLS + 1) + per_cell.shape[1:])
+        for ring, centres, cells in self.neighbours:
+            # Each centre appears once per offset, so a plain fancy-index add is safe
+            rings[centres, ring] += per_cell[cells]
+        return np.cumsum(rings, axis=1)
+
+
+def scan(lats, lngs, timestamps, kinds, now, cell_km=1.0, bin_hours=6.0, window_hours=72.0,
+         replicates=99, seed=0):
+    """
+    Space-time hotspots among events ending now
+
+    Args:
+        lats, lngs: Event coordinates in degrees
+        timestamps: Event times (epoch seconds); events must fall in the baseline period
+        kinds: 0 for a case, 1 for a sighting (only used in the per-hotspot breakdown)
+        now: End of the study period (epoch seconds)
+        cell_km: Grid cell size
+        bin_hours: Time bin size; windows are 1..window_hours/bin_hours bins ending now
+        window_hours: Longest recent window scanned
+        replicates: Monte Carlo permutations for p-values (0 to skip)
+        seed: Random seed of the permutations
+
+    Returns:
+        list: non-overlapping hotspots, strongest first
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    timestamps = np.asarray(timestamps, dtype=float)
+    kinds = np.asarray(kinds, dtype=np.int64)
+    total = len(lats)
+    if total < MIN_EVENTS:
+        return []
+
+    # Sparse grid cells (local equirectangular projection) and time bins back from now
+    lat0 = float(np.mean(lats))
+    cos0 = max(math.cos(math.radians(lat0)), 1e-6)
+    cell_x = np.floor(lngs * KM_PER_DEGREE * cos0 / cell_km).astype(np.int64)
+    cell_y = np.floor(lats * KM_PER_DEGREE / cell_km).astype(np.int64)
+    origin_x, origin_y = cell_x.min() - MAX_RADIUS_CELLS, cell_y.min() - MAX_RADIUS_CELLS
+    zones = _Zones(cell_x - origin_x, cell_y - origin_y)
+    cells = len(zones.keys)
+
+    windows = max(int(round(window_hours / bin_hours)), 1)
+    bins = np.floor(np.maximum(now - timestamps, 0) / (bin_hours * 3600)).astype(np.int64)
+
+    def recent_counts(event_bins):
+        """(cells, windows) events in each cell within the last w + 1 bins"""
+        recent = event_bins < windows
+        counts = np.bincount(zones.inverse[recent] * windows + event_bins[recent],
+                             minlength=cells * windows).reshape(cells, windows)
+        return np.cumsum(counts, axis=1)
+
+    zone_totals = zones.sums(np.bincount(zones.inverse, minlength=cells).astype(float))
+    window_totals = np.cumsum(np.bincount(np.minimum(bins, windows), minlength=windows + 1)[:windows])
+    expected = zone_totals[:, :, None] * window_totals[None, None, :] / total
+    observed = zones.sums(recent_counts(bins).astype(float))
+    llr = _llr(observed, expected, total)
+
+    # Permuting times over locations keeps both marginals, so only observed counts change
+    rng = np.random.default_rng(seed)
+    maxima = np.array([
+        _llr(zones.sums(recent_counts(rng.permutation(bins)).astype(float)), expected, total).max()
+        for _ in range(replicates)
+    ])
+
+    hotspots = []
+    chosen = []  # (x, y, r) of accepted zones
+    for flat in np.argsort(llr, axis=None)[::-1]:
+        if llr.flat[flat] <= 0 or len(hotspots) >= MAX_HOTSPOTS:
+            break
+        centre, radius, window = (int(i) for i in np.unravel_index(flat, llr.shape))
+        x, y = divmod(int(zones.keys[centre]), zones.span)
+        x, y = x + int(origin_x), y + int(origin_y)
+        if any(max(abs(x - cx), abs(y - cy)) <= radius + cr for cx, cy, cr in chosen):
+            continue
+        chosen.append((x, y, radius))
+
+        in_zone = (np.abs(cell_x - x) <= radius) & (np.abs(cell_y - y) <= radius) & (bins <= window)
+        c, e = float(observed[centre, radius, window]), float(expected[centre, radius, window])
+        p_value = (1 + int((maxima >= llr.flat[flat]).sum())) / (replicates + 1) if replicates else None
+        south = (y - radius) * cell_km / KM_PER_DEGREE
+        north = (y + radius + 1) * cell_km / KM_PER_DEGREE
+        west = (x - radius) * cell_km / (KM_PER_DEGREE * cos0)
+        east = (x + radius + 1) * cell_km / (KM_PER_DEGREE * cos0)
+        hotspots.append({
+            'lat': round((south + north) / 2, 6),
+            'lng': round((west + east) / 2, 6),
+            'bounds': [[round(south, 6), round(west, 6)], [round(north, 6), round(east, 6)]],
+            'size_km': round((2 * radius + 1) * cell_km, 3),
+            'window_hours': round((window + 1) * bin_hours, 2),
+            'observed': int(c),
+            'expected': round(e, 3),
+            'relative_risk': round((c / e) / ((total - c) / (total - e)), 3) if total > c else None,
+            'llr': round(float(llr.flat[flat]), 4),
+            'p_value': round(p_value, 4) if p_value is not None else None,
+            'significant': p_value is not None and p_value <= SIGNIFICANCE,
+            'cases': int((in_zone & (kinds == 0)).sum()),
+            'sightings': int((in_zone & (kinds == 1)).sum())
+        })
+    return hotspots
+
+
+def compute_hotspots(case_points, sighting_points, now=None, cell_km=1.0, bin_hours=6.0,
+                     window_hours=72.0, baseline_days=28.0, replicates=99):
+    """
+    Hotspot snapshot payload from case and sighting points
+
+    Args:
+        case_points, sighting_points: (lats, lngs, epoch seconds) arrays
+        now: datetime the windows end at (default: utcnow)
+        Others: see scan(); events older than baseline_days are ignored
+
+    Returns:
+        dict: hotspots, event counts and the parameters used
+    """
+    now = now or datetime.utcnow()
+    now_ts = (now - datetime(1970, 1, 1)).total_seconds()
+    since_ts = now_ts - baseline_days * 86400
+
+    lats, lngs, times, kinds = [], [], [], []
+    for kind, (kind_lats, kind_lngs, kind_times) in enumerate((case_points, sighting_points)):
+        kind_times = np.asarray(kind_times, dtype=float)
+        keep = (kind_times >= since_ts) & (kind_times <= now_ts)
+        lats.append(np.asarray(kind_lats, dtype=float)[keep])
+        lngs.append(np.asarray(kind_lngs, dtype=float)[keep])
+        times.append(kind_times[keep])
+        kinds.append(np.full(int(keep.sum()), kind))
+
+    lats, lngs, times, kinds = (np.concatenate(parts) for parts in (lats, lngs, times, kinds))
+    hotspots = scan(lats, lngs, times, kinds, now_ts, cell_km=cell_km, bin_hours=bin_hours,
+                    window_hours=window_hours, replicates=replicates)
+    return {
+        'hotspots': hotspots,
+        'significant': sum(1 for hotspot in hotspots if hotspot['significant']),
+        'cases': int((kinds == 0).sum()),
+        'sightings': int((kinds == 1).sum()),
+        'as_of': now.isoformat(),
+        'baseline_start': (now - timedelta(days=baseline_days)).isoformat(),
+        'parameters': {
+            'cell_km': cell_km,
+            'bin_hours': bin_hours,
+            'window_hours': window_hours,
+            'baseline_days': baseline_days,
+            'replicates': replicates
+        }
+    }
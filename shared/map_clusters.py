@@ -0,0 +1,205 @@
+"""
+Server-side map point clustering
+Case coordinates are projected to Web Mercator and aggregated into a
+hierarchy of grid clusters, one level per zoom (each cell splits into exactly
+four at the next zoom, as in supercluster's zoom pyramid); a bounding-box query
+returns only the clusters and points visible at that zoom, carrying id,
+lat/lng and status, so map payloads stay small however many cases exist
+"""
+import math
+import threading
+
+import numpy as np
+
+from shared.snapshots import case_data_version
+
+
+CELLS_PER_TILE = 4  # 64 px clusters on 256 px tiles
+MAX_FEATURES = 5000  # Hard cap on features per response
+
+
+def _project(lats, lngs):
+    """Lat/lng -> Web Mercator x, y in [0, 1)"""
+    x = (np.asarray(lngs, dtype=float) + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(np.clip(lats, -85.05112878, 85.05112878)))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+
+def _unproject(x, y):
+    """Web Mercator x, y -> (lats, lngs)"""
+    lngs = np.asarray(x) * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y)))))
+    return lats, lngs
+
+
+class _Level:
+    """
+    Clusters at one zoom: centroid, count, missing count, member extent
+    (for the expansion zoom) and the point index for singletons (-1 otherwise)
+    """
+
+    def __init__(self, x, y, count, missing, extent, point):
+        self.x = x
+        self.y = y
+        self.count = count
+        self.missing = missing
+        self.extent = extent
+        self.point = point
+
+
+class MapPointIndex:
+    """
+    Zoom pyramid of case clusters, rebuilt when the case data version changes
+
+    Works with any Flask-SQLAlchemy app whose models follow the Sachet schema.
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        case_model: MissingChild model class
+        max_zoom: Deepest clustered zoom; above it individual points are returned
+    """
+
+    def __init__(self, db, case_model, max_zoom=16):
+        self.db = db
+        self.case_model = case_model
+        self.max_zoom = max_zoom
+        self._version = None
+        self._levels = []
+        self._points = None
+        self._lock = threading.Lock()
+
+    def _build(self, version):
+        case = self.case_model
+        rows = self.db.session.execute(
+            self.db.select(case.report_id, case.last_seen_lat, case.last_seen_lng, case.status)
+            .where(case.last_seen_lat.isnot(None))
+            .where(case.last_seen_lng.isnot(None))
+        ).all()
+
+        n = len(rows)
+        lats = np.fromiter((r.last_seen_lat for r in rows), dtype=float, count=n)
+        lngs = np.fromiter((r.last_seen_lng for r in rows), dtype=float, count=n)
+        x, y = _project(lats, lngs)
+        missing = np.fromiter((r.status == 'missing' for r in rows), dtype=bool, count=n)
+        self._points = {
+            'ids': [r.report_id for r in rows],
+            'statuses': [r.status for r in rows],
+            'lats': lats,
+            'lngs': lngs,
+            'x': x,
+            'y': y
+        }
+
+        levels = []
+        for zoom in range(self.max_zoom + 1) if n else ():
+            cells = 2 ** zoom * CELLS_PER_TILE
+            keys = np.floor(x * cells).astype(np.int64) * cells + np.floor(y * cells).astype(np.int64)
+            _keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            count = np.bincount(inverse)
+
+            extent = np.empty((len(count), 4))
+            extent[:, 0], extent[:, 1] = np.inf, -np.inf
+            extent[:, 2], extent[:, 3] = np.inf, -np.inf
+            np.minimum.at(extent[:, 0], inverse, x)
+            np.maximum.at(extent[:, 1], inverse, x)
+            np.minimum.at(extent[:, 2], inverse, y)
+            np.maximum.at(extent[:, 3], inverse, y)
+
+            levels.append(_Level(
+                np.bincount(inverse, weights=x) / count,
+                np.bincount(inverse, weights=y) / count,
+                count,
+                np.bincount(inverse, weights=missing).astype(np.int64),
+                extent,
+                np.where(count == 1, first, -1)
+            ))
+        self._levels = levels
+        self._version = version
+
+    def _current(self):
+        version = case_data_version(self.db, self.case_model)
+        with self._lock:
+            if version != self._version:
+                self._build(version)
+            return version, self._levels, self._points
+
+    def query(self, west, south, east, north, zoom):
+        """
+        Clusters and points inside a bounding box at a zoom level
+
+        Args:
+            west, south, east, north: Bounding box in degrees (west > east crosses the antimeridian)
+            zoom: Map zoom level
+
+        Returns:
+            dict: {data_version, zoom, features, truncated}; a feature is
+                  {type: 'point', id, lat, lng, status} or
+                  {type: 'cluster', lat, lng, count, missing, expansion_zoom}
+        """
+        version, levels, points = self._current()
+        zoom = max(0, int(zoom))
+
+        min_x, max_y = _project(south, west)
+        max_x, min_y = _project(north, east)
+        min_x, max_x, min_y, max_y = float(min_x), float(max_x), float(min_y), float(max_y)
+
+        def in_box(px, py):
+            inside_y = (py >= min_y) & (py <= max_y)
+            if min_x <= max_x:
+                return inside_y & (px >= min_x) & (px <= max_x)
+            return inside_y & ((px >= min_x) | (px <= max_x))
+
+        features = []
+        if zoom > self.max_zoom or not levels:
+            selected = np.flatnonzero(in_box(points['x'], points['y'])) if points else np.empty(0, dtype=np.int64)
+            clusters = np.empty(0, dtype=np.int64)
+            singles = selected
+        else:
+            level = levels[zoom]
+            visible = np.flatnonzero(in_box(level.x, level.y))
+            singles = level.point[visible[level.point[visible] >= 0]]
+            clusters = visible[level.point[visible] < 0]
+
+        truncated = len(singles) + len(clusters) > MAX_FEATURES
+        for index in singles[:MAX_FEATURES]:
+            features.append({
+                'type': 'point',
+                'id': points['ids'][index],
+                'lat': round(float(points['lats'][index]), 6),
+                'lng': round(float(points['lngs'][index]), 6),
+                'status': points['statuses'][index]
+            })
+
+        if len(clusters):
+            clusters = clusters[:max(MAX_FEATURES - len(features), 0)]
+            lats, lngs = _unproject(level.x[clusters], level.y[clusters])
+            expansion = self._expansion_zooms(level.extent[clusters], zoom)
+            for i, index in enumerate(clusters):
+                features.append({
+                    'type': 'cluster',
+                    'lat': round(float(lats[i]), 6),
+                    'lng': round(float(lngs[i]), 6),
+                    'count': int(level.count[index]),
+                    'missing': int(level.missing[index]),
+                    'expansion_zoom': int(expansion[i])
+                })
+
+        return {
+            'data_version': version,
+            'zoom': zoom,
+            'features': features,
+            'truncated': bool(truncated)
+        }
+
+    def _expansion_zooms(self, extent, zoom):
+        """First zoom at which each cluster's members fall into more than one cell"""
+        expansion = np.full(len(extent), self.max_zoom + 1)
+        for next_zoom in range(self.max_zoom, zoom, -1):
+            cells = 2 ** next_zoom * CELLS_PER_TILE
+            splits = (
+                (np.floor(extent[:, 0] * cells) != np.floor(extent[:, 1] * cells))
+                | (np.floor(extent[:, 2] * cells) != np.floor(extent[:, 3] * cells))
+            )
+            expansion[splits] = next_zoom
+        return expansion
@@ -0,0 +1,271 @@
+"""
+Versioned schema migrations
+Each migration has a version number and runs once per database: applied
+versions are recorded in the schema_migrations table, in the same transaction
+as the migration itself, so concurrent workers starting together apply it once.
+On SQLite the transaction is opened with an explicit BEGIN (pysqlite would
+otherwise commit each DDL statement on its own), and backfills clear their
+table first, so a migration interrupted on an older release can be re-run.
+Add new steps at the end of MIGRATIONS with the next version number, and
+never edit a migration that has shipped.
+
+Works on a plain SQLAlchemy engine (PostgreSQL or SQLite), so the services,
+the monolith and migrate_db.py all run the same steps.
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+
+def _index(name, table, columns):
+    return f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'
+
+
+# Full-text search index of cases (see shared/search.py), kept in sync by triggers
+# so every writer (services, monolith, scripts) updates it in the same transaction
+_SIGHTING_TEXT = "coalesce((SELECT group_concat(description, ' ') FROM sighting WHERE report_id = {case}.report_id), '')"
+_CASE_SEARCH_ROW = (
+    "INSERT INTO case_search (rowid, name, description, location, sightings) "
+    "VALUES (new.id, new.name, new.description, "
+    "coalesce(new.last_seen_location, '') || ' ' || coalesce(new.location_subcategory, ''), "
+    + _SIGHTING_TEXT.format(case='new') + ");"
+)
+_SIGHTING_REFRESH = (
+    "UPDATE case_search SET sightings = " + _SIGHTING_TEXT.format(case='{row}')
+    + " WHERE rowid = (SELECT id FROM missing_child WHERE report_id = {row}.report_id);"
+)
+
+SQLITE_CASE_SEARCH = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS case_search USING fts5("
+    "name, description, location, sightings, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "CREATE TRIGGER IF NOT EXISTS case_search_insert AFTER INSERT ON missing_child BEGIN "
+    + _CASE_SEARCH_ROW + " END",
+    "CREATE TRIGGER IF NOT EXISTS case_search_update AFTER UPDATE OF "
+    "name, description, last_seen_location, location_subcategory, report_id ON missing_child BEGIN "
+    "DELETE FROM case_search WHERE rowid = old.id; " + _CASE_SEARCH_ROW + " END",
+    "CREATE TRIGGER IF NOT EXISTS case_search_delete AFTER DELETE ON missing_child BEGIN "
+    "DELETE FROM case_search WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS case_search_sighting_insert AFTER INSERT ON sighting BEGIN "
+    + _SIGHTING_REFRESH.format(row='new') + " END",
+    "CREATE TRIGGER IF NOT EXISTS case_search_sighting_update AFTER UPDATE OF description, report_id ON sighting BEGIN "
+    + _SIGHTING_REFRESH.format(row='old') + " " + _SIGHTING_REFRESH.format(row='new') + " END",
+    "CREATE TRIGGER IF NOT EXISTS case_search_sighting_delete AFTER DELETE ON sighting BEGIN "
+    + _SIGHTING_REFRESH.format(row='old') + " END",
+    # Cases stored before the index existed (rows a trigger already wrote are rebuilt too)
+    "DELETE FROM case_search",
+    "INSERT INTO case_search (rowid, name, description, location, sightings) "
+    "SELECT id, name, description, coalesce(last_seen_location, '') || ' ' || coalesce(location_subcategory, ''), "
+    + _SIGHTING_TEXT.format(case='missing_child') + " FROM missing_child",
+]
+
+POSTGRES_CASE_SEARCH = [
+    "CREATE TABLE IF NOT EXISTS case_search ("
+    "case_id INTEGER PRIMARY KEY REFERENCES missing_child (id) ON DELETE CASCADE, document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_case_search_document ON case_search USING GIN (document)",
+    # Weights: name A, location and description B, sighting descriptions C
+    """CREATE OR REPLACE FUNCTION case_search_refresh(case_report_id VARCHAR) RETURNS void AS $$
+        INSERT INTO case_search (case_id, document)
+        SELECT c.id,
+               setweight(to_tsvector('simple', coalesce(c.name, '')), 'A')
+               || setweight(to_tsvector('simple', coalesce(c.last_seen_location, '') || ' ' || coalesce(c.location_subcategory, '')), 'B')
+               || setweight(to_tsvector('simple', coalesce(c.description, '')), 'B')
+               || setweight(to_tsvector('simple', coalesce(
+                      (SELECT string_agg(s.description, ' ') FROM sighting s WHERE s.report_id = c.report_id), '')), 'C')
+        FROM missing_child c
+        WHERE c.report_id = case_report_id
+        ON CONFLICT (case_id) DO UPDATE SET document = EXCLUDED.document
+    $$ LANGUAGE sql""",
+    """CREATE OR REPLACE FUNCTION case_search_case_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM case_search_refresh(NEW.report_id);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE FUNCTION case_search_sighting_changed() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM case_search_refresh(OLD.report_id);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM case_search_refresh(NEW.report_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS case_search_case ON missing_child",
+    "CREATE TRIGGER case_search_case AFTER INSERT OR UPDATE OF "
+    "name, description, last_seen_location, location_subcategory, report_id ON missing_child "
+    "FOR EACH ROW EXECUTE PROCEDURE case_search_case_changed()",
+    "DROP TRIGGER IF EXISTS case_search_sighting ON sighting",
+    "CREATE TRIGGER case_search_sighting AFTER INSERT OR UPDATE OF description, report_id OR DELETE ON sighting "
+    "FOR EACH ROW EXECUTE PROCEDURE case_search_sighting_changed()",
+    # Cases stored before the index existed
+    "SELECT case_search_refresh(report_id) FROM missing_child",
+]
+
+# Case counters (see shared/case_counts.py): cases per status overall ('all'), per day
+# reported ('day', YYYY-MM-DD) and per area ('area', geohash prefix), kept by triggers
+CASE_COUNT_AREA_PRECISION = 4  # Geohash characters per area (~39 x 20 km cells)
+CASE_COUNT_TABLE = (
+    "CREATE TABLE IF NOT EXISTS case_count ("
+    "dimension VARCHAR(10) NOT NULL, bucket VARCHAR(20) NOT NULL, status VARCHAR(20) NOT NULL, "
+    "cases INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (dimension, bucket, status))"
+)
+_CASE_COUNT_DAY = {
+    'sqlite': "coalesce(date({reported}), '')",
+    'postgresql': "coalesce(to_char({reported}, 'YYYY-MM-DD'), '')",
+}
+
+
+def case_count_buckets(dialect, status, reported, geohash):
+    """(dimension, bucket, status) SQL expressions of a case's counters"""
+    status = f"coalesce({status}, '')"
+    return [
+        ("'all'", "''", status),
+        ("'day'", _CASE_COUNT_DAY[dialect].format(reported=reported), status),
+        ("'area'", f"coalesce(substr({geohash}, 1, {CASE_COUNT_AREA_PRECISION}), '')", status),
+    ]
+
+
+def case_count_rebuild_select(dialect):
+    """SELECT of every counter row recomputed from missing_child (backfill and reconciliation)"""
+    selects = []
+    for dimension, bucket, status in case_count_buckets(dialect, 'status', 'date_reported', 'geohash'):
+        # PostgreSQL rejects a constant in GROUP BY ('all' has the single bucket '')
+        group_by = status if bucket == "''" else f'{bucket}, {status}'
+        selects.append(f"SELECT {dimension}, {bucket}, {status}, count(*) FROM missing_child GROUP BY {group_by}")
+    return ' UNION ALL '.join(selects)
+
+
+def _case_count_add(dialect, row, delta):
+    values = ', '.join(
+        f"({dimension}, {bucket}, {status}, {delta})"
+        for dimension, bucket, status in case_count_buckets(
+            dialect, f'{row}.status', f'{row}.date_reported', f'{row}.geohash')
+    )
+    return (
+        f"INSERT INTO case_count (dimension, bucket, status, cases) VALUES {values} "
+        "ON CONFLICT (dimension, bucket, status) DO UPDATE SET cases = case_count.cases + excluded.cases;"
+    )
+
+
+SQLITE_CASE_COUNTS = [
+    CASE_COUNT_TABLE,
+    "CREATE TRIGGER IF NOT EXISTS case_count_insert AFTER INSERT ON missing_child BEGIN "
+    + _case_count_add('sqlite', 'new', 1) + " END",
+    "CREATE TRIGGER IF NOT EXISTS case_count_update AFTER UPDATE OF status, date_reported, geohash ON missing_child "
+    "WHEN old.status IS NOT new.status OR old.date_reported IS NOT new.date_reported OR old.geohash IS NOT new.geohash "
+    "BEGIN " + _case_count_add('sqlite', 'old', -1) + " " + _case_count_add('sqlite', 'new', 1) + " END",
+    "CREATE TRIGGER IF NOT EXISTS case_count_delete AFTER DELETE ON missing_child BEGIN "
+    + _case_count_add('sqlite', 'old', -1) + " END",
+    # Cases stored before the counters existed (counts a trigger already made are rebuilt too)
+    "DELETE FROM case_count",
+    "INSERT INTO case_count (dimension, bucket, status, cases) " + case_count_rebuild_select('sqlite'),
+]
+
+POSTGRES_CASE_COUNTS = [
+    CASE_COUNT_TABLE,
+    """CREATE OR REPLACE FUNCTION case_count_changed() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            """ + _case_count_add('postgresql', 'OLD', -1) + """
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            """ + _case_count_add('postgresql', 'NEW', 1) + """
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS case_count ON missing_child",
+    "CREATE TRIGGER case_count AFTER INSERT OR UPDATE OF status, date_reported, geohash OR DELETE ON missing_child "
+    "FOR EACH ROW EXECUTE PROCEDURE case_count_changed()",
+    # Cases stored before the counters existed
+    "DELETE FROM case_count",
+    "INSERT INTO case_count (dimension, bucket, status, cases) " + case_count_rebuild_select('postgresql'),
+]
+
+
+# (version, description, [SQL statements] or {dialect name: [SQL statements]})
+MIGRATIONS = [
+    (1, 'Composite indexes for the hot query patterns', [
+        # Home page / dashboard pages by status, newest first; status counts
+        _index('ix_missing_child_status_reported_id', 'missing_child', 'status, date_reported, id'),
+        # Dashboard pages without a filter; hotspot window (date_reported >= since)
+        _index('ix_missing_child_reported_id', 'missing_child', 'date_reported, id'),
+        # Snapshot data version (max updated_at) and the column-store refresh watermark
+        _index('ix_missing_child_updated_at', 'missing_child', 'updated_at'),
+        # Background geocoder resuming pending rows
+        _index('ix_missing_child_geocode_status', 'missing_child', 'geocode_status'),
+        _index('ix_sighting_geocode_status', 'sighting', 'geocode_status'),
+        # Case detail: sightings of a case, newest first
+        _index('ix_sighting_report_time', 'sighting', 'report_id, sighting_time'),
+        # Hotspot window over recent sightings
+        _index('ix_sighting_sighting_time', 'sighting', 'sighting_time'),
+        # Case detail: candidate links of a case by review status, newest first
+        _index('ix_sighting_candidate_report_status', 'sighting_candidate', 'report_id, status, created_at'),
+        # Latest snapshot of an analysis type
+        _index('ix_analytics_type_created', 'analytics', 'analysis_type, created_at'),
+        # Active risk zones by score
+        _index('ix_risk_zone_active_score', 'risk_zone', 'is_active, risk_score'),
+    ]),
+    (2, 'Full-text search index of cases and sightings', {
+        'sqlite': SQLITE_CASE_SEARCH,
+        'postgresql': POSTGRES_CASE_SEARCH,
+    }),
+    (3, 'Case counters by status, day and area', {
+        'sqlite': SQLITE_CASE_COUNTS,
+        'postgresql': POSTGRES_CASE_COUNTS,
+    }),
+]
+
+
+def applied_versions(engine):
+    """Set of migration versions already applied (creates schema_migrations if needed)"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at TIMESTAMP)'
+        ))
+        return {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+
+def apply_migrations(engine):
+    """
+    Apply the migrations this database has not seen yet, in version order
+
+    Run after db.create_all(); a failed migration stops the run (later
+    versions depend on it) and is retried on the next start.
+
+    Returns:
+        list: versions applied by this call
+    """
+    done = applied_versions(engine)
+    applied = []
+
+    for version, description, statements in MIGRATIONS:
+        if version in done:
+            continue
+        if isinstance(statements, dict):
+            statements = statements.get(engine.dialect.name, [])
+        print(f"⚙️ Applying migration {version}: {description}...")
+        try:
+            with engine.begin() as conn:
+                if engine.dialect.name == 'sqlite':
+                    # pysqlite only opens transactions for DML; without this DDL commits at once
+                    conn.exec_driver_sql('BEGIN')
+                for statement in statements:
+                    conn.execute(text(statement))
+                conn.execute(
+                    text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)'),
+                    {'v': version, 'd': description, 't': datetime.utcnow()}
+                )
+        except Exception as e:
+            if version in applied_versions(engine):
+                # Another worker applied it at the same time
+                continue
+            print(f"❌ Migration {version} failed: {str(e)}")
+            break
+        applied.append(version)
+        print(f"✅ Migration {version} applied")
+
+    return applied
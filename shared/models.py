@@ -6,6 +6,8 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
 
+from shared.spatial import track_geohash
+
 db = SQLAlchemy()
 
 
@@ -20,13 +22,26 @@ class MissingChild(db.Model):
     location_subcategory = db.Column(db.String(200))
     last_seen_lat = db.Column(db.Float)
     last_seen_lng = db.Column(db.Float)
+    geohash = db.Column(db.String(12), index=True)  # Of last_seen_lat/lng, kept in sync by shared.spatial
     description = db.Column(db.Text, nullable=False)
     photo_filename = db.Column(db.String(500))  # Increased length for URLs
     audio_filename = db.Column(db.String(500))  # Increased length for URLs
     emergency_contact = db.Column(db.String(100))  # Emergency contact phone/email
     date_reported = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='missing')
-    sightings = db.relationship('Sighting', backref='missing_child', lazy=True)
+    geocode_status = db.Column(db.String(20), default='done', index=True)  # pending -> geocoding -> done/failed (background geocoder)
+    geocode_claimed_at = db.Column(db.DateTime)  # When a background geocoder worker claimed the row
+    risk_zone_id = db.Column(db.Integer, index=True)  # RiskZone the case currently belongs to
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Newest first; load with selectinload where a page shows sightings of several cases
+    sightings = db.relationship('Sighting', backref='missing_child', lazy=True,
+                                order_by='Sighting.sighting_time.desc()')
+
+    # Keyset pages of the case listings, newest first (optionally by status); see shared/migrations.py
+    __table_args__ = (
+        db.Index('ix_missing_child_reported_id', 'date_reported', 'id'),
+        db.Index('ix_missing_child_status_reported_id', 'status', 'date_reported', 'id'),
+    )
 
     def to_dict(self):
         """Convert model to dictionary"""
@@ -45,22 +60,29 @@ class MissingChild(db.Model):
             'audio_filename': self.audio_filename,
             'emergency_contact': self.emergency_contact,
             'date_reported': self.date_reported.isoformat() if self.date_reported else None,
-            'status': self.status
+            'status': self.status,
+            'geocode_status': self.geocode_status
         }
 
 
 class Sighting(db.Model):
     """Sighting report model"""
     id = db.Column(db.Integer, primary_key=True)
-    report_id = db.Column(db.String(100), db.ForeignKey('missing_child.report_id'), nullable=False)
+    report_id = db.Column(db.String(100), db.ForeignKey('missing_child.report_id'), nullable=False, index=True)
     location = db.Column(db.String(200), nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
+    geohash = db.Column(db.String(12), index=True)  # Of latitude/longitude, kept in sync by shared.spatial
     description = db.Column(db.Text)
     reporter_phone = db.Column(db.String(20))
     photo_filename = db.Column(db.String(500))  # Optional photo proof for sighting
     face_match_score = db.Column(db.Float, nullable=True)  # AI face comparison score (0-100)
-    sighting_time = db.Column(db.DateTime, default=datetime.utcnow)
+    sighting_time = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    geocode_status = db.Column(db.String(20), default='done', index=True)  # pending -> geocoding -> done/failed (background geocoder)
+    geocode_claimed_at = db.Column(db.DateTime)  # When a background geocoder worker claimed the row
+
+    # Case detail: sightings of a case, newest first
+    __table_args__ = (db.Index('ix_sighting_report_time', 'report_id', 'sighting_time'),)
 
     def to_dict(self):
         """Convert model to dictionary"""
@@ -74,7 +96,37 @@ class Sighting(db.Model):
             'reporter_phone': self.reporter_phone,
             'photo_filename': self.photo_filename,
             'face_match_score': self.face_match_score,
-            'sighting_time': self.sighting_time.isoformat() if self.sighting_time else None
+            'sighting_time': self.sighting_time.isoformat() if self.sighting_time else None,
+            'geocode_status': self.geocode_status
+        }
+
+
+class SightingCandidate(db.Model):
+    """Another missing case last seen near a sighting, queued for admin review"""
+    __table_args__ = (
+        db.UniqueConstraint('sighting_id', 'report_id'),
+        db.Index('ix_sighting_candidate_report_status', 'report_id', 'status', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    sighting_id = db.Column(db.Integer, db.ForeignKey('sighting.id'), nullable=False, index=True)
+    report_id = db.Column(db.String(100), db.ForeignKey('missing_child.report_id'), nullable=False, index=True)  # Candidate case
+    distance_km = db.Column(db.Float)  # Sighting to the case's last seen location
+    days_apart = db.Column(db.Float)  # Sighting time minus case report time
+    status = db.Column(db.String(20), default='pending', index=True)  # pending -> confirmed/dismissed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    reviewed_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            'id': self.id,
+            'sighting_id': self.sighting_id,
+            'report_id': self.report_id,
+            'distance_km': self.distance_km,
+            'days_apart': self.days_apart,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'reviewed_at': self.reviewed_at.isoformat() if self.reviewed_at else None
         }
 
 
@@ -96,6 +148,7 @@ class RiskZone(db.Model):
     incident_count = db.Column(db.Integer, default=0)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    __table_args__ = (db.Index('ix_risk_zone_active_score', 'is_active', 'risk_score'),)
 
     def to_dict(self):
         """Convert model to dictionary"""
@@ -112,6 +165,23 @@ class RiskZone(db.Model):
         }
 
 
+class JobLock(db.Model):
+    """Lease that lets exactly one worker run a scheduled job at a time"""
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    acquired_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            'name': self.name,
+            'owner': self.owner,
+            'locked_until': self.locked_until.isoformat() if self.locked_until else None,
+            'acquired_at': self.acquired_at.isoformat() if self.acquired_at else None
+        }
+
+
 class Analytics(db.Model):
     """Analytics model for storing analysis results"""
     id = db.Column(db.Integer, primary_key=True)
@@ -119,6 +189,8 @@ class Analytics(db.Model):
     analysis_data = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     insights = db.Column(db.Text)
+    data_version = db.Column(db.String(100), index=True)  # Case-table fingerprint the snapshot was computed from
+    __table_args__ = (db.Index('ix_analytics_type_created', 'analysis_type', 'created_at'),)
 
     def to_dict(self):
         """Convert model to dictionary"""
@@ -127,5 +199,11 @@ class Analytics(db.Model):
             'analysis_type': self.analysis_type,
             'analysis_data': self.analysis_data,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'insights': self.insights
+            'insights': self.insights,
+            'data_version': self.data_version
         }
+
+
+# Keep the indexed geohash columns in sync with the coordinates
+track_geohash(MissingChild, 'last_seen_lat', 'last_seen_lng')
+track_geohash(Sighting, 'latitude', 'longitude')
@@ -0,0 +1,89 @@
+"""
+Keyset (cursor) pagination
+Pages are read in (sort key, id) order and the next page starts strictly
+after the last row of the previous one, so every page is one bounded index
+range scan no matter how deep it is or how large the table grows; the
+cursor handed to the client is an opaque token of that last (key, id)
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort_value, row_id):
+    """Opaque next-page token for the row (sort_value, row_id)"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, datetime_key=True):
+    """
+    (sort_value, row_id) from a token made by encode_cursor
+
+    Raises:
+        ValueError: the token is malformed
+    """
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if datetime_key:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def page_size(requested, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Requested page size clamped to 1..maximum (default when not given)"""
+    if not requested:
+        return default
+    return max(1, min(int(requested), maximum))
+
+
+def keyset_page(db, query, sort_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=True):
+    """
+    One page of a select, ordered by (sort_column, id_column)
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        query: select() with any filters applied (no ORDER BY/LIMIT)
+        sort_column, id_column: Columns of the keyset; an index on
+                                (filters..., sort_column, id_column) serves each page
+        cursor: Token from the previous page (None for the first page)
+        limit: Rows per page
+        descending: Newest first
+
+    Returns:
+        tuple: (rows, next cursor or None on the last page)
+
+    Raises:
+        ValueError: the cursor is malformed
+    """
+    if cursor:
+        after = tuple_(*decode_cursor(cursor))
+        keyset = tuple_(sort_column, id_column)
+        query = query.where(keyset < after if descending else keyset > after)
+
+    order = (sort_column.desc(), id_column.desc()) if descending else (sort_column, id_column)
+    # One extra row tells whether another page exists without a COUNT
+    rows = db.session.execute(query.order_by(*order).limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(*_keyset_of(rows[-1], sort_column, id_column))
+
+
+def _keyset_of(row, sort_column, id_column):
+    """(sort value, id) of a result row, whether it selected columns or an ORM entity"""
+    mapping = row._mapping
+    if sort_column in mapping and id_column in mapping:
+        return mapping[sort_column], mapping[id_column]
+    return getattr(row[0], sort_column.key), getattr(row[0], id_column.key)
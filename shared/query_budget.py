@@ -0,0 +1,70 @@
+"""
+Query budgets
+Counts the SQL statements a block of code sends to the database, so a page
+that starts issuing one query per case (lazy-loaded relationships, per-row
+lookups in a loop) fails a check instead of slowing down as the tables grow.
+
+    with query_budget(db.engine, 3, 'admin dashboard'):
+        client.get('/admin/dashboard')
+
+Only statements from the current thread are counted, so background workers
+(geocoder, analytics scheduler) sharing the engine do not affect the result.
+"""
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block sent more SQL statements than its budget"""
+
+
+class QueryCounter:
+    """
+    Records the SQL statements sent on an engine by the current thread
+
+    Args:
+        engine: SQLAlchemy engine (db.engine)
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self._thread = None
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            self.statements.append(' '.join(statement.split()))
+
+    def __enter__(self):
+        self._thread = threading.get_ident()
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+        return False
+
+
+@contextmanager
+def query_budget(engine, budget, label='block'):
+    """
+    Fail when the block sends more than budget SQL statements
+
+    Yields:
+        QueryCounter: the statements recorded so far
+
+    Raises:
+        QueryBudgetExceeded: listing every statement the block sent
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+
+    if counter.count > budget:
+        listing = '\n'.join(f'  {i}. {statement[:200]}' for i, statement in enumerate(counter.statements, 1))
+        raise QueryBudgetExceeded(f'{label}: {counter.count} queries (budget {budget})\n{listing}')
@@ -0,0 +1,123 @@
+"""
+Cross-process token-bucket rate limiter
+State lives in a SQLite row, so the limit holds across every gunicorn worker
+and service sharing the file instead of once per process
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+class SharedRateLimiter:
+    """
+    Token bucket implemented as GCRA (generic cell rate algorithm) over one SQLite row
+
+    Each caller atomically reserves the next free slot under a write lock, so
+    waiters are served in arrival order (fair FIFO queue) and the aggregate rate
+    across processes never exceeds `rate` requests per second. A caller whose
+    slot would start after its deadline does not reserve anything and gives up
+    immediately instead of stalling the request thread.
+    """
+
+    def __init__(self, path, name, rate=1.0, burst=1):
+        self.path = path
+        self.name = name
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limiter (
+                name TEXT PRIMARY KEY,
+                theoretical_arrival REAL NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute('INSERT OR IGNORE INTO rate_limiter (name, theoretical_arrival) VALUES (?, 0)', (self.name,))
+
+    def _reserve(self, max_wait):
+        """Atomically reserve a slot; returns the wait in seconds or None if it exceeds max_wait"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute(
+                'SELECT theoretical_arrival FROM rate_limiter WHERE name = ?', (self.name,)
+            ).fetchone()
+            tat = max(row[0] if row else 0.0, now)
+            wait = max(0.0, tat - self.tolerance - now)
+            if wait > max_wait:
+                conn.execute('ROLLBACK')
+                return None
+            conn.execute(
+                'UPDATE rate_limiter SET theoretical_arrival = ? WHERE name = ?',
+                (tat + self.interval, self.name)
+            )
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def acquire(self, timeout=None):
+        """
+        Block until this caller's slot comes up
+
+        Args:
+            timeout: Maximum seconds to wait (None = wait as long as needed)
+
+        Returns:
+            bool: True if a slot was granted, False if it could not start within timeout
+        """
+        max_wait = float('inf') if timeout is None else max(0.0, timeout)
+        try:
+            wait = self._reserve(max_wait)
+        except sqlite3.Error as e:
+            # Never let limiter storage problems take geocoding down with it
+            print(f"⚠️ Rate limiter error ({self.name}): {str(e)}")
+            return True
+
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def penalize(self, seconds):
+        """Push every process's next slot back, e.g. after the provider answers 403"""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'UPDATE rate_limiter SET theoretical_arrival = MAX(theoretical_arrival, ?) + ? WHERE name = ?',
+                (time.time(), seconds, self.name)
+            )
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            print(f"⚠️ Rate limiter penalty error ({self.name}): {str(e)}")
+            try:
+                conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+
+    def backlog_seconds(self):
+        """Seconds until a newly arriving caller would be served"""
+        row = self._connect().execute(
+            'SELECT theoretical_arrival FROM rate_limiter WHERE name = ?', (self.name,)
+        ).fetchone()
+        tat = row[0] if row else 0.0
+        return max(0.0, tat - self.tolerance - time.time())
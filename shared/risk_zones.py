@@ -0,0 +1,354 @@
+"""
+Risk zone maintenance
+Full rebuilds cluster every geocoded case; incremental refreshes re-cluster
+only the neighbourhood of cases that were inserted, moved or deleted, so the
+risk map stays current without a full-table scan on every write
+"""
+import calendar
+from datetime import datetime
+
+import numpy as np
+
+from shared.clustering import NOISE, cluster_members, dbscan
+from shared.geo import haversine_matrix, points_bounding_box, shrink_box
+
+
+MAX_REFRESH_ROUNDS = 6  # Region doublings before falling back to a full rebuild
+SECONDS_PER_DAY = 86400
+
+
+def calculate_risk_score(cases):
+    """Calculate risk score for a zone based on multiple factors"""
+    if not cases:
+        return 0
+
+    # Incident count score (0-50 points)
+    incident_score = min(len(cases) * 10, 50)
+
+    # Recency score (0-20 points based on how recent the cases are)
+    now = datetime.utcnow()
+    recency_scores = []
+
+    for case in cases:
+        days_ago = (now - case.date_reported).days
+        if days_ago <= 30:
+            recency_scores.append(20)
+        elif days_ago <= 90:
+            recency_scores.append(15)
+        elif days_ago <= 365:
+            recency_scores.append(10)
+        else:
+            recency_scores.append(5)
+
+    recency_score = sum(recency_scores) / len(recency_scores) if recency_scores else 0
+
+    # Age vulnerability score (0-15 points - younger children = higher score)
+    age_scores = []
+    for case in cases:
+        if case.age <= 5:
+            age_scores.append(15)
+        elif case.age <= 10:
+            age_scores.append(12)
+        elif case.age <= 15:
+            age_scores.append(8)
+        else:
+            age_scores.append(5)
+
+    age_score = sum(age_scores) / len(age_scores) if age_scores else 0
+
+    # Total score (max 100)
+    total_score = incident_score + recency_score + age_score
+    return min(total_score, 100)
+
+
+def risk_scores(labels, ages, reported, now=None):
+    """
+    calculate_risk_score for every cluster at once
+
+    Args:
+        labels: cluster label per case (NOISE cases are ignored)
+        ages: age per case
+        reported: date_reported per case as epoch seconds (naive UTC)
+        now: epoch seconds to measure recency from (default: current time)
+
+    Returns:
+        numpy.ndarray: risk score per cluster label 0..max(labels)
+    """
+    labels = np.asarray(labels)
+    clustered = labels != NOISE
+    if not clustered.any():
+        return np.zeros(0)
+    labels = labels[clustered]
+    ages = np.asarray(ages)[clustered]
+    now = calendar.timegm(datetime.utcnow().utctimetuple()) if now is None else now
+    days_ago = (now - np.asarray(reported)[clustered]) // SECONDS_PER_DAY
+
+    recency = np.select([days_ago <= 30, days_ago <= 90, days_ago <= 365], [20, 15, 10], default=5)
+    vulnerability = np.select([ages <= 5, ages <= 10, ages <= 15], [15, 12, 8], default=5)
+
+    counts = np.bincount(labels)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        recency_score = np.bincount(labels, weights=recency) / counts
+        age_score = np.bincount(labels, weights=vulnerability) / counts
+    return np.minimum(np.minimum(counts * 10, 50) + recency_score + age_score, 100)
+
+
+class RiskZoneMaintainer:
+    """
+    Keeps RiskZone rows (and each case's risk_zone_id) in sync with the cases
+
+    Works with any Flask-SQLAlchemy app whose models follow the Sachet schema,
+    so the monolith, the case service and the analytics service share it.
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        case_model: MissingChild model class (needs a risk_zone_id column)
+        zone_model: RiskZone model class
+        radius_km: DBSCAN neighbourhood radius
+        min_points: Cases a point needs within radius_km to seed a zone
+        score_fn: callable(cases) -> risk score; cases expose date_reported and age
+        arrays: optional shared.case_arrays.CaseArrays; full rebuilds then cluster
+                and score (vectorized, see risk_scores) from it instead of querying
+    """
+
+    def __init__(self, db, case_model, zone_model, radius_km=2.0, min_points=2, score_fn=calculate_risk_score,
+                 arrays=None):
+        self.db = db
+        self.case_model = case_model
+        self.zone_model = zone_model
+        self.score_fn = score_fn
+        self.arrays = arrays
+        self.radius_km = radius_km
+        self.min_points = min_points
+
+    def _select_cases(self):
+        case = self.case_model
+        return self.db.select(
+            case.id, case.last_seen_lat, case.last_seen_lng, case.date_reported, case.age, case.risk_zone_id
+        ).where(case.last_seen_lat.isnot(None)).where(case.last_seen_lng.isnot(None))
+
+    def _row_scores(self, rows, labels):
+        return [self.score_fn([rows[i] for i in indices]) for indices in cluster_members(labels)]
+
+    def _create_zones(self, ids, lats, lngs, labels, scores):
+        """Insert a RiskZone per cluster and point its members at it, returns zone dicts"""
+        case = self.case_model
+        zones = []
+        for indices, score in zip(cluster_members(labels), scores):
+            lat, lng = float(lats[indices].mean()), float(lngs[indices].mean())
+            # Reach of the zone: its farthest member from the centre, plus eps around it
+            extent_km = float(haversine_matrix([lat], [lng], lats[indices], lngs[indices]).max())
+            zone = self.zone_model(
+                zone_name='Zone',  # NOT NULL; renamed Zone_<id> once flushed
+                latitude=lat,
+                longitude=lng,
+                risk_score=float(score),
+                incident_count=len(indices),
+                radius_km=round(extent_km + self.radius_km, 3)
+            )
+            self.db.session.add(zone)
+            self.db.session.flush()
+            # Named by id for full rebuilds and incremental refreshes alike
+            zone.zone_name = f"Zone_{zone.id}"
+
+            case_ids = [int(ids[i]) for i in indices]
+            # Zone bookkeeping is not a case edit: keep updated_at (and data versions) as they are
+            self.db.session.execute(
+                self.db.update(case).where(case.id.in_(case_ids))
+                .values(risk_zone_id=zone.id, updated_at=case.updated_at)
+            )
+            zones.append({
+                'id': zone.id,
+                'name': zone.zone_name,
+                'lat': zone.latitude,
+                'lng': zone.longitude,
+                'risk_score': zone.risk_score,
+                'incident_count': zone.incident_count,
+                'radius_km': zone.radius_km,
+                'case_ids': case_ids
+            })
+        return zones
+
+    def rebuild(self):
+        """
+        Recompute every zone from scratch (also the scheduled consistency check)
+
+        Returns:
+            list: zone dicts {id, name, lat, lng, risk_score, incident_count, radius_km, case_ids}
+        """
+        case = self.case_model
+        if self.arrays is not None:
+            arrays = self.arrays.refresh()
+            geocoded = arrays.geocoded()
+            ids, lats, lngs = arrays.ids[geocoded], arrays.lat[geocoded], arrays.lng[geocoded]
+        else:
+            rows = self.db.session.execute(self._select_cases()).all()
+            ids = [r.id for r in rows]
+            lats = np.fromiter((r.last_seen_lat for r in rows), dtype=float, count=len(rows))
+            lngs = np.fromiter((r.last_seen_lng for r in rows), dtype=float, count=len(rows))
+
+        self.db.session.execute(self.db.delete(self.zone_model))
+        self.db.session.execute(
+            self.db.update(case).where(case.risk_zone_id.isnot(None))
+            .values(risk_zone_id=None, updated_at=case.updated_at)
+        )
+
+        zones = []
+        if len(ids) >= 2:
+            labels = dbscan(lats, lngs, eps_km=self.radius_km, min_points=self.min_points)
+            if self.arrays is not None:
+                scores = risk_scores(labels, arrays.age[geocoded], arrays.reported[geocoded])
+            else:
+                scores = self._row_scores(rows, labels)
+            zones = self._create_zones(ids, lats, lngs, labels, scores)
+
+        self.db.session.commit()
+        return zones
+
+    def refresh_around(self, points, zone_ids=()):
+        """
+        Re-cluster only the neighbourhood of changed cases
+
+        Call after the change is committed, with the case's old and/or new
+        coordinates and the zone it belonged to before the change (deletes and
+        moves). Zones that may be affected - and every case eps-connected to
+        them - are re-clustered; everything else is left alone.
+
+        Args:
+            points: [(lat, lng), ...] old and new positions of the changed cases
+            zone_ids: risk_zone_id values the changed cases had before the change
+
+        Returns:
+            int: number of zones in the refreshed region
+        """
+        points = [(lat, lng) for lat, lng in points if lat is not None and lng is not None]
+        zone_ids = {zone_id for zone_id in zone_ids if zone_id is not None}
+        if not points and not zone_ids:
+            return 0
+
+        try:
+            region = self._load_region(points, zone_ids)
+            if region is None:
+                # Neighbourhood spans (nearly) everything - cheaper to rebuild
+                return len(self.rebuild())
+
+            rows, affected_zones = region
+            case = self.case_model
+            if affected_zones:
+                self.db.session.execute(
+                    self.db.delete(self.zone_model).where(self.zone_model.id.in_(affected_zones))
+                )
+            if rows:
+                self.db.session.execute(
+                    self.db.update(case).where(case.id.in_([r.id for r in rows]))
+                    .values(risk_zone_id=None, updated_at=case.updated_at)
+                )
+
+            zones = []
+            if len(rows) >= 2:
+                lats = np.fromiter((r.last_seen_lat for r in rows), dtype=float, count=len(rows))
+                lngs = np.fromiter((r.last_seen_lng for r in rows), dtype=float, count=len(rows))
+                labels = dbscan(lats, lngs, eps_km=self.radius_km, min_points=self.min_points)
+                zones = self._create_zones(
+                    [r.id for r in rows], lats, lngs, labels, self._row_scores(rows, labels)
+                )
+
+            self.db.session.commit()
+            return len(zones)
+        except Exception as e:
+            self.db.session.rollback()
+            print(f"⚠️ Incremental risk zone update failed (next full rebuild will fix it): {str(e)}")
+            return 0
+
+    def _load_region(self, points, zone_ids):
+        """
+        Find the closed set of cases whose clustering can change
+
+        Starting from cases within radius of the changed points and the members
+        of the changed zones, pull in every case eps-connected to them and every
+        zone they belong to, growing the bounding box until the set is complete.
+
+        Returns:
+            tuple: (rows, affected zone ids), or None to request a full rebuild
+        """
+        case = self.case_model
+        eps = self.radius_km
+
+        if zone_ids:
+            # Seed the box with the current extent of the changed zones
+            extent = self.db.session.execute(
+                self.db.select(
+                    self.db.func.min(case.last_seen_lat), self.db.func.max(case.last_seen_lat),
+                    self.db.func.min(case.last_seen_lng), self.db.func.max(case.last_seen_lng)
+                ).where(case.risk_zone_id.in_(zone_ids))
+            ).one()
+            if extent[0] is not None:
+                points = points + [(extent[0], extent[2]), (extent[1], extent[3])]
+        if not points:
+            return [], set(zone_ids)
+
+        seed_lats = np.array([p[0] for p in points], dtype=float)
+        seed_lngs = np.array([p[1] for p in points], dtype=float)
+        margin_km = eps * 4
+        for _round in range(MAX_REFRESH_ROUNDS):
+            min_lat, max_lat, min_lng, max_lng = points_bounding_box(seed_lats, seed_lngs, margin_km)
+            rows = self.db.session.execute(
+                self._select_cases()
+                .where(case.last_seen_lat.between(min_lat, max_lat))
+                .where(case.last_seen_lng.between(min_lng, max_lng))
+            ).all()
+
+            closed = self._close_region(rows, (min_lat, max_lat, min_lng, max_lng), seed_lats, seed_lngs, zone_ids)
+            if closed is not None:
+                return closed
+            margin_km *= 2
+        return None
+
+    def _close_region(self, rows, bbox, seed_lats, seed_lngs, zone_ids):
+        """Closure inside one bounding box, or None if it may reach outside the box"""
+        case = self.case_model
+        eps = self.radius_km
+        if not rows:
+            return [], set(zone_ids)
+
+        lats = np.fromiter((r.last_seen_lat for r in rows), dtype=float, count=len(rows))
+        lngs = np.fromiter((r.last_seen_lng for r in rows), dtype=float, count=len(rows))
+        row_zones = np.array([r.risk_zone_id if r.risk_zone_id is not None else -1 for r in rows])
+
+        # eps-connected components (DBSCAN with min_points=1)
+        components = dbscan(lats, lngs, eps_km=eps, min_points=1)
+
+        near_seed = (haversine_matrix(seed_lats, seed_lngs, lats, lngs) <= eps).any(axis=0)
+        selected_components = set(components[near_seed].tolist())
+        selected_zones = set(zone_ids)
+        while True:
+            in_region = np.isin(components, list(selected_components)) | np.isin(row_zones, list(selected_zones))
+            zones_now = set(row_zones[in_region].tolist()) - {-1}
+            components_now = set(components[in_region].tolist())
+            if zones_now <= selected_zones and components_now <= selected_components:
+                break
+            selected_zones |= zones_now
+            selected_components |= components_now
+
+        # Anything within eps of the box edge could connect to cases outside it
+        if in_region.any():
+            inner = shrink_box(bbox, eps)
+            region_lats, region_lngs = lats[in_region], lngs[in_region]
+            if inner is None or not (
+                (region_lats >= inner[0]).all() and (region_lats <= inner[1]).all()
+                and (region_lngs >= inner[2]).all() and (region_lngs <= inner[3]).all()
+            ):
+                return None
+
+        # Every affected zone must be entirely inside the region
+        if selected_zones:
+            counts = dict(self.db.session.execute(
+                self.db.select(case.risk_zone_id, self.db.func.count())
+                .where(case.risk_zone_id.in_(selected_zones))
+                .group_by(case.risk_zone_id)
+            ).all())
+            for zone_id in selected_zones:
+                if counts.get(zone_id, 0) != int((row_zones[in_region] == zone_id).sum()):
+                    return None
+
+        return [rows[i] for i in np.flatnonzero(in_region)], selected_zones
@@ -0,0 +1,254 @@
+"""
+Background analytics scheduler
+Heavy analytics jobs run in a daemon thread on an interval or after N new
+cases, never inside a user request; a lease row in job_lock lets exactly one
+worker (out of however many processes run the app) execute each job, and every
+run is recorded in Analytics with its duration and result
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+
+JOB_RECORD_PREFIX = 'job:'  # Analytics.analysis_type of run records, e.g. "job:analytics"
+KEEP_JOB_RUNS = 50  # Per job; older run records are pruned
+
+
+class _Job:
+    def __init__(self, name, fn, interval_seconds, new_cases):
+        self.name = name
+        self.fn = fn
+        self.interval_seconds = interval_seconds
+        self.new_cases = new_cases
+        self.requested_at = None
+
+
+class AnalyticsScheduler:
+    """
+    Runs registered jobs under a database lease so one worker runs each job
+
+    Works with any Flask-SQLAlchemy app whose models follow the Sachet schema
+    (JobLock, Analytics, MissingChild), so the monolith and the analytics
+    service share it. Jobs must finish within lease_seconds.
+
+    Args:
+        app: Flask application (used for app contexts inside the scheduler thread)
+        db: Flask-SQLAlchemy instance bound to app
+        lock_model: JobLock model class
+        analytics_model: Analytics model class (run records)
+        case_model: MissingChild model class (new-case trigger)
+        lease_seconds: How long a worker may hold a job before others can take over
+        poll_seconds: How often each worker checks whether a job is due
+    """
+
+    def __init__(self, app, db, lock_model, analytics_model, case_model, lease_seconds=600, poll_seconds=15):
+        self.app = app
+        self.db = db
+        self.lock_model = lock_model
+        self.analytics_model = analytics_model
+        self.case_model = case_model
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._jobs = {}
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add_job(self, name, fn, interval_seconds, new_cases=None):
+        """
+        Register a job
+
+        Args:
+            name: Job name (job_lock key, run records are "job:<name>")
+            fn: callable() -> JSON-serializable result, run inside an app context
+            interval_seconds: Run at least this often
+            new_cases: Also run once this many cases were added since the last run
+        """
+        self._jobs[name] = _Job(name, fn, interval_seconds, new_cases)
+
+    def request(self, name):
+        """Ask for a run of a job as soon as possible (returns immediately)"""
+        self._jobs[name].requested_at = datetime.utcnow()
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        """Start the scheduler thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='analytics-scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            with self.app.app_context():
+                self.lock_model.__table__.create(bind=self.db.engine, checkfirst=True)
+        except Exception as e:
+            print(f"⚠️ Could not create job_lock table: {str(e)}")
+
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            for job in list(self._jobs.values()):
+                with self.app.app_context():
+                    try:
+                        self._tick(job)
+                    except Exception as e:
+                        self.db.session.rollback()
+                        print(f"❌ Scheduler check for {job.name} failed: {str(e)}")
+
+    def _tick(self, job):
+        if not self._due(job) or not self._acquire(job.name):
+            return
+        try:
+            # Another worker may have finished a run while we waited for the lease
+            if self._due(job):
+                self._execute(job)
+        finally:
+            self._release(job.name)
+
+    # ==================== SCHEDULING ====================
+
+    def last_run(self, name):
+        """Latest run record of a job as a dict, or None"""
+        model = self.analytics_model
+        row = self.db.session.execute(
+            self.db.select(model)
+            .where(model.analysis_type == JOB_RECORD_PREFIX + name)
+            .order_by(model.created_at.desc(), model.id.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+        return json.loads(row.analysis_data) if row is not None else None
+
+    def _due(self, job):
+        last = self.last_run(job.name)
+        if last is None:
+            return True
+
+        started = datetime.fromisoformat(last['started_at'])
+        if job.requested_at is not None and job.requested_at > started:
+            return True
+        if (datetime.utcnow() - started).total_seconds() >= job.interval_seconds:
+            return True
+        if job.new_cases:
+            case = self.case_model
+            added = self.db.session.execute(
+                self.db.select(self.db.func.count(case.id)).where(case.id > (last.get('max_case_id') or 0))
+            ).scalar()
+            return added >= job.new_cases
+        return False
+
+    def _acquire(self, name):
+        """Take the job's lease if it is free or expired"""
+        lock = self.lock_model
+        now = datetime.utcnow()
+        until = now + timedelta(seconds=self.lease_seconds)
+        result = self.db.session.execute(
+            self.db.update(lock)
+            .where(lock.name == name)
+            .where(or_(lock.locked_until.is_(None), lock.locked_until < now, lock.owner == self.owner))
+            .values(owner=self.owner, locked_until=until, acquired_at=now)
+        )
+        if result.rowcount:
+            self.db.session.commit()
+            return True
+
+        # No free lease row: either another worker holds it or it was never created
+        try:
+            self.db.session.add(lock(name=name, owner=self.owner, locked_until=until, acquired_at=now))
+            self.db.session.commit()
+            return True
+        except IntegrityError:
+            self.db.session.rollback()
+            return False
+
+    def _release(self, name):
+        lock = self.lock_model
+        self.db.session.execute(
+            self.db.update(lock)
+            .where(lock.name == name)
+            .where(lock.owner == self.owner)
+            .values(locked_until=datetime.utcnow())
+        )
+        self.db.session.commit()
+
+    # ==================== RUNS ====================
+
+    def _execute(self, job):
+        case = self.case_model
+        started = datetime.utcnow()
+        # Taken before the run, so cases added meanwhile count towards the next one
+        max_case_id = self.db.session.execute(self.db.select(self.db.func.max(case.id))).scalar() or 0
+
+        began = time.monotonic()
+        try:
+            result, status, error = job.fn(), 'success', None
+        except Exception as e:
+            self.db.session.rollback()
+            result, status, error = None, 'failed', str(e)
+        duration_ms = round((time.monotonic() - began) * 1000, 1)
+
+        self._record(job.name, {
+            'job': job.name,
+            'status': status,
+            'started_at': started.isoformat(),
+            'duration_ms': duration_ms,
+            'owner': self.owner,
+            'max_case_id': max_case_id,
+            'result': result,
+            'error': error
+        })
+        if status == 'success':
+            print(f"⏱️ Scheduled job {job.name} finished in {duration_ms} ms")
+        else:
+            print(f"❌ Scheduled job {job.name} failed after {duration_ms} ms: {error}")
+
+    def _record(self, name, record):
+        model = self.analytics_model
+        analysis_type = JOB_RECORD_PREFIX + name
+        self.db.session.add(model(
+            analysis_type=analysis_type,
+            analysis_data=json.dumps(record, default=str),
+            insights=record['error']
+        ))
+        self.db.session.flush()
+
+        stale_ids = self.db.session.execute(
+            self.db.select(model.id)
+            .where(model.analysis_type == analysis_type)
+            .order_by(model.created_at.desc(), model.id.desc())
+            .offset(KEEP_JOB_RUNS)
+        ).scalars().all()
+        if stale_ids:
+            self.db.session.execute(self.db.delete(model).where(model.id.in_(stale_ids)))
+        self.db.session.commit()
+
+    def status(self):
+        """Per job: schedule, pending request, current lease and last run"""
+        lock = self.lock_model
+        leases = {
+            row.name: row for row in self.db.session.execute(self.db.select(lock)).scalars().all()
+        }
+        now = datetime.utcnow()
+        jobs = {}
+        for name, job in self._jobs.items():
+            lease = leases.get(name)
+            running = lease is not None and lease.locked_until is not None and lease.locked_until > now
+            jobs[name] = {
+                'interval_seconds': job.interval_seconds,
+                'new_cases': job.new_cases,
+                'requested_at': job.requested_at.isoformat() if job.requested_at else None,
+                'running': running,
+                'lease_owner': lease.owner if running else None,
+                'last_run': self.last_run(name)
+            }
+        return jobs
@@ -0,0 +1,130 @@
+"""
+Full-text case search
+Name, description, last seen location (and sub-location) and the
+descriptions of a case's sightings are indexed in case_search, an FTS5 table
+on SQLite or a GIN-indexed tsvector on PostgreSQL (created and kept in sync by
+triggers, see shared/migrations.py). Every query term is a prefix match, all
+terms must match, and results are ranked (name hits first) with keyset pages
+on (score, id).
+"""
+import re
+
+from sqlalchemy import text
+
+from shared.pagination import decode_cursor, encode_cursor
+
+
+MAX_QUERY_TERMS = 8
+MIN_TERM_LENGTH = 2  # Single letters would prefix-match nearly every case
+# bm25 column weights on SQLite: name, description, location, sightings
+SQLITE_WEIGHTS = (10.0, 3.0, 3.0, 1.0)
+
+
+def query_terms(query):
+    """Lower-cased word terms of a search string (punctuation, FTS syntax and single letters dropped)"""
+    terms = [term for term in re.findall(r'\w+', (query or '').lower()) if len(term) >= MIN_TERM_LENGTH]
+    return terms[:MAX_QUERY_TERMS]
+
+
+class CaseSearch:
+    """
+    Ranked full-text search over cases
+
+    Works with any Flask-SQLAlchemy app whose models follow the Sachet schema,
+    once schema migration 2 has been applied.
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        case_model: MissingChild model class
+        sighting_model: Sighting model class
+    """
+
+    def __init__(self, db, case_model, sighting_model):
+        self.db = db
+        self.case_model = case_model
+        self.sighting_model = sighting_model
+
+    def _matches(self, terms):
+        """(SQL selecting id and score of matching cases, lower score = better; its parameters)"""
+        if self.db.engine.dialect.name == 'postgresql':
+            return (
+                "SELECT s.case_id AS id, -ts_rank_cd(s.document, to_tsquery('simple', :query)) AS score "
+                "FROM case_search s WHERE s.document @@ to_tsquery('simple', :query)",
+                {'query': ' & '.join(f'{term}:*' for term in terms)}
+            )
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        return (
+            f"SELECT rowid AS id, bm25(case_search, {weights}) AS score "
+            "FROM case_search WHERE case_search MATCH :query",
+            {'query': ' '.join(f'"{term}"*' for term in terms)}
+        )
+
+    def search(self, query, status=None, cursor=None, limit=20):
+        """
+        One page of cases matching every term of query, best first
+
+        Args:
+            query: Free text (e.g. "red jacket", a name fragment, a place)
+            status: Only cases with this status (None for all)
+            cursor: next_cursor of the previous page
+            limit: Results per page
+
+        Returns:
+            tuple: (case dicts with score and sighting_count, next cursor or None)
+
+        Raises:
+            ValueError: the query has no terms or the cursor is malformed
+        """
+        terms = query_terms(query)
+        if not terms:
+            raise ValueError(f'Search query must contain a word of at least {MIN_TERM_LENGTH} characters')
+
+        matches, params = self._matches(terms)
+        sql = f"SELECT m.id, m.score FROM ({matches}) m JOIN missing_child c ON c.id = m.id WHERE 1 = 1"
+        if status:
+            sql += " AND c.status = :status"
+            params['status'] = status
+        if cursor:
+            params['after_score'], params['after_id'] = decode_cursor(cursor, datetime_key=False)
+            sql += " AND (m.score > :after_score OR (m.score = :after_score AND m.id > :after_id))"
+        sql += " ORDER BY m.score, m.id LIMIT :limit"
+        params['limit'] = limit + 1
+
+        # One extra row tells whether another page exists
+        ranked = self.db.session.execute(text(sql), params).all()
+        next_cursor = None
+        if len(ranked) > limit:
+            ranked = ranked[:limit]
+            next_cursor = encode_cursor(float(ranked[-1].score), ranked[-1].id)
+        if not ranked:
+            return [], None
+
+        case, sighting = self.case_model, self.sighting_model
+        ids = [row.id for row in ranked]
+        cases = {row.id: row for row in self.db.session.execute(
+            self.db.select(case.id, case.report_id, case.name, case.age, case.gender, case.last_seen_location,
+                           case.location_subcategory, case.description, case.photo_filename,
+                           case.date_reported, case.status)
+            .where(case.id.in_(ids))
+        )}
+        sighting_counts = dict(self.db.session.execute(
+            self.db.select(sighting.report_id, self.db.func.count(sighting.id))
+            .where(sighting.report_id.in_([row.report_id for row in cases.values()]))
+            .group_by(sighting.report_id)
+        ).all())
+
+        return [{
+            'id': row.id,
+            'report_id': row.report_id,
+            'name': row.name,
+            'age': row.age,
+            'gender': row.gender,
+            'last_seen_location': row.last_seen_location,
+            'location_subcategory': row.location_subcategory,
+            'description': row.description,
+            'photo_filename': row.photo_filename,
+            'date_reported': row.date_reported.isoformat() if row.date_reported else None,
+            'status': row.status,
+            'sighting_count': sighting_counts.get(row.report_id, 0),
+            'score': round(-float(score), 4)
+        } for row, score in ((cases[r.id], r.score) for r in ranked if r.id in cases)], next_cursor
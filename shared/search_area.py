@@ -0,0 +1,347 @@
+"""
+Per-case trajectory and search-area prediction
+The last-seen point and the geocoded sightings of a case, in time order, give
+a recency-weighted movement speed and heading; position is then modelled as a
+correlated random walk from the latest point (drift along the heading that
+fades after PERSISTENCE_HOURS, spreading out with elapsed time) and evaluated
+on a NumPy probability grid, plus analytic search circles for search teams
+"""
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from shared.geo import KM_PER_DEGREE, lng_degrees
+from shared.geocode_worker import DONE
+
+
+DEFAULT_SPEED_KMH = 1.5  # Assumed when there is no movement to learn from (a child on foot, with stops)
+MAX_SPEED_KMH = 80.0  # Faster segments are treated as sighting/geocoding noise and clipped
+MIN_SEGMENT_HOURS = 1 / 60  # Sightings closer in time than this are not used for speed
+RECENCY_HALF_LIFE_HOURS = 24.0  # Weight of a movement segment halves per this age
+PERSISTENCE_HOURS = 2.0  # How long the observed heading keeps steering the prediction
+MAX_HORIZON_HOURS = 72.0  # Predictions further ahead are not meaningful
+LOCATION_ERROR_KM = 0.3  # Uncertainty of a reported point itself
+GRID_CELLS = 64  # Grid side; the grid spans +-GRID_SIGMAS around the predicted centre
+GRID_SIGMAS = 3.0
+MIN_CELL_PROBABILITY = 1e-5  # Cells below this are left out of the response
+SEARCH_PROBABILITIES = (0.5, 0.9)
+REFRESH_MINUTES = 15  # Cached predictions move forward in time at this granularity (divides 60)
+MAX_CACHED_CASES = 256
+
+
+def _local_km(lats, lngs, lat0, lng0):
+    """Equirectangular east/north offsets in km from (lat0, lng0)"""
+    cos0 = math.cos(math.radians(lat0))
+    east = (np.asarray(lngs, dtype=float) - lng0) * KM_PER_DEGREE * cos0
+    north = (np.asarray(lats, dtype=float) - lat0) * KM_PER_DEGREE
+    return east, north
+
+
+def fit_movement(lats, lngs, hours):
+    """
+    Recency-weighted speed and heading of a time-ordered track
+
+    Args:
+        lats, lngs: Track points in degrees
+        hours: Point times in hours (any origin), ascending
+
+    Returns:
+        dict: speed_kmh (mean segment speed), velocity (east, north km/h of
+              the weighted mean velocity), heading_deg (0 = north),
+              heading_confidence (0 = no consistent direction, 1 = straight
+              line) and segments (number used)
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    hours = np.asarray(hours, dtype=float)
+    movement = {'speed_kmh': DEFAULT_SPEED_KMH, 'velocity': (0.0, 0.0), 'heading_deg': None,
+                'heading_confidence': 0.0, 'segments': 0}
+    if len(lats) < 2:
+        return movement
+
+    east, north = _local_km(lats, lngs, lats[-1], lngs[-1])
+    dt = np.diff(hours)
+    usable = dt >= MIN_SEGMENT_HOURS
+    if not usable.any():
+        return movement
+
+    dt = dt[usable]
+    v_east = np.diff(east)[usable] / dt
+    v_north = np.diff(north)[usable] / dt
+    speed = np.hypot(v_east, v_north)
+    scale = np.where(speed > MAX_SPEED_KMH, MAX_SPEED_KMH / np.maximum(speed, 1e-9), 1.0)
+    v_east, v_north, speed = v_east * scale, v_north * scale, speed * scale
+
+    # Segments are weighted by how recently they ended
+    ages = hours[-1] - hours[1:][usable]
+    weights = np.power(0.5, ages / RECENCY_HALF_LIFE_HOURS)
+    weights /= weights.sum()
+
+    mean_speed = float(np.dot(weights, speed))
+    mean_east, mean_north = float(np.dot(weights, v_east)), float(np.dot(weights, v_north))
+    drift = math.hypot(mean_east, mean_north)
+    movement.update({
+        'speed_kmh': mean_speed,
+        'velocity': (mean_east, mean_north),
+        'heading_deg': math.degrees(math.atan2(mean_east, mean_north)) % 360 if drift > 0 else None,
+        'heading_confidence': drift / mean_speed if mean_speed > 0 else 0.0,
+        'segments': int(len(dt))
+    })
+    return movement
+
+
+def predict_position(movement, elapsed_hours):
+    """
+    Expected displacement and spread after elapsed_hours (correlated random walk)
+
+    The mean velocity drifts the centre but fades with PERSISTENCE_HOURS;
+    the spread grows ballistically at first and diffusively afterwards.
+
+    Returns:
+        tuple: (east_km, north_km, sigma_km)
+    """
+    t = min(max(elapsed_hours, 0.0), MAX_HORIZON_HOURS)
+    tau = PERSISTENCE_HOURS
+    persistence = tau * (1 - math.exp(-t / tau))
+    east, north = movement['velocity']
+    # Per-axis velocity variance of an isotropic walk at the observed speed
+    velocity_var = movement['speed_kmh'] ** 2 / 2
+    spread_var = 2 * velocity_var * tau * tau * (t / tau - 1 + math.exp(-t / tau))
+    return east * persistence, north * persistence, math.sqrt(LOCATION_ERROR_KM ** 2 + spread_var)
+
+
+def probability_grid(lat, lng, sigma_km):
+    """
+    Probability of each cell of a GRID_CELLS x GRID_CELLS grid around (lat, lng)
+
+    Returns:
+        dict: min_lat, min_lng, lat_step, lng_step (degrees), cell_km, rows,
+              cols and cells ([row, col, probability], rows = latitude ascending)
+    """
+    half_km = GRID_SIGMAS * sigma_km
+    cell_km = 2 * half_km / GRID_CELLS
+    offsets = (np.arange(GRID_CELLS) + 0.5) * cell_km - half_km
+    density = np.exp(-0.5 * (offsets / sigma_km) ** 2)
+    grid = np.outer(density, density)
+    grid /= grid.sum()
+
+    rows, cols = np.nonzero(grid >= MIN_CELL_PROBABILITY)
+    lat_step = cell_km / KM_PER_DEGREE
+    lng_step = lng_degrees(cell_km, lat)
+    return {
+        'min_lat': lat - GRID_CELLS / 2 * lat_step,
+        'min_lng': lng - GRID_CELLS / 2 * lng_step,
+        'lat_step': lat_step,
+        'lng_step': lng_step,
+        'cell_km': cell_km,
+        'rows': GRID_CELLS,
+        'cols': GRID_CELLS,
+        'cells': [[int(r), int(c), round(float(grid[r, c]), 6)] for r, c in zip(rows, cols)]
+    }
+
+
+def search_radius(sigma_km, probability):
+    """Radius around the predicted centre holding the given probability (2D Gaussian)"""
+    return sigma_km * math.sqrt(-2 * math.log(1 - probability))
+
+
+def _circle(lat, lng, radius_km, vertices=64):
+    """GeoJSON ring approximating a circle"""
+    angles = np.linspace(0, 2 * math.pi, vertices + 1)
+    lats = lat + radius_km * np.cos(angles) / KM_PER_DEGREE
+    lngs = lng + radius_km * np.sin(angles) * lng_degrees(1.0, lat)
+    return [[round(float(x), 6), round(float(y), 6)] for x, y in zip(lngs, lats)]
+
+
+def to_geojson(area):
+    """FeatureCollection of a prediction: track, predicted centre and search circles"""
+    features = []
+    track = area['track']
+    if len(track) > 1:
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'LineString', 'coordinates': [[p['lng'], p['lat']] for p in track]},
+            'properties': {'kind': 'trajectory', **area['movement']}
+        })
+    for point in track:
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [point['lng'], point['lat']]},
+            'properties': {'kind': point['kind'], 'time': point['time']}
+        })
+
+    prediction = area['prediction']
+    if prediction is not None:
+        for search in reversed(prediction['search_areas']):
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Polygon', 'coordinates': [_circle(prediction['lat'], prediction['lng'], search['radius_km'])]},
+                'properties': {'kind': 'search_area', **search}
+            })
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [prediction['lng'], prediction['lat']]},
+            'properties': {'kind': 'predicted_location', 'elapsed_hours': prediction['elapsed_hours'],
+                           'sigma_km': prediction['sigma_km']}
+        })
+    return {
+        'type': 'FeatureCollection',
+        'features': features,
+        'properties': {'report_id': area['report_id'], 'as_of': area['as_of'], 'track_version': area['track_version']}
+    }
+
+
+class SearchAreaPredictor:
+    """
+    Predicts where a missing child is likely to be now, per case
+
+    The movement fit is cached until the case's track changes (a sighting is
+    added or geocoded, or the case is edited); the prediction built on it
+    moves forward in REFRESH_MINUTES steps.
+
+    Works with any Flask-SQLAlchemy app whose models follow the Sachet schema.
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        case_model: MissingChild model class
+        sighting_model: Sighting model class
+    """
+
+    def __init__(self, db, case_model, sighting_model):
+        self.db = db
+        self.case_model = case_model
+        self.sighting_model = sighting_model
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _track_version(self, report_id):
+        case, sighting = self.case_model, self.sighting_model
+        row = self.db.session.execute(
+            self.db.select(
+                case.updated_at,
+                self.db.select(self.db.func.count(sighting.id))
+                .where(sighting.report_id == report_id, sighting.geocode_status == DONE)
+                .scalar_subquery(),
+                self.db.select(self.db.func.max(sighting.id))
+                .where(sighting.report_id == report_id)
+                .scalar_subquery()
+            ).where(case.report_id == report_id)
+        ).one_or_none()
+        if row is None:
+            return None
+        updated_at, located, last_id = row
+        return f"{updated_at.isoformat() if updated_at else ''}:{located}:{last_id or 0}"
+
+    def _load_track(self, report_id):
+        case, sighting = self.case_model, self.sighting_model
+        start = self.db.session.execute(
+            self.db.select(case.last_seen_lat, case.last_seen_lng, case.date_reported)
+            .where(case.report_id == report_id)
+        ).one()
+        track = []
+        if start.last_seen_lat is not None and start.last_seen_lng is not None and start.date_reported:
+            track.append(('last_seen', start.last_seen_lat, start.last_seen_lng, start.date_reported))
+
+        rows = self.db.session.execute(
+            self.db.select(sighting.latitude, sighting.longitude, sighting.sighting_time)
+            .where(sighting.report_id == report_id, sighting.geocode_status == DONE)
+            .order_by(sighting.sighting_time)
+        ).all()
+        # 0, 0 is the placeholder of sightings never geocoded
+        track.extend(('sighting', row.latitude, row.longitude, row.sighting_time) for row in rows
+                     if row.sighting_time and (row.latitude or row.longitude))
+        track.sort(key=lambda point: point[3])
+        return track
+
+    def _fit(self, report_id, version):
+        track = self._load_track(report_id)
+        if not track:
+            return {'version': version, 'track': [], 'movement': None, 'predictions': OrderedDict()}
+
+        epoch = track[0][3]
+        movement = fit_movement(
+            [point[1] for point in track],
+            [point[2] for point in track],
+            [(point[3] - epoch).total_seconds() / 3600 for point in track]
+        )
+        return {
+            'version': version,
+            'track': [{'kind': kind, 'lat': lat, 'lng': lng, 'time': time.isoformat()} for kind, lat, lng, time in track],
+            'last_time': track[-1][3],
+            'movement': movement,
+            'predictions': OrderedDict()
+        }
+
+    def predict(self, report_id, now=None):
+        """
+        Search area for a case now
+
+        Returns:
+            dict: report_id, track_version, as_of, track, movement and
+                  prediction ({lat, lng, elapsed_hours, sigma_km, search_areas})
+                  plus the probability grid; None if the case does not exist,
+                  {'prediction': None, ...} if it has no located point yet
+        """
+        version = self._track_version(report_id)
+        if version is None:
+            return None
+
+        with self._lock:
+            fit = self._cache.get(report_id)
+            if fit is not None and fit['version'] == version:
+                self._cache.move_to_end(report_id)
+            else:
+                fit = None
+        if fit is None:
+            fit = self._fit(report_id, version)
+            with self._lock:
+                self._cache[report_id] = fit
+                while len(self._cache) > MAX_CACHED_CASES:
+                    self._cache.popitem(last=False)
+
+        now = now or datetime.utcnow()
+        as_of = now.replace(minute=now.minute - now.minute % REFRESH_MINUTES, second=0, microsecond=0)
+        base = {'report_id': report_id, 'track_version': version, 'as_of': as_of.isoformat(), 'track': fit['track']}
+        if fit['movement'] is None:
+            return {**base, 'movement': None, 'prediction': None, 'grid': None}
+
+        with self._lock:
+            cached = fit['predictions'].get(base['as_of'])
+        if cached is None:
+            cached = self._predict(fit, as_of)
+            with self._lock:
+                fit['predictions'][base['as_of']] = cached
+                while len(fit['predictions']) > 4:
+                    fit['predictions'].popitem(last=False)
+        return {**base, **cached}
+
+    def _predict(self, fit, as_of):
+        movement = fit['movement']
+        last = fit['track'][-1]
+        elapsed = max((as_of - fit['last_time']).total_seconds() / 3600, 0.0)
+        east, north, sigma = predict_position(movement, elapsed)
+        lat = last['lat'] + north / KM_PER_DEGREE
+        lng = last['lng'] + east * lng_degrees(1.0, last['lat'])
+
+        return {
+            'movement': {
+                'speed_kmh': round(movement['speed_kmh'], 3),
+                'heading_deg': round(movement['heading_deg'], 1) if movement['heading_deg'] is not None else None,
+                'heading_confidence': round(movement['heading_confidence'], 3),
+                'segments': movement['segments']
+            },
+            'prediction': {
+                'lat': round(lat, 6),
+                'lng': round(lng, 6),
+                'elapsed_hours': round(elapsed, 2),
+                'horizon_hours': round(min(elapsed, MAX_HORIZON_HOURS), 2),
+                'sigma_km': round(sigma, 3),
+                'search_areas': [
+                    {'probability': p, 'radius_km': round(search_radius(sigma, p), 3)} for p in SEARCH_PROBABILITIES
+                ]
+            },
+            'grid': probability_grid(lat, lng, sigma)
+        }
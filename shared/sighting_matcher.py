@@ -0,0 +1,164 @@
+"""
+Cross-case sighting matching
+A sighting is filed against one case, but the child seen may belong to
+another: once a sighting has coordinates, other missing cases last seen
+within a radius (and reported within a time window of it) are looked up
+through the geohash index and recorded as candidate links for admin review
+"""
+from datetime import datetime, timedelta
+
+from shared.geocode_worker import DONE
+from shared.spatial import nearby
+
+
+REVIEW_STATUSES = ('pending', 'confirmed', 'dismissed')
+
+
+class SightingMatcher:
+    """
+    Records and reviews SightingCandidate links
+
+    Works with any Flask-SQLAlchemy app whose models follow the Sachet schema.
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        case_model: MissingChild model class
+        sighting_model: Sighting model class
+        candidate_model: SightingCandidate model class
+        radius_km: Max distance from the sighting to a case's last seen location
+        window_days: Max time between the sighting and a case's report
+        max_candidates: Nearest cases linked per sighting
+    """
+
+    def __init__(self, db, case_model, sighting_model, candidate_model,
+                 radius_km=1.0, window_days=30, max_candidates=10):
+        self.db = db
+        self.case_model = case_model
+        self.sighting_model = sighting_model
+        self.candidate_model = candidate_model
+        self.radius_km = radius_km
+        self.window_days = window_days
+        self.max_candidates = max_candidates
+
+    def match(self, sighting):
+        """
+        Link a geocoded sighting to the other missing cases near it
+
+        Safe to call again for the same sighting; existing links are kept.
+
+        Returns:
+            int: number of new candidate links
+        """
+        if sighting.geocode_status != DONE or sighting.latitude is None or sighting.longitude is None:
+            return 0
+
+        case = self.case_model
+        seen_at = sighting.sighting_time or datetime.utcnow()
+        window = timedelta(days=self.window_days)
+        ids, distances = nearby(
+            self.db, case.id, case.last_seen_lat, case.last_seen_lng, case.geohash,
+            sighting.latitude, sighting.longitude, self.radius_km,
+            where=[
+                case.status == 'missing',
+                case.report_id != sighting.report_id,
+                case.date_reported.between(seen_at - window, seen_at + window)
+            ],
+            limit=self.max_candidates
+        )
+        if not ids:
+            return 0
+
+        link = self.candidate_model
+        linked = set(self.db.session.execute(
+            self.db.select(link.report_id).where(link.sighting_id == sighting.id)
+        ).scalars())
+        cases = {row.id: row for row in self.db.session.execute(
+            self.db.select(case.id, case.report_id, case.date_reported).where(case.id.in_(ids))
+        )}
+
+        created = 0
+        for case_id, distance in zip(ids, distances):
+            row = cases[case_id]
+            if row.report_id in linked:
+                continue
+            self.db.session.add(link(
+                sighting_id=sighting.id,
+                report_id=row.report_id,
+                distance_km=round(distance, 3),
+                days_apart=round((seen_at - row.date_reported).total_seconds() / 86400, 2) if row.date_reported else None,
+                status='pending'
+            ))
+            created += 1
+
+        if created:
+            self.db.session.commit()
+            print(f"🔗 Sighting {sighting.id}: {created} other case(s) within {self.radius_km} km queued for review")
+        return created
+
+    def _serialize(self, link, sighting):
+        return {
+            'id': link.id,
+            'sighting_id': link.sighting_id,
+            'report_id': link.report_id,
+            'distance_km': link.distance_km,
+            'days_apart': link.days_apart,
+            'status': link.status,
+            'created_at': link.created_at.isoformat() if link.created_at else None,
+            'reviewed_at': link.reviewed_at.isoformat() if link.reviewed_at else None,
+            'sighting': {
+                'report_id': sighting.report_id,
+                'location': sighting.location,
+                'latitude': sighting.latitude,
+                'longitude': sighting.longitude,
+                'description': sighting.description,
+                'photo_filename': sighting.photo_filename,
+                'sighting_time': sighting.sighting_time.isoformat() if sighting.sighting_time else None
+            }
+        }
+
+    def candidates(self, report_id=None, status='pending', limit=50):
+        """
+        Candidate links with their sighting, newest first
+
+        Args:
+            report_id: Only links to this case (None for all cases)
+            status: Only links with this review status (None for any)
+            limit: Max links
+        """
+        link, sighting = self.candidate_model, self.sighting_model
+        query = self.db.select(link, sighting).join(sighting, sighting.id == link.sighting_id)
+        if report_id is not None:
+            query = query.where(link.report_id == report_id)
+        if status is not None:
+            query = query.where(link.status == status)
+        rows = self.db.session.execute(query.order_by(link.created_at.desc(), link.id.desc()).limit(limit)).all()
+        return [self._serialize(row[0], row[1]) for row in rows]
+
+    def review(self, candidate_id, status):
+        """
+        Set the review status of a link
+
+        Returns:
+            dict: the updated link, None if it does not exist
+
+        Raises:
+            ValueError: status is not one of REVIEW_STATUSES
+        """
+        if status not in REVIEW_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(REVIEW_STATUSES)}")
+
+        link = self.db.session.get(self.candidate_model, candidate_id)
+        if link is None:
+            return None
+        link.status = status
+        link.reviewed_at = datetime.utcnow() if status != 'pending' else None
+        self.db.session.commit()
+        return self._serialize(link, self.db.session.get(self.sighting_model, link.sighting_id))
+
+    def forget_cases(self, report_ids):
+        """Delete the links of cases about to be deleted (as candidates or through their sightings)"""
+        link, sighting = self.candidate_model, self.sighting_model
+        self.db.session.execute(self.db.delete(link).where(
+            link.report_id.in_(report_ids)
+            | link.sighting_id.in_(self.db.select(sighting.id).where(sighting.report_id.in_(report_ids)))
+        ))
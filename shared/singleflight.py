@@ -0,0 +1,131 @@
+"""
+Single-flight request coalescing for geocoding
+Concurrent callers asking for the same normalized location share one upstream
+request, both within a process (threads) and across processes (a lease row in
+the shared geocode cache file)
+"""
+import sqlite3
+import threading
+import time
+
+from shared.geocode_cache import normalize_location
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight geocode lookups
+
+    The first caller for a key becomes the leader and runs the upstream lookup.
+    Other threads in the same process wait for the leader's result. Callers in
+    other processes find the leader's lease in the cache file and poll the
+    cache until the answer lands there (or the lease expires, in which case
+    they run the lookup themselves).
+
+    Args:
+        cache: GeocodeCache whose file also stores the leases
+        lease_seconds: How long a leader may hold a key before others take over
+        poll_interval: Seconds between cache checks while following another process
+    """
+
+    def __init__(self, cache, lease_seconds=30.0, poll_interval=0.1):
+        self.cache = cache
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+        conn = self.cache._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_inflight (
+                location_key TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    def do(self, location_name, fn):
+        """
+        Run fn() for this location unless an identical lookup is already running
+
+        Returns:
+            tuple: (lat, lng) as produced by the leader's fn()
+        """
+        key = normalize_location(location_name)
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_across_processes(key, location_name, fn)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.event.set()
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def _do_across_processes(self, key, location_name, fn):
+        if self._claim(key):
+            try:
+                return fn()
+            finally:
+                self._release(key)
+
+        # Another process is already asking upstream - wait for its answer in the cache
+        deadline = time.time() + self.lease_seconds
+        while time.time() < deadline:
+            time.sleep(self.poll_interval)
+            cached = self.cache.get(location_name, count_stats=False)
+            if cached is not None:
+                return cached
+            if not self._is_claimed(key):
+                break
+
+        # Leader gave up without an answer (or took too long) - ask ourselves
+        return fn()
+
+    def _claim(self, key):
+        now = time.time()
+        try:
+            conn = self.cache._connect()
+            conn.execute('DELETE FROM geocode_inflight WHERE location_key = ? AND expires_at <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO geocode_inflight (location_key, expires_at) VALUES (?, ?)',
+                (key, now + self.lease_seconds)
+            )
+            return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            print(f"⚠️ Single-flight lease error: {str(e)}")
+            return True
+
+    def _is_claimed(self, key):
+        try:
+            row = self.cache._connect().execute(
+                'SELECT 1 FROM geocode_inflight WHERE location_key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+            return row is not None
+        except sqlite3.Error:
+            return False
+
+    def _release(self, key):
+        try:
+            self.cache._connect().execute('DELETE FROM geocode_inflight WHERE location_key = ?', (key,))
+        except sqlite3.Error as e:
+            print(f"⚠️ Single-flight release error: {str(e)}")
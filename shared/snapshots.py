@@ -0,0 +1,148 @@
+"""
+Materialized analytics snapshots
+Analytics results are stored as rows of the Analytics model keyed by a data
+version derived from the case table, served read-only, and only recomputed
+when the cases change (or on an explicit refresh)
+"""
+import json
+import threading
+from datetime import datetime
+
+
+KEEP_SNAPSHOTS = 20  # Per analysis type; older rows are pruned on refresh
+
+
+def case_data_version(db, case_model):
+    """
+    Cheap fingerprint of the case table: row count, max id and max updated_at
+
+    Any insert, update (updated_at bumps) or delete changes it.
+    """
+    count, max_id, max_updated = db.session.execute(
+        db.select(db.func.count(case_model.id), db.func.max(case_model.id), db.func.max(case_model.updated_at))
+    ).one()
+    stamp = max_updated.isoformat() if isinstance(max_updated, datetime) else (max_updated or '')
+    return f"{count}:{max_id or 0}:{stamp}"
+
+
+class SnapshotStore:
+    """
+    Read-through cache of analysis results in the Analytics table
+
+    Works with any Flask-SQLAlchemy app whose models follow the Sachet schema
+    (MissingChild with updated_at, Analytics with data_version).
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        case_model: MissingChild model class
+        analytics_model: Analytics model class
+    """
+
+    def __init__(self, db, case_model, analytics_model):
+        self.db = db
+        self.case_model = case_model
+        self.analytics_model = analytics_model
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def data_version(self):
+        """Fingerprint of the case table (see case_data_version)"""
+        return case_data_version(self.db, self.case_model)
+
+    def latest(self, analysis_type, data_version=None):
+        """Most recent snapshot row of a type (optionally for one data version), or None"""
+        model = self.analytics_model
+        query = self.db.select(model).where(model.analysis_type == analysis_type)
+        if data_version is not None:
+            query = query.where(model.data_version == data_version)
+        return self.db.session.execute(
+            query.order_by(model.created_at.desc(), model.id.desc()).limit(1)
+        ).scalar_one_or_none()
+
+    def latest_id(self, analysis_type):
+        """Id of the most recent snapshot row of a type (without loading its payload), or None"""
+        model = self.analytics_model
+        return self.db.session.execute(
+            self.db.select(model.id)
+            .where(model.analysis_type == analysis_type)
+            .order_by(model.created_at.desc(), model.id.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+
+    def peek(self, analysis_type):
+        """
+        Latest stored snapshot of any data version, without computing anything
+
+        Returns:
+            tuple: (payload or None, whether it matches the current data version)
+        """
+        row = self.latest(analysis_type)
+        if row is None:
+            return None, False
+        return self.payload(row), row.data_version == self.data_version()
+
+    def get(self, analysis_type, compute_fn, force=False):
+        """
+        Return the snapshot for the current data, computing it only if missing
+
+        Args:
+            analysis_type: Snapshot key (Analytics.analysis_type)
+            compute_fn: callable() -> JSON-serializable dict; an 'insights' list
+                        in it is also stored in the Analytics.insights column
+            force: Recompute even if a snapshot for this data version exists
+
+        Returns:
+            dict: the stored payload plus 'data_version' and 'computed_at'
+        """
+        version = self.data_version()
+        if not force:
+            row = self.latest(analysis_type, version)
+            if row is not None:
+                return self.payload(row)
+
+        # One computation per process; other callers wait and reuse it
+        with self._lock_for(analysis_type):
+            if not force:
+                row = self.latest(analysis_type, version)
+                if row is not None:
+                    return self.payload(row)
+            return self.payload(self._store(analysis_type, version, compute_fn()))
+
+    def _lock_for(self, analysis_type):
+        with self._locks_guard:
+            return self._locks.setdefault(analysis_type, threading.Lock())
+
+    def _store(self, analysis_type, version, payload):
+        model = self.analytics_model
+        insights = payload.get('insights')
+        if isinstance(insights, list):
+            # Plain strings (monolith) or {"message": ...} dicts (analytics service)
+            insights = '; '.join(item.get('message', '') if isinstance(item, dict) else str(item) for item in insights)
+        row = model(
+            analysis_type=analysis_type,
+            analysis_data=json.dumps(payload, default=str),
+            insights=insights if isinstance(insights, str) else None,
+            data_version=version
+        )
+        self.db.session.add(row)
+        self.db.session.flush()
+
+        stale_ids = self.db.session.execute(
+            self.db.select(model.id)
+            .where(model.analysis_type == analysis_type)
+            .order_by(model.created_at.desc(), model.id.desc())
+            .offset(KEEP_SNAPSHOTS)
+        ).scalars().all()
+        if stale_ids:
+            self.db.session.execute(self.db.delete(model).where(model.id.in_(stale_ids)))
+
+        self.db.session.commit()
+        return row
+
+    @staticmethod
+    def payload(row):
+        """Stored payload of a snapshot row plus 'data_version' and 'computed_at'"""
+        payload = json.loads(row.analysis_data or '{}')
+        payload['data_version'] = row.data_version
+        payload['computed_at'] = row.created_at.isoformat() if row.created_at else None
+        return payload
@@ -0,0 +1,216 @@
+"""
+Geohash spatial index for proximity queries
+Cases and sightings store the geohash of their coordinates in an indexed
+column; a radius query turns into a handful of index range scans over the
+geohash cells covering the circle, followed by an exact vectorized distance
+filter on the few candidates
+"""
+import math
+
+import numpy as np
+from sqlalchemy import event, or_
+
+from shared.geo import GEOHASH_ALPHABET, bounding_box, distances_from, geohash_encode, geohash_encode_many
+
+
+GEOHASH_PRECISION = 9  # Stored precision (~5 m cells); queries use a prefix of it
+BACKFILL_BATCH = 5000
+MAX_COVER_CELLS = 16  # Geohash cells (merged into fewer range scans) per proximity query
+START_RADIUS_KM = 1.0  # First ring of a nearest-first search
+MAX_NEARBY_RADIUS_KM = 50.0
+MAX_NEARBY_RESULTS = 200
+
+
+def geohash_or_none(lat, lng):
+    """Stored geohash for a point, None if it has no coordinates"""
+    if lat is None or lng is None:
+        return None
+    return geohash_encode(lat, lng, GEOHASH_PRECISION)
+
+
+def track_geohash(model, lat_attr, lng_attr, geohash_attr='geohash'):
+    """Keep model.geohash in sync with its coordinates on every ORM insert/update"""
+
+    def set_geohash(_mapper, _connection, target):
+        setattr(target, geohash_attr, geohash_or_none(getattr(target, lat_attr), getattr(target, lng_attr)))
+
+    event.listen(model, 'before_insert', set_geohash)
+    event.listen(model, 'before_update', set_geohash)
+
+
+def backfill_geohashes(db, model, lat_column, lng_column, geohash_column):
+    """
+    Fill the geohash of rows that have coordinates but no geohash yet (migration step)
+
+    Returns:
+        int: number of rows updated
+    """
+    table = model.__table__
+    updated = 0
+    while True:
+        rows = db.session.execute(
+            db.select(table.c.id, lat_column, lng_column)
+            .where(geohash_column.is_(None))
+            .where(lat_column.isnot(None))
+            .where(lng_column.isnot(None))
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        hashes = geohash_encode_many([r[1] for r in rows], [r[2] for r in rows], GEOHASH_PRECISION)
+        # Core executemany on the table, so updated_at/ORM events are left alone
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('row_id')).values({geohash_column.name: db.bindparam('hash')}),
+            [{'row_id': r[0], 'hash': h} for r, h in zip(rows, hashes)]
+        )
+        db.session.commit()
+        updated += len(rows)
+    return updated
+
+
+def _cell_degrees(precision):
+    """(height, width) in degrees of a geohash cell"""
+    bits = precision * 5
+    return 180.0 / (1 << (bits // 2)), 360.0 / (1 << ((bits + 1) // 2))
+
+
+def covering_prefixes(lat, lng, radius_km):
+    """
+    Geohash prefixes whose cells together cover the circle around (lat, lng)
+
+    Uses the finest precision that needs at most MAX_COVER_CELLS cells, so the
+    range scans stay few while reading little outside the circle.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lng_step = _cell_degrees(candidate)
+        cells = (math.floor(max_lat / lat_step) - math.floor(min_lat / lat_step) + 1) * \
+                (math.floor(max_lng / lng_step) - math.floor(min_lng / lng_step) + 1)
+        if cells <= MAX_COVER_CELLS:
+            precision = candidate
+            break
+
+    lat_step, lng_step = _cell_degrees(precision)
+    lats = np.clip(np.append(np.arange(min_lat, max_lat, lat_step), max_lat), -90.0, 90.0)
+    lngs = np.append(np.arange(min_lng, max_lng, lng_step), max_lng)
+    lngs = (np.clip(lngs, -540.0, 540.0) + 180.0) % 360.0 - 180.0  # wrap across the antimeridian
+    grid_lats, grid_lngs = np.meshgrid(lats, lngs)
+    return sorted(set(geohash_encode_many(grid_lats.ravel(), grid_lngs.ravel(), precision)))
+
+
+def _successor(prefix):
+    """Next geohash of the same length, None after the last one"""
+    digits = [GEOHASH_ALPHABET.index(char) for char in prefix]
+    for i in range(len(digits) - 1, -1, -1):
+        if digits[i] < 31:
+            digits[i] += 1
+            return ''.join(GEOHASH_ALPHABET[d] for d in digits[:i + 1]) + GEOHASH_ALPHABET[0] * (len(digits) - i - 1)
+        digits[i] = 0
+    return None
+
+
+def geohash_ranges(prefixes):
+    """Sorted prefixes -> [(low, high)] with consecutive cells merged into one range"""
+    ranges = []
+    for prefix in prefixes:
+        if ranges and _successor(ranges[-1][1]) == prefix:
+            ranges[-1][1] = prefix
+        else:
+            ranges.append([prefix, prefix])
+    return [(low, high + '~') for low, high in ranges]
+
+
+def geohash_filter(geohash_column, prefixes):
+    """Index-friendly filter: one range scan per run of consecutive cells (geohash BETWEEN low AND high || '~')"""
+    return or_(*[geohash_column.between(low, high) for low, high in geohash_ranges(prefixes)])
+
+
+def nearby(db, id_column, lat_column, lng_column, geohash_column, lat, lng, radius_km, where=(), limit=50):
+    """
+    Ids of the rows nearest to a point within radius_km, nearest first
+
+    Searches growing rings (START_RADIUS_KM, x4, ... up to radius_km) and
+    stops as soon as one holds limit rows: everything nearer than the ring
+    is inside it, so dense areas never read the whole radius.
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        id_column, lat_column, lng_column, geohash_column: Columns of the model
+        lat, lng: Query point
+        radius_km: Search radius
+        where: Extra filter clauses (e.g. status == 'missing')
+        limit: Max rows returned
+
+    Returns:
+        tuple: (ids, distances in km) sorted by distance
+    """
+    search_km = min(radius_km, START_RADIUS_KM)
+    while True:
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, search_km)
+        query = db.select(id_column, lat_column, lng_column).where(
+            geohash_filter(geohash_column, covering_prefixes(lat, lng, search_km)),
+            lat_column.between(min_lat, max_lat)
+        )
+        if min_lng >= -180.0 and max_lng <= 180.0:
+            query = query.where(lng_column.between(min_lng, max_lng))
+        for clause in where:
+            query = query.where(clause)
+        rows = db.session.execute(query).all()
+
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        distances = distances_from(
+            lat, lng,
+            np.fromiter((r[1] for r in rows), dtype=float, count=len(rows)),
+            np.fromiter((r[2] for r in rows), dtype=float, count=len(rows))
+        )
+        inside = np.flatnonzero(distances <= search_km)
+        if len(inside) >= limit or search_km >= radius_km:
+            inside = inside[np.argsort(distances[inside], kind='stable')][:limit]
+            return ids[inside].tolist(), distances[inside].tolist()
+        search_km = min(search_km * 4, radius_km)
+
+
+def nearby_cases(db, case_model, lat, lng, radius_km=5.0, status='missing', limit=50):
+    """
+    Cases last seen within radius_km of a point, nearest first (public fields only)
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        case_model: MissingChild model class
+        lat, lng: Query point
+        radius_km: Search radius, capped at MAX_NEARBY_RADIUS_KM
+        status: Only cases with this status (None for all)
+        limit: Max cases, capped at MAX_NEARBY_RESULTS
+
+    Returns:
+        list: case dicts with distance_km
+    """
+    case = case_model
+    where = [case.status == status] if status else []
+    ids, distances = nearby(
+        db, case.id, case.last_seen_lat, case.last_seen_lng, case.geohash,
+        lat, lng, min(radius_km, MAX_NEARBY_RADIUS_KM),
+        where=where, limit=min(limit, MAX_NEARBY_RESULTS)
+    )
+    if not ids:
+        return []
+
+    cases = {row.id: row for row in db.session.execute(
+        db.select(case.id, case.report_id, case.name, case.age, case.gender, case.last_seen_location,
+                  case.last_seen_lat, case.last_seen_lng, case.photo_filename, case.date_reported, case.status)
+        .where(case.id.in_(ids))
+    )}
+    return [{
+        'report_id': row.report_id,
+        'name': row.name,
+        'age': row.age,
+        'gender': row.gender,
+        'last_seen_location': row.last_seen_location,
+        'lat': row.last_seen_lat,
+        'lng': row.last_seen_lng,
+        'photo_filename': row.photo_filename,
+        'date_reported': row.date_reported.isoformat() if row.date_reported else None,
+        'status': row.status,
+        'distance_km': round(distance, 3)
+    } for row, distance in ((cases[case_id], distance) for case_id, distance in zip(ids, distances))]